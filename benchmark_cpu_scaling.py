@@ -0,0 +1,104 @@
+"""Throughput of local multi-process CPU training of tiny darknet YOLO with 1/2/4/8 processes."""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import mxnet as mx
+from mxnet import gluon
+from mxnet import autograd
+from gluoncv.model_zoo import get_model
+from gluoncv.data.batchify import Tuple, Stack, Pad
+from gluoncv.data.transforms.presets.yolo import YOLO3DefaultTrainTransform
+from gluoncv.utils import launch_local, exit_code
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark data parallel CPU training.')
+    parser.add_argument('--network', type=str, default='yolo3_tiny_darknet_voc',
+                        help='Model name.')
+    parser.add_argument('--num-procs', type=str, default='1,2,4,8',
+                        help='Comma separated numbers of processes.')
+    parser.add_argument('--batch-size', type=int, default=16,
+                        help='Global batch size, divided among processes.')
+    parser.add_argument('--data-shape', type=int, default=320,
+                        help='Input shape.')
+    parser.add_argument('--num-bases', type=int, default=50,
+                        help='Number of coefficients.')
+    parser.add_argument('--iters', type=int, default=20,
+                        help='Timed iterations.')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='Untimed iterations.')
+    parser.add_argument('--result', type=str, default='',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--worker', type=str, default='',
+                        help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_worker(args):
+    """Train on a fixed synthetic batch and report throughput of the first process."""
+    kv = mx.kv.create('dist_sync') if args.worker == 'dist' else None
+    num_procs = kv.num_workers if kv is not None else 1
+    batch_size = args.batch_size // num_procs
+    net = get_model(args.network, pretrained_base=False)
+    net.initialize()
+    transform = YOLO3DefaultTrainTransform(args.data_shape, args.data_shape, net,
+                                           num_bases=args.num_bases)
+    samples = []
+    for _ in range(batch_size):
+        img = mx.nd.random.uniform(0, 255, (args.data_shape, args.data_shape, 3)).astype('uint8')
+        # box, coefficients and class
+        label = np.hstack([[[40, 60, 200, 240]], np.random.randn(1, args.num_bases), [[1]]])
+        samples.append(transform(img, label))
+    batch = Tuple(*([Stack() for _ in range(7)] + [Pad(axis=0, pad_val=-1)]))(samples)
+    trainer = gluon.Trainer(net.collect_params(), 'sgd', {'learning_rate': 0.0005, 'momentum': 0.9},
+                            kvstore=kv if kv is not None else 'local')
+    net.hybridize()
+    tic = time.time()
+    for i in range(args.warmup + args.iters):
+        if i == args.warmup:
+            mx.nd.waitall()
+            tic = time.time()
+        with autograd.record():
+            losses = net(batch[0], batch[7], *batch[1:7])
+            autograd.backward(sum(losses))
+        trainer.step(batch_size * num_procs)
+    mx.nd.waitall()
+    elapsed = time.time() - tic
+    if kv is None or kv.rank == 0:
+        with open(args.result, 'w') as f:
+            json.dump({'samples_per_sec': args.batch_size * args.iters / elapsed}, f)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.worker:
+        run_worker(args)
+        sys.exit(0)
+    results = []
+    for num_procs in [int(n) for n in args.num_procs.split(',')]:
+        result = os.path.join(tempfile.mkdtemp(), 'result.json')
+        command = [sys.executable, os.path.abspath(__file__), '--result', result,
+                   '--network', args.network, '--batch-size', str(args.batch_size),
+                   '--data-shape', str(args.data_shape), '--num-bases', str(args.num_bases),
+                   '--iters', str(args.iters), '--warmup', str(args.warmup)]
+        if num_procs == 1:
+            # plain single process baseline without kvstore
+            subprocess.check_call(command + ['--worker', 'local'])
+        else:
+            codes = launch_local(command + ['--worker', 'dist'], num_procs)
+            if exit_code(codes):
+                raise RuntimeError('Worker failed with code {}'.format(exit_code(codes)))
+        with open(result) as f:
+            speed = json.load(f)['samples_per_sec']
+        results.append((num_procs, speed))
+        print('{} processes: {:.2f} samples/sec'.format(num_procs, speed))
+    base = results[0][1]
+    print('procs  samples/sec  speedup  efficiency')
+    for num_procs, speed in results:
+        print('{:5d}  {:11.2f}  {:7.2f}  {:10.1%}'.format(
+            num_procs, speed, speed / base, speed / base / num_procs * results[0][0]))
@@ -0,0 +1,114 @@
+"""Iteration time variance of random shape training, with and without bucketed prefetch and shape warm up."""
+import argparse
+import time
+import numpy as np
+import mxnet as mx
+from mxnet import gluon
+from mxnet import autograd
+from gluoncv.model_zoo import get_model
+from gluoncv.data.batchify import Tuple, Stack, Pad
+from gluoncv.data.dataloader import RandomTransformDataLoader
+from gluoncv.data.transforms.presets.yolo import YOLO3DefaultTrainTransform
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark iteration time of random shape training.')
+    parser.add_argument('--network', type=str, default='yolo3_darknet53_voc',
+                        help='Model name.')
+    parser.add_argument('--gpu', type=int, default=-1,
+                        help='GPU id, default is -1 to run on CPU.')
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help='Batch size.')
+    parser.add_argument('--num-workers', '-j', type=int, default=4,
+                        help='Number of data workers.')
+    parser.add_argument('--num-bases', type=int, default=50,
+                        help='Number of coefficients.')
+    parser.add_argument('--interval', type=int, default=10,
+                        help='Batches between random shape changes.')
+    parser.add_argument('--bucket-prefetch', type=int, default=4,
+                        help='Batches of the next shape sent ahead in the bucketed run.')
+    parser.add_argument('--iters', type=int, default=200,
+                        help='Timed iterations of each run.')
+    parser.add_argument('--seed', type=int, default=233,
+                        help='Random seed of each run.')
+    return parser.parse_args()
+
+
+class SyntheticDataset(gluon.data.Dataset):
+    """Random images with one box, coefficients and class each."""
+    def __init__(self, size, num_bases):
+        self._size = size
+        self._num_bases = num_bases
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        rng = np.random.RandomState(idx)
+        img = mx.nd.array(rng.randint(0, 255, (375, 500, 3)), dtype='uint8')
+        label = np.hstack([[[40, 60, 200, 240]], rng.randn(1, self._num_bases), [[1]]])
+        return img, label
+
+
+def run(args, ctx, bucketed):
+    """Per iteration time in seconds, and whether each iteration changed the shape."""
+    np.random.seed(args.seed)
+    mx.random.seed(args.seed)
+    net = get_model(args.network, pretrained_base=False)
+    net.initialize()
+    transform_fns = [YOLO3DefaultTrainTransform(x * 32, x * 32, net, num_bases=args.num_bases)
+                     for x in range(10, 20)]
+    net.collect_params().reset_ctx(ctx)
+    dataset = SyntheticDataset(args.batch_size * (args.iters + 1), args.num_bases)
+    batchify_fn = Tuple(*([Stack() for _ in range(7)] + [Pad(axis=0, pad_val=-1)]))
+    loader = RandomTransformDataLoader(
+        transform_fns, dataset, batch_size=args.batch_size, interval=args.interval,
+        shuffle=True, last_batch='discard', batchify_fn=batchify_fn,
+        num_workers=args.num_workers, bucket_prefetch=args.bucket_prefetch if bucketed else 0)
+    trainer = gluon.Trainer(net.collect_params(), 'sgd', {'learning_rate': 1e-6, 'momentum': 0.9})
+    net.hybridize()
+
+    def step(batch, update=True):
+        data = [x.as_in_context(ctx) for x in batch]
+        with autograd.record():
+            losses = net(data[0], data[7], *data[1:7])
+            autograd.backward(sum(losses))
+        if update:
+            trainer.step(args.batch_size)
+
+    if bucketed:
+        tic = time.time()
+        for batch in loader.warmup_batches():
+            step(batch, update=False)
+        mx.nd.waitall()
+        print('warm up of {} shapes: {:.2f} sec'.format(len(transform_fns), time.time() - tic))
+    times, switches = [], []
+    last_shape = None
+    tic = time.time()
+    for batch in loader:
+        step(batch)
+        mx.nd.waitall()
+        toc = time.time()
+        times.append(toc - tic)
+        switches.append(batch[0].shape != last_shape)
+        last_shape = batch[0].shape
+        tic = toc
+    # the first iteration starts workers and is excluded
+    return np.array(times[1:]), np.array(switches[1:])
+
+
+def main():
+    args = parse_args()
+    ctx = mx.gpu(args.gpu) if args.gpu >= 0 else mx.cpu()
+    print('{:<10s} {:>8s} {:>8s} {:>8s} {:>8s} {:>8s} {:>12s}'.format(
+        '', 'mean', 'std', 'p50', 'p99', 'max', 'switch mean'))
+    for name, bucketed in (('baseline', False), ('bucketed', True)):
+        times, switches = run(args, ctx, bucketed)
+        times = times * 1000
+        print('{:<10s} {:>6.1f}ms {:>6.1f}ms {:>6.1f}ms {:>6.1f}ms {:>6.1f}ms {:>10.1f}ms'.format(
+            name, times.mean(), times.std(), np.percentile(times, 50), np.percentile(times, 99),
+            times.max(), times[switches].mean() if switches.any() else 0.))
+
+
+if __name__ == '__main__':
+    main()
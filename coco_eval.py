@@ -95,6 +95,16 @@ def parse_args():
     parser.add_argument('--label-smooth', action='store_true', help='Use label smoothing.')
     parser.add_argument('--num_bases', type=int, default=50, help='the number of bases')
     parser.add_argument('--val_voc2012', type=bool, default=False, help='val in pascal voc 2012')
+    parser.add_argument('--cached-model', action='store_true',
+                        help='Export the network with fixed data shape once and reload the cached '
+                        'symbol and params with static memory allocation, which skips network '
+                        'construction and graph building on later runs.')
+    parser.add_argument('--val-cache', type=str, default='',
+                        help='Directory of the resized validation image cache, which is built on the '
+                        'first run. Empty disables the cache.')
+    parser.add_argument('--val-cache-memory', action='store_true',
+                        help='Keep the resized validation images in memory instead of memory-mapping '
+                        'the cache file, suitable for SBD sized splits.')
     args = parser.parse_args()
     return args
 
@@ -119,6 +129,9 @@ def get_dataset(dataset, args):
 def get_dataloader(net, val_dataset, data_shape, batch_size, num_workers, args):
     """Get dataloader."""
     width, height = data_shape, data_shape
+    if args.val_cache:
+        val_dataset = gdata.ResizedImageCache(val_dataset, width, height, root=args.val_cache,
+                                              in_memory=args.val_cache_memory)
     # val_batchify_fn = Tuple(Stack(), Pad(pad_val=-1))
 
     # Copied from eval_mask_rcnn.py
@@ -142,9 +155,11 @@ def validate(net, val_data, ctx, eval_metric, size, args):
     clipper = gcv.nn.bbox.BBoxClipToImage()
     eval_metric.reset()
     # set nms threshold and topk constraint
-    net.set_nms(nms_thresh=0.45, nms_topk=400)
-    mx.nd.waitall()
-    net.hybridize()
+    if hasattr(net, 'set_nms'):
+        # exported networks have nms and hybridization frozen
+        net.set_nms(nms_thresh=0.45, nms_topk=400)
+        mx.nd.waitall()
+        net.hybridize()
 
     with tqdm(total=size) as pbar:
         for ib, batch in enumerate(val_data):
@@ -199,7 +214,8 @@ def validate(net, val_data, ctx, eval_metric, size, args):
 
 def demo_val(net, val_data, eval_metric, polygon_metric, ctx, args):
     """Eval pipeline"""
-    net.collect_params().reset_ctx(ctx)
+    if hasattr(net, 'set_nms'):
+        net.collect_params().reset_ctx(ctx)
     if args.no_wd:
         for k, v in net.collect_params('.*beta|.*gamma|.*bias').items():
             v.wd_mult = 0.0
@@ -218,7 +234,8 @@ def demo_val(net, val_data, eval_metric, polygon_metric, ctx, args):
     fh = logging.FileHandler(log_file_path)
     logger.addHandler(fh)
     mx.nd.waitall()
-    net.hybridize()
+    if hasattr(net, 'set_nms'):
+        net.hybridize()
 
     map_bbox = validate(net, val_data, ctx, eval_metric, len(val_dataset), args)
     map_name, mean_ap = map_bbox
@@ -239,14 +256,25 @@ if __name__ == '__main__':
     net_name = '_'.join(('yolo3', args.network, args.dataset))
     args.save_prefix += net_name
     # use sync bn if specified
-    if args.syncbn and len(ctx) > 1:
+    if args.cached_model:
+        net, load_info = gutils.get_cached_model(
+            net_name, args.resume.strip() or None, args.data_shape, args.num_bases, ctx=ctx[0],
+            nms_thresh=0.45, nms_topk=400, batch_size=args.batch_size)
+        async_net = net
+        print('Model {} loaded, {} start: export {:.3f}s, load {:.3f}s, warmup {:.3f}s, total {:.3f}s'.format(
+            load_info['key'], 'cold' if load_info['cold'] else 'warm', load_info['export_time'],
+            load_info['load_time'], load_info['warmup_time'], load_info['total_time']))
+    elif args.syncbn and len(ctx) > 1:
         net = get_model(net_name, pretrained_base=True, norm_layer=gluon.contrib.nn.SyncBatchNorm,
                         norm_kwargs={'num_devices': len(ctx)})
         async_net = get_model(net_name, pretrained_base=False)  # used by cpu worker
     else:
         net = get_model(net_name, pretrained_base=True)
         async_net = net
-    if args.resume.strip():
+    if args.cached_model:
+        # exported networks live on the first context only
+        ctx = ctx[:1]
+    elif args.resume.strip():
         net.load_parameters(args.resume.strip())
         print(f'Loading {args.resume}')
         async_net.load_parameters(args.resume.strip())
@@ -4,7 +4,7 @@ This module provides data loaders and transformers for popular vision datasets.
 from . import transforms
 from . import batchify
 from .imagenet.classification import ImageNet, ImageNet1kAttr
-from .dataloader import DetectionDataLoader, RandomTransformDataLoader
+from .dataloader import DetectionDataLoader, RandomTransformDataLoader, DataWorkerPool
 from .pascal_voc.detection import VOCDetection
 from .pascal_voc.detection import VOC_Val_Detection
 from .pascal_voc.detection import coco_pretrain_Detection
@@ -18,8 +18,12 @@ from .pascal_aug.segmentation import VOCAugSegmentation
 from .ade20k.segmentation import ADE20KSegmentation
 from .segbase import ms_batchify_fn
 from .recordio.detection import RecordFileDetection
+from .recordio.coef_detection import RecordFileCoefDetection
 from .lst.detection import LstDetection
 from .mixup.detection import MixupDetection
+from .cache.resized import ResizedImageCache
+from .cache.labels import SharedLabelCache
+from .sampler import SplitSampler
 
 datasets = {
     'ade20k': ADE20KSegmentation,
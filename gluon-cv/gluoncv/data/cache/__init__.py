@@ -0,0 +1 @@
+"""Caches of decoded images and labels."""
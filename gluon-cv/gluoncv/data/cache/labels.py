@@ -0,0 +1,99 @@
+"""Labels of all samples in one shared memory buffer."""
+from __future__ import absolute_import
+import os
+import tempfile
+import numpy as np
+
+__all__ = ['SharedLabelCache']
+
+
+class SharedLabelCache(object):
+    """Preloaded labels of a dataset in one contiguous shared memory buffer.
+
+    Labels are flattened into one buffer, after an index of offsets and shapes, which is
+    written to a file in `/dev/shm` and memory-mapped read-only. Pickling the cache, e.g.
+    to send a dataset to `DataLoader` workers, only pickles the file name, and workers
+    map the same pages instead of receiving a copy of all labels. Forked workers share
+    the mapping as well, without touching reference counts of per-sample arrays, so
+    their memory does not grow with the size of the dataset. The file is removed when
+    the creating process closes the cache or exits.
+
+    Parameters
+    ----------
+    labels : list of numpy.ndarray
+        Label of each sample, with at most 2 dimensions.
+    root : str, optional
+        Directory of the buffer, default is `/dev/shm` if it exists, otherwise the
+        temporary directory.
+
+    """
+    def __init__(self, labels, root=None):
+        labels = [np.asarray(label) for label in labels]
+        if any(label.ndim > 2 for label in labels):
+            raise ValueError('Labels must have at most 2 dimensions.')
+        self._dtype = np.result_type(*labels) if labels else np.dtype('float64')
+        self._num = len(labels)
+        sizes = [label.size for label in labels]
+        index = np.zeros((4 * self._num + 1,), dtype=np.int64)
+        np.cumsum(sizes, out=index[1:self._num + 1])
+        index[self._num + 1:2 * self._num + 1] = [label.ndim for label in labels]
+        index[2 * self._num + 1:] = np.array(
+            [label.shape + (1,) * (2 - label.ndim) for label in labels],
+            dtype=np.int64).ravel()
+        self._size = int(index[self._num])
+        if root is None:
+            root = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        fd, self._filename = tempfile.mkstemp(prefix='gluoncv_labels_', dir=root)
+        self._owner = os.getpid()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(index.tobytes())
+            for label in labels:
+                f.write(np.ascontiguousarray(label, dtype=self._dtype).tobytes())
+        self._map()
+
+    def _map(self):
+        """Index and data views of the memory-mapped buffer."""
+        num = self._num
+        buf = np.memmap(self._filename, dtype=np.uint8, mode='r')
+        index = np.frombuffer(buf, dtype=np.int64, count=4 * num + 1)
+        self._offsets = index[:num + 1]
+        self._ndims = index[num + 1:2 * num + 1]
+        self._shapes = index[2 * num + 1:].reshape(num, 2)
+        self._data = np.frombuffer(buf, dtype=self._dtype, count=self._size,
+                                   offset=index.nbytes)
+
+    def __len__(self):
+        return self._num
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._num
+        begin, end = self._offsets[idx], self._offsets[idx + 1]
+        shape = tuple(self._shapes[idx][:self._ndims[idx]])
+        # a copy, transforms may change labels in place
+        return self._data[begin:end].reshape(shape).copy()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ('_offsets', '_ndims', '_shapes', '_data'):
+            state.pop(name)
+        # unpickled copies never remove the buffer
+        state['_owner'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._map()
+
+    def close(self):
+        """Release the mapping, and remove the buffer in the creating process."""
+        self._offsets = self._ndims = self._shapes = self._data = None
+        if self._owner == os.getpid() and os.path.isfile(self._filename):
+            os.remove(self._filename)
+        self._owner = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
@@ -0,0 +1,160 @@
+"""Cache of validation images resized to a fixed shape."""
+from __future__ import absolute_import
+import os
+import hashlib
+import re
+import numpy as np
+import mxnet as mx
+from mxnet.gluon.data import Dataset
+from ..transforms import image as timage
+
+__all__ = ['ResizedImageCache']
+
+
+def _annotations(dataset, idx):
+    """Everything of a sample except the image, without decoding the image if possible."""
+    if hasattr(dataset, '_segms'):
+        return dataset._labels[idx], dataset._segms[idx]
+    if hasattr(dataset, '_labels'):
+        return (dataset._labels[idx],)
+    if hasattr(dataset, '_load_label'):
+        cache = getattr(dataset, '_label_cache', None)
+        return (cache[idx] if cache else dataset._load_label(idx),)
+    return tuple(dataset[idx][1:])
+
+
+def _fingerprint(dataset):
+    """SHA1 of the image items of the dataset in order, with size and modification
+    time of the image files, or an empty string if the dataset has no `_items`."""
+    items = getattr(dataset, '_items', None)
+    if items is None:
+        return ''
+    image_path = getattr(dataset, '_image_path', None)
+    sha1 = hashlib.sha1()
+    for item in items:
+        sha1.update(repr(item).encode('utf-8'))
+        if isinstance(item, tuple) and image_path is not None:
+            path = image_path.format(*item)
+        else:
+            path = item
+        if isinstance(path, str) and os.path.isfile(path):
+            stat = os.stat(path)
+            sha1.update('{} {}'.format(stat.st_size, int(stat.st_mtime * 1e6)).encode('utf-8'))
+    return sha1.hexdigest()
+
+
+class ResizedImageCache(Dataset):
+    """Dataset wrapper which returns images resized to a fixed shape from a cache.
+
+    Images are decoded and resized once, with the same `imresize` as the validation
+    transforms, and stored as uint8 arrays with shape (N, H, W, 3) in a `.npy` file
+    keyed by the dataset split, shape and interpolation. Later runs memory-map the
+    file, so repeated evaluation skips JPEG decoding and resizing. The cache is rebuilt
+    when the image items of the dataset, their order or their files change. Images are
+    returned as :py:class:`gluoncv.data.transforms.image.ResizedImage` which carry the
+    original shape, so `YOLO3DefaultValTransform` and `YOLO3UsdSegCocoValTransform`
+    resize labels and return image sizes exactly as for the original images.
+
+    Parameters
+    ----------
+    dataset : mxnet.gluon.data.Dataset
+        Dataset without transform, e.g. :py:class:`gluoncv.data.VOC_Val_Detection`
+        or :py:class:`gluoncv.data.COCOInstance`.
+    width : int
+        Resized width.
+    height : int
+        Resized height.
+    interp : int, default is 9
+        Interpolation method, same as the validation transforms.
+    root : str, default is '~/.mxnet/datasets/resized'
+        Directory of cache files. `None` keeps the cache in memory only.
+    in_memory : bool, default is False
+        Load the whole cache into memory instead of memory-mapping it, which suits
+        small splits such as SBD val.
+    name : str, optional
+        Key of the dataset in file names, default is `str(dataset)`.
+
+    """
+    def __init__(self, dataset, width, height, interp=9, root='~/.mxnet/datasets/resized',
+                 in_memory=False, name=None):
+        self._dataset = dataset
+        self._width = width
+        self._height = height
+        self._interp = interp
+        self._in_memory = in_memory or root is None
+        self._filename = None
+        if root is not None:
+            root = os.path.expanduser(root)
+            if not os.path.isdir(root):
+                os.makedirs(root)
+            name = re.sub(r'[^\w.-]+', '_', str(dataset) if name is None else name).strip('_')
+            self._filename = os.path.join(
+                root, '{}_{}x{}_interp{}.npy'.format(name, width, height, interp))
+        self._images, self._shapes = self._load()
+
+    def __str__(self):
+        return '{}({}, {}x{})'.format(self.__class__.__name__, self._dataset,
+                                      self._width, self._height)
+
+    @property
+    def classes(self):
+        """Category names."""
+        return self._dataset.classes
+
+    def _build(self, images, shapes):
+        for idx in range(len(self._dataset)):
+            img = self._dataset[idx][0]
+            shapes[idx] = img.shape
+            images[idx] = timage.imresize(
+                img, self._width, self._height, interp=self._interp).asnumpy()
+
+    def _load(self):
+        num = len(self._dataset)
+        shape = (num, self._height, self._width, 3)
+        if self._filename is None:
+            images = np.empty(shape, dtype=np.uint8)
+            shapes = np.empty((num, 3), dtype=np.int64)
+            self._build(images, shapes)
+            return images, shapes
+        meta_file = self._filename[:-len('.npy')] + '_meta.npz'
+        fingerprint = _fingerprint(self._dataset)
+        if os.path.isfile(self._filename) and os.path.isfile(meta_file):
+            with np.load(meta_file) as f:
+                shapes = f['shapes']
+                valid = str(f['fingerprint']) == fingerprint
+            images = np.load(self._filename, mmap_mode=None if self._in_memory else 'r')
+            if valid and images.shape == shape and len(shapes) == num:
+                return images, shapes
+            del images
+        # write to a temporary file and rename, so an interrupted build is not used
+        tmp = self._filename + '.{}.tmp'.format(os.getpid())
+        images = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.uint8, shape=shape)
+        shapes = np.empty((num, 3), dtype=np.int64)
+        self._build(images, shapes)
+        images.flush()
+        del images
+        with open(meta_file, 'wb') as f:
+            np.savez(f, shapes=shapes, fingerprint=np.array(fingerprint))
+        os.rename(tmp, self._filename)
+        images = np.load(self._filename, mmap_mode=None if self._in_memory else 'r')
+        return images, shapes
+
+    def __len__(self):
+        return len(self._dataset)
+
+    def __getitem__(self, idx):
+        img = mx.nd.array(self._images[idx], dtype=np.uint8)
+        img = timage.ResizedImage(img, self._shapes[idx].tolist(), self._interp)
+        return (img,) + tuple(_annotations(self._dataset, idx))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if not self._in_memory:
+            # workers map the file again instead of receiving a copy of the images
+            state['_images'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._images is None:
+            self._images = np.load(self._filename, mmap_mode='r')
@@ -1,6 +1,8 @@
 """DataLoader utils."""
 import io
+import time
 import pickle
+import collections
 import multiprocessing
 from multiprocessing.reduction import ForkingPickler
 import numpy as np
@@ -123,6 +125,7 @@ class DetectionDataLoader(DataLoader):
             batch_sampler, batchify_fn, num_workers)
 
 _worker_dataset = None
+_worker_datasets = {}
 def _worker_initializer(dataset):
     """Initializer for processing pool."""
     # global dataset is per-process based and only available in worker processes
@@ -131,43 +134,211 @@ def _worker_initializer(dataset):
     global _worker_dataset
     _worker_dataset = dataset
 
-def _worker_fn(samples, transform_fn, batchify_fn):
+def _pool_initializer(datasets):
+    """Initializer for processing pool shared by loaders of several datasets."""
+    global _worker_datasets
+    _worker_datasets = datasets
+
+def _worker_fn(samples, transform_fn, batchify_fn, dataset_key=None):
     """Function for processing data in worker process."""
     # it is required that each worker process has to fork a new MXIndexedRecordIO handle
     # preserving dataset as global variable can save tons of overhead and is safe in new process
     global _worker_dataset
-    t_dataset = _worker_dataset.transform(transform_fn)
+    dataset = _worker_dataset if dataset_key is None else _worker_datasets[dataset_key]
+    t_dataset = dataset.transform(transform_fn)
     batch = batchify_fn([t_dataset[i] for i in samples])
     buf = io.BytesIO()
     ForkingPickler(buf, pickle.HIGHEST_PROTOCOL).dump(batch)
     return buf.getvalue()
 
+
+class DataWorkerPool(object):
+    """Worker processes shared by data loaders, kept across epochs and train/val phases.
+
+    Datasets of loaders are registered with the pool and sent to workers once when the
+    workers start, so register all datasets, i.e. create all loaders, before iterating.
+    Registering a new dataset later restarts the workers.
+
+    Parameters
+    ----------
+    num_workers : int
+        Number of worker processes.
+
+    """
+    def __init__(self, num_workers):
+        assert num_workers > 0, "DataWorkerPool requires at least one worker"
+        self.num_workers = num_workers
+        self.generation = 0
+        self._datasets = {}
+        self._pool = None
+
+    def register(self, dataset):
+        """Register a dataset and return its key in workers."""
+        for key, registered in self._datasets.items():
+            if registered is dataset:
+                return key
+        key = len(self._datasets)
+        self._datasets[key] = dataset
+        if self._pool is not None:
+            # workers only receive datasets when they start
+            self.close()
+            self.generation += 1
+        return key
+
+    def apply_async(self, func, args):
+        """Run `func(*args)` in a worker, starting workers on first use."""
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(
+                self.num_workers, initializer=_pool_initializer, initargs=[self._datasets])
+        return self._pool.apply_async(func, args)
+
+    def close(self):
+        """Terminate worker processes."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def __del__(self):
+        self.close()
+
+
+class _BatchBuffers(object):
+    """Pinned memory buffers recycled for batches of the same shapes.
+
+    Each array of a batch is copied into the oldest of `size` buffers of its position
+    and shape, so a returned batch is valid until `size` more batches are fetched.
+    The copy is ordered after pending reads of the buffer by the MXNet engine.
+    """
+    def __init__(self, ctx, size=2):
+        self._ctx = ctx
+        self._size = size
+        self._buffers = {}
+
+    def __call__(self, batch, path=()):
+        if isinstance(batch, nd.NDArray):
+            key = (path, batch.shape, batch.dtype)
+            if key not in self._buffers:
+                self._buffers[key] = collections.deque()
+            ring = self._buffers[key]
+            if len(ring) < self._size:
+                buf = nd.empty(batch.shape, ctx=self._ctx, dtype=batch.dtype)
+            else:
+                buf = ring.popleft()
+            ring.append(buf)
+            batch.copyto(buf)
+            return buf
+        if isinstance(batch, (list, tuple)):
+            return [self(b, path + (i,)) for i, b in enumerate(batch)]
+        return batch
+
+
+def _draw_schedule(num_fns, num_batches, interval):
+    """Index of the transform function of each batch, drawn once every `interval` batches."""
+    num_segments = (num_batches + interval - 1) // interval
+    return np.random.randint(num_fns, size=num_segments).repeat(interval)[:num_batches]
+
+
 class _RandomTransformMultiWorkerIter(_MultiWorkerIter):
-    """Internal multi-worker iterator for DataLoader."""
+    """Internal multi-worker iterator for DataLoader.
+
+    Batch `k` is transformed by `transform_fns[schedule[k]]`. With `bucket_prefetch`,
+    the first batches of the next `interval` are sent when the current one starts, so
+    workers build batches of the next shape before the switch.
+    """
     def __init__(self, transform_fns, interval, worker_pool, batchify_fn, batch_sampler,
-                 pin_memory=False, pin_device_id=0, worker_fn=_worker_fn, prefetch=0):
+                 pin_memory=False, pin_device_id=0, worker_fn=_worker_fn, prefetch=0,
+                 dataset_key=None, schedule=None, bucket_prefetch=0):
         super(_RandomTransformMultiWorkerIter, self).__init__(
             worker_pool, batchify_fn, batch_sampler, pin_memory=pin_memory,
             worker_fn=worker_fn, prefetch=0)
         self._transform_fns = transform_fns
-        self._current_fn = np.random.choice(self._transform_fns)
         self._interval = max(int(interval), 1)
         self._pin_device_id = pin_device_id
+        self._dataset_key = dataset_key
+        self._batches = list(self._iter)
+        if schedule is None:
+            schedule = _draw_schedule(len(transform_fns), len(self._batches), self._interval)
+        assert len(schedule) == len(self._batches), "schedule must cover all batches"
+        self.schedule = schedule
+        self._bucket_prefetch = max(0, int(bucket_prefetch))
+        # next batch in order, and batches sent ahead of it
+        self._next_idx = 0
+        self._early = set()
         # pre-fetch, super class was inited without prefetch
         for _ in range(prefetch):
             self._push_next()
 
+    def _send(self, idx):
+        args = (self._batches[idx], self._transform_fns[self.schedule[idx]], self._batchify_fn)
+        if self._dataset_key is not None:
+            args += (self._dataset_key,)
+        self._data_buffer[idx] = self._worker_pool.apply_async(self._worker_fn, args)
+        self._sent_idx += 1
+
     def _push_next(self):
         """Assign next batch workload to workers."""
-        r = next(self._iter, None)
-        if r is None:
+        while self._next_idx in self._early:
+            self._early.remove(self._next_idx)
+            self._prefetch_bucket(self._next_idx)
+            self._next_idx += 1
+        idx = self._next_idx
+        if idx >= len(self._batches):
+            self._on_sent_all()
             return
-        if self._sent_idx % self._interval == 0:
-            self._current_fn = np.random.choice(self._transform_fns)
-        async_ret = self._worker_pool.apply_async(
-            self._worker_fn, (r, self._current_fn, self._batchify_fn))
-        self._data_buffer[self._sent_idx] = async_ret
-        self._sent_idx += 1
+        self._send(idx)
+        self._prefetch_bucket(idx)
+        self._next_idx += 1
+
+    def _prefetch_bucket(self, idx):
+        """Send the first batches of the next interval when batch `idx` starts one."""
+        if not self._bucket_prefetch or idx % self._interval:
+            return
+        begin = idx + self._interval
+        for early in range(begin, min(begin + self._bucket_prefetch, len(self._batches))):
+            if early not in self._early:
+                self._send(early)
+                self._early.add(early)
+
+    def _on_sent_all(self):
+        """Called when all batches of the epoch are sent to workers."""
+
+
+class _PersistentWorkerIter(_RandomTransformMultiWorkerIter):
+    """Multi-worker iterator which sends the first batches of the next epoch to workers
+    while the current epoch finishes, and recycles pinned memory of batches."""
+    def __init__(self, loader, *args, **kwargs):
+        self._buffers = loader._buffers
+        self._stalls = loader.epoch_stalls
+        self.generation = getattr(loader._worker_pool, 'generation', 0)
+        self._first = True
+        # the next epoch is only prepared after this one is handed out
+        self._loader = None
+        super(_PersistentWorkerIter, self).__init__(*args, **kwargs)
+        self._loader = loader
+
+    def _on_sent_all(self):
+        loader, self._loader = self._loader, None
+        if loader is not None:
+            loader._next_iter = loader._make_iter()
+
+    def __next__(self):
+        tic = time.time()
+        self._push_next()
+        if self._rcvd_idx == self._sent_idx:
+            assert not self._data_buffer, "Data buffer should be empty at this moment"
+            raise StopIteration
+        ret = self._data_buffer.pop(self._rcvd_idx)
+        batch = pickle.loads(ret.get())
+        if self._buffers is not None:
+            batch = self._buffers(batch)
+        batch = batch[0] if len(batch) == 1 else batch
+        self._rcvd_idx += 1
+        if self._first:
+            self._first = False
+            self._stalls.append(time.time() - tic)
+        return batch
+
+    next = __next__
 
 
 class RandomTransformDataLoader(DataLoader):
@@ -239,11 +410,28 @@ class RandomTransformDataLoader(DataLoader):
         but will consume more shared_memory. Using smaller number may forfeit the purpose of using
         multiple worker processes, try reduce `num_workers` in this case.
         By default it defaults to `num_workers * 2`.
+    worker_pool : gluoncv.data.DataWorkerPool, optional
+        Worker processes shared with other loaders, e.g. of the validation set, in which
+        case `num_workers` is ignored. By default the loader starts its own workers.
+    persistent : bool, default is False
+        Keep the pipeline running across epochs: when all batches of an epoch are sent
+        to workers, the first `prefetch` batches of the next epoch are sent as well, so
+        the next epoch starts without waiting. With `pin_memory`, batches are copied into
+        recycled pinned buffers, and a batch is valid until two more are fetched.
+        The time waiting for the first batch of each epoch is appended to `epoch_stalls`.
+        Only works if there are workers.
+    bucket_prefetch : int, default is 0
+        The transform functions of an epoch are drawn when it starts. If `bucket_prefetch`
+        > 0, the first `bucket_prefetch` batches of the next `interval` are sent to workers
+        as soon as the current `interval` starts, in addition to `prefetch` batches, so
+        batches of a new shape are ready when the shape changes. Only works if
+        `num_workers` > 0.
 
     """
     def __init__(self, transform_fns, dataset, interval=1, batch_size=None, shuffle=False,
                  sampler=None, last_batch=None, batch_sampler=None, batchify_fn=None,
-                 num_workers=0, pin_memory=False, pin_device_id=0, prefetch=None):
+                 num_workers=0, pin_memory=False, pin_device_id=0, prefetch=None,
+                 worker_pool=None, persistent=False, bucket_prefetch=0):
         super(RandomTransformDataLoader, self).__init__(
             dataset=dataset, batch_size=batch_size, shuffle=shuffle, sampler=sampler,
             last_batch=last_batch, batch_sampler=batch_sampler, batchify_fn=batchify_fn,
@@ -255,12 +443,25 @@ class RandomTransformDataLoader(DataLoader):
         self._pin_device_id = pin_device_id
         self._num_workers = num_workers if num_workers >= 0 else 0
         self._worker_pool = None
-        self._prefetch = max(0, int(prefetch) if prefetch is not None else 2 * self._num_workers)
-        if self._num_workers > 0:
+        self._shared_pool = worker_pool is not None
+        self._dataset_key = None
+        if worker_pool is not None:
+            self._num_workers = worker_pool.num_workers
+            self._worker_pool = worker_pool
+            self._dataset_key = worker_pool.register(self._dataset)
+        elif self._num_workers > 0:
             self._worker_pool = multiprocessing.Pool(
                 self._num_workers, initializer=_worker_initializer, initargs=[self._dataset])
+        self._prefetch = max(0, int(prefetch) if prefetch is not None else 2 * self._num_workers)
+        self._persistent = persistent and self._num_workers > 0
+        self._bucket_prefetch = max(0, int(bucket_prefetch))
+        self._next_iter = None
+        self._buffers = None
+        if self._persistent and pin_memory:
+            self._buffers = _BatchBuffers(context.cpu_pinned(pin_device_id))
+        self.epoch_stalls = []
         if batchify_fn is None:
-            if num_workers > 0:
+            if self._num_workers > 0:
                 self._batchify_fn = default_mp_batchify_fn
             else:
                 self._batchify_fn = default_batchify_fn
@@ -270,20 +471,52 @@ class RandomTransformDataLoader(DataLoader):
     def __iter__(self):
         if self._num_workers == 0:
             def same_process_iter():
-                t = np.random.choice(self._transform_fns)
-                for ib, batch in enumerate(self._batch_sampler):
-                    if ib % self._interval == 0:
-                        t = np.random.choice(self._transform_fns)
+                batches = list(self._batch_sampler)
+                schedule = _draw_schedule(len(self._transform_fns), len(batches), self._interval)
+                for batch, ifn in zip(batches, schedule):
+                    t = self._transform_fns[ifn]
                     yield self._batchify_fn([self._dataset.transform(t)[idx] for idx in batch])
             return same_process_iter()
+        elif self._persistent:
+            it, self._next_iter = self._next_iter, None
+            if it is None or it.generation != getattr(self._worker_pool, 'generation', 0):
+                # not prepared by the previous epoch, or sent to restarted workers
+                it = self._make_iter()
+            return it
         else:
             return _RandomTransformMultiWorkerIter(
                 self._transform_fns, self._interval, self._worker_pool, self._batchify_fn,
                 self._batch_sampler, pin_memory=self._pin_memory, pin_device_id=self._pin_device_id,
-                worker_fn=_worker_fn, prefetch=self._prefetch)
+                worker_fn=_worker_fn, prefetch=self._prefetch, dataset_key=self._dataset_key,
+                bucket_prefetch=self._bucket_prefetch)
+
+    def _make_iter(self):
+        """Persistent iterator of an epoch, which sends the first batches immediately."""
+        return _PersistentWorkerIter(
+            self, self._transform_fns, self._interval, self._worker_pool, self._batchify_fn,
+            self._batch_sampler, pin_memory=False, pin_device_id=self._pin_device_id, worker_fn=_worker_fn, prefetch=self._prefetch,
+            dataset_key=self._dataset_key, bucket_prefetch=self._bucket_prefetch)
+
+    def warmup_batches(self):
+        """One batch of each transform function, transformed in this process.
+
+        Running the network on these batches before training, e.g. forward and backward
+        without updating parameters, lets a hybridized network plan memory and select
+        convolution algorithms of all input shapes at startup, instead of the first time
+        each shape is drawn during training.
+
+        Returns
+        -------
+        list
+            Batches in the order of `transform_fns`.
+
+        """
+        samples = next(iter(self._batch_sampler))
+        return [self._batchify_fn([self._dataset.transform(t)[idx] for idx in samples])
+                for t in self._transform_fns]
 
     def __del__(self):
-        if self._worker_pool:
+        if self._worker_pool and not self._shared_pool:
             # manually terminate due to a bug that pool is not automatically terminated
             assert isinstance(self._worker_pool, multiprocessing.pool.Pool)
             self._worker_pool.terminate()
@@ -6,6 +6,34 @@ import mxnet as mx
 from mxnet.gluon.data import Dataset
 
 
+def mix_images(img1, img2, lambd):
+    """Blend two uint8 images of any size on a canvas covering both.
+
+    Parameters
+    ----------
+    img1 : numpy.ndarray or mxnet.nd.NDArray
+        First image with shape (H1, W1, 3), weighted by `lambd`.
+    img2 : numpy.ndarray or mxnet.nd.NDArray
+        Second image with shape (H2, W2, 3), weighted by `1 - lambd`.
+    lambd : float
+        Mix ratio.
+
+    Returns
+    -------
+    numpy.ndarray
+        Mixed uint8 image with shape (max(H1, H2), max(W1, W2), 3).
+    """
+    img1 = img1.asnumpy() if isinstance(img1, mx.nd.NDArray) else img1
+    img2 = img2.asnumpy() if isinstance(img2, mx.nd.NDArray) else img2
+    h1, w1 = img1.shape[:2]
+    h2, w2 = img2.shape[:2]
+    mix = np.zeros((max(h1, h2), max(w1, w2), 3), dtype=np.float32)
+    np.multiply(img1, np.float32(lambd), out=mix[:h1, :w1], casting='unsafe')
+    part = mix[:h2, :w2]
+    part += img2 * np.float32(1. - lambd)
+    return mix.astype(np.uint8)
+
+
 class MixupDetection(Dataset):
     """Detection dataset wrapper that performs mixup for normal dataset.
 
@@ -19,12 +47,21 @@ class MixupDetection(Dataset):
         Use None to disable.
     *args : list
         Additional arguments for mixup random sampler.
+    in_batch : bool, default is False
+        Mix with the previous sample loaded by the same process instead of decoding a
+        random second image. A data loader worker loads a whole batch, so samples are
+        mixed within the batch, except the first one of each batch which is mixed with
+        the last one of the previous batch.
 
     """
-    def __init__(self, dataset, mixup=None, *args):
+    def __init__(self, dataset, mixup=None, *args, **kwargs):
         self._dataset = dataset
         self._mixup = mixup
         self._mixup_args = args
+        self._in_batch = kwargs.pop('in_batch', False)
+        if kwargs:
+            raise TypeError("Unexpected arguments {}".format(list(kwargs)))
+        self._previous = None
 
     def set_mixup(self, mixup=None, *args):
         """Set mixup random sampler, use None to disable.
@@ -41,6 +78,11 @@ class MixupDetection(Dataset):
         self._mixup = mixup
         self._mixup_args = args
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_previous'] = None
+        return state
+
     def __len__(self):
         return len(self._dataset)
 
@@ -53,22 +95,27 @@ class MixupDetection(Dataset):
         if self._mixup is not None:
             lambd = max(0, min(1, self._mixup(*self._mixup_args)))
 
+        if self._in_batch:
+            previous, self._previous = self._previous, (img1, label1)
+            if previous is None:
+                lambd = 1
+
         if lambd >= 1:
             weights1 = np.ones((label1.shape[0], 1))
             label1 = np.hstack((label1, weights1))
             return img1, label1
 
         # second image
-        idx2 = np.random.choice(np.delete(np.arange(len(self)), idx))
-        img2, label2 = self._dataset[idx2]
+        if self._in_batch:
+            img2, label2 = previous
+        else:
+            # any index but idx
+            idx2 = np.random.randint(len(self) - 1)
+            idx2 += idx2 >= idx
+            img2, label2 = self._dataset[idx2]
 
         # mixup two images
-        height = max(img1.shape[0], img2.shape[0])
-        width = max(img1.shape[1], img2.shape[1])
-        mix_img = mx.nd.zeros(shape=(height, width, 3), dtype='float32')
-        mix_img[:img1.shape[0], :img1.shape[1], :] = img1.astype('float32') * lambd
-        mix_img[:img2.shape[0], :img2.shape[1], :] += img2.astype('float32') * (1. - lambd)
-        mix_img = mix_img.astype('uint8')
+        mix_img = mx.nd.array(mix_images(img1, img2, lambd), dtype='uint8')
         y1 = np.hstack((label1, np.full((label1.shape[0], 1), lambd)))
         y2 = np.hstack((label2, np.full((label2.shape[0], 1), 1. - lambd)))
         mix_label = np.vstack((y1, y2))
@@ -5,8 +5,9 @@ import os
 import numpy as np
 import mxnet as mx
 from .utils import try_import_pycocotools
+from .index import COCOIndex
 from ..base import VisionDataset
-from ...utils.bbox import bbox_xywh_to_xyxy, bbox_clip_xyxy
+from ...utils.bbox import bbox_xywh_to_xyxy
 
 __all__ = ['COCODetection']
 
@@ -35,6 +36,9 @@ class COCODetection(VisionDataset):
         it will cause undefined behavior.
     use_crowd : bool, default is True
         Whether use boxes labeled as crowd instance.
+    cache_index : bool, default is True
+        Compile annotation files into :py:class:`gluoncv.data.mscoco.index.COCOIndex`
+        caches next to them once, and load the caches instead of parsing JSON later.
 
     """
     CLASSES = ['person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train',
@@ -53,13 +57,14 @@ class COCODetection(VisionDataset):
 
     def __init__(self, root=os.path.join('~', '.mxnet', 'datasets', 'coco'),
                  splits=('instances_val2017',), transform=None, min_object_area=0,
-                 skip_empty=True, use_crowd=True):
+                 skip_empty=True, use_crowd=True, cache_index=True):
         super(COCODetection, self).__init__(root)
         self._root = os.path.expanduser(root)
         self._transform = transform
         self._min_object_area = min_object_area
         self._skip_empty = skip_empty
         self._use_crowd = use_crowd
+        self._cache_index = cache_index
         if isinstance(splits, mx.base.string_types):
             splits = [splits]
         self._splits = splits
@@ -68,6 +73,7 @@ class COCODetection(VisionDataset):
         self.json_id_to_contiguous = None
         self.contiguous_id_to_json = None
         self._coco = []
+        self._anno_files = []
         self._items, self._labels = self._load_jsons()
 
     def __str__(self):
@@ -76,13 +82,18 @@ class COCODetection(VisionDataset):
 
     @property
     def coco(self):
-        """Return pycocotools object for evaluation purposes."""
-        if not self._coco:
+        """Return pycocotools object for evaluation purposes, loaded on first use."""
+        if not self._anno_files:
             raise ValueError("No coco objects found, dataset not initialized.")
-        elif len(self._coco) > 1:
+        elif len(self._anno_files) > 1:
             raise NotImplementedError(
                 "Currently we don't support evaluating {} JSON files. \
-                Please use single JSON dataset and evaluate one by one".format(len(self._coco)))
+                Please use single JSON dataset and evaluate one by one".format(len(self._anno_files)))
+        if not self._coco:
+            # lazy import pycocotools
+            try_import_pycocotools()
+            from pycocotools.coco import COCO
+            self._coco.append(COCO(self._anno_files[0]))
         return self._coco[0]
 
     @property
@@ -133,19 +144,16 @@ class COCODetection(VisionDataset):
         """Load all image paths and labels from JSON annotation files into buffer."""
         items = []
         labels = []
-        # lazy import pycocotools
-        try_import_pycocotools()
-        from pycocotools.coco import COCO
         for split in self._splits:
             anno = os.path.join(self._root, self.annotation_dir, split) + '.json'
-            _coco = COCO(anno)
-            self._coco.append(_coco)
-            classes = [c['name'] for c in _coco.loadCats(_coco.getCatIds())]
+            index = COCOIndex(anno, cache=self._cache_index)
+            self._anno_files.append(anno)
+            classes = index.cat_names.tolist()
             if not classes == self.classes:
                 raise ValueError("Incompatible category names with COCO: ")
             assert classes == self.classes
             json_id_to_contiguous = {
-                v: k for k, v in enumerate(_coco.getCatIds())}
+                v: k for k, v in enumerate(index.cat_ids.tolist())}
             if self.json_id_to_contiguous is None:
                 self.json_id_to_contiguous = json_id_to_contiguous
                 self.contiguous_id_to_json = {
@@ -153,45 +161,46 @@ class COCODetection(VisionDataset):
             else:
                 assert self.json_id_to_contiguous == json_id_to_contiguous
 
-            # iterate through the annotations
-            image_ids = sorted(_coco.getImgIds())
-            for entry in _coco.loadImgs(image_ids):
-                abs_path = self._parse_image_path(entry)
-                if not os.path.exists(abs_path):
-                    raise IOError('Image: {} not exists.'.format(abs_path))
-                label = self._check_load_bbox(_coco, entry)
-                if not label:
-                    continue
+            # iterate through the images, sorted by id
+            objs, valid = self._check_load_bbox(index)
+            dirs = set()
+            for i in range(index.num_images):
+                abs_path = self._parse_image_path(index.entry(i))
+                dirname = os.path.dirname(abs_path)
+                if dirname not in dirs:
+                    if not os.path.isdir(dirname):
+                        raise IOError('Image dir: {} not exists.'.format(dirname))
+                    dirs.add(dirname)
+                begin, end = index.ann_offsets[i], index.ann_offsets[i + 1]
+                label = objs[np.nonzero(valid[begin:end])[0] + begin]
+                if not len(label):
+                    if self._skip_empty:
+                        continue
+                    # dummy invalid labels if no valid objects are found
+                    label = -np.ones((1, 5))
                 items.append(abs_path)
                 labels.append(label)
         return items, labels
 
-    def _check_load_bbox(self, coco, entry):
-        """Check and load ground-truth labels"""
-        entry_id = entry['id']
-        # fix pycocotools _isArrayLike which don't work for str in python3
-        entry_id = [entry_id] if not isinstance(entry_id, (list, tuple)) else entry_id
-        ann_ids = coco.getAnnIds(imgIds=entry_id, iscrowd=None)
-        objs = coco.loadAnns(ann_ids)
-        # check valid bboxes
-        valid_objs = []
-        width = entry['width']
-        height = entry['height']
-        for obj in objs:
-            if obj['area'] < self._min_object_area:
-                continue
-            if obj.get('ignore', 0) == 1:
-                continue
-            if not self._use_crowd and obj.get('iscrowd', 0):
-                continue
-            # convert from (x, y, w, h) to (xmin, ymin, xmax, ymax) and clip bound
-            xmin, ymin, xmax, ymax = bbox_clip_xyxy(bbox_xywh_to_xyxy(obj['bbox']), width, height)
-            # require non-zero box area
-            if obj['area'] > 0 and xmax > xmin and ymax > ymin:
-                contiguous_cid = self.json_id_to_contiguous[obj['category_id']]
-                valid_objs.append([xmin, ymin, xmax, ymax, contiguous_cid])
-        if not valid_objs:
-            if not self._skip_empty:
-                # dummy invalid labels if no valid objects are found
-                valid_objs.append([-1, -1, -1, -1, -1])
-        return valid_objs
+    def _check_load_bbox(self, index):
+        """Check ground-truth labels of all annotations.
+
+        Returns labels with shape (A, 5) of :math:`(x_{min}, y_{min}, x_{max}, y_{max}, cls)`
+        and whether each annotation is valid.
+        """
+        img = np.repeat(np.arange(index.num_images), np.diff(index.ann_offsets))
+        # convert from (x, y, w, h) to (xmin, ymin, xmax, ymax) and clip bound
+        xyxy = bbox_xywh_to_xyxy(index.bboxes)
+        width, height = index.widths[img], index.heights[img]
+        xmin = np.minimum(width - 1, np.maximum(0, xyxy[:, 0]))
+        ymin = np.minimum(height - 1, np.maximum(0, xyxy[:, 1]))
+        xmax = np.minimum(width - 1, np.maximum(0, xyxy[:, 2]))
+        ymax = np.minimum(height - 1, np.maximum(0, xyxy[:, 3]))
+        valid = (index.areas >= self._min_object_area) & (index.ignore != 1)
+        if not self._use_crowd:
+            valid &= index.iscrowd == 0
+        # require non-zero box area
+        valid &= (index.areas > 0) & (xmax > xmin) & (ymax > ymin)
+        cids = [self.json_id_to_contiguous.get(c, -1) for c in index.category_ids.tolist()]
+        objs = np.stack((xmin, ymin, xmax, ymax, np.array(cids, dtype=np.float64)), axis=1)
+        return objs, valid
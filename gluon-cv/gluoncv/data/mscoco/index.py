@@ -0,0 +1,151 @@
+"""Compiled index of MS COCO annotation files."""
+from __future__ import absolute_import
+from __future__ import division
+import os
+import json
+import hashlib
+import warnings
+from itertools import chain
+import numpy as np
+
+__all__ = ['COCOIndex']
+
+_VERSION = 1
+
+
+def _file_sha1(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class COCOIndex(object):
+    """Images, boxes, classes and polygons of a COCO annotation file as flat arrays.
+
+    Parsing the JSON file is the slowest part of constructing COCO datasets, so the
+    index is compiled once per annotation file and saved as a `.npz` file, which later
+    runs load instead. The cache records size, modification time and SHA-1 of the JSON
+    file: it is used if size and time match, or if only the time changed but the hash
+    still matches, and compiled again otherwise.
+
+    Images are sorted by id, same as `sorted(coco.getImgIds())`. Annotations are grouped
+    by image in the order of the JSON file, same as `coco.getAnnIds(imgIds=...)`, and
+    annotations of image `i` are `ann_offsets[i]:ann_offsets[i + 1]`. Polygons are
+    flattened to `vertices`: polygons of annotation `j` are
+    `seg_offsets[j]:seg_offsets[j + 1]`, and polygon `k` has the values
+    `vertices[poly_offsets[k]:poly_offsets[k + 1]]`, :math:`x_0, y_0, x_1, y_1, ...`.
+
+    Parameters
+    ----------
+    anno_file : str
+        Path of the JSON annotation file.
+    cache : bool, default is True
+        Load and save the compiled index. Otherwise it is compiled in memory.
+    cache_dir : str, optional
+        Directory of the cache, default is the directory of `anno_file`. If it is not
+        writable, the index is compiled in memory with a warning.
+
+    """
+    ARRAYS = ('image_ids', 'widths', 'heights', 'file_names', 'coco_urls', 'ann_offsets',
+              'bboxes', 'areas', 'category_ids', 'iscrowd', 'ignore', 'is_rle',
+              'seg_offsets', 'poly_offsets', 'vertices', 'cat_ids', 'cat_names')
+
+    def __init__(self, anno_file, cache=True, cache_dir=None):
+        self.anno_file = anno_file
+        self.cache_file = None
+        if cache:
+            stem = os.path.splitext(os.path.basename(anno_file))[0] + '.index.npz'
+            cache_dir = os.path.dirname(anno_file) if cache_dir is None else cache_dir
+            self.cache_file = os.path.join(os.path.expanduser(cache_dir), stem)
+        arrays = self._load()
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        # polygons are views of the vertices, which must not be changed in place
+        self.vertices.flags.writeable = False
+
+    @property
+    def num_images(self):
+        """Number of images."""
+        return len(self.image_ids)
+
+    def entry(self, idx):
+        """Image entry `idx` with the fields of COCO image entries used by datasets."""
+        return {'id': int(self.image_ids[idx]), 'width': int(self.widths[idx]),
+                'height': int(self.heights[idx]), 'file_name': str(self.file_names[idx]),
+                'coco_url': str(self.coco_urls[idx])}
+
+    def polygons(self, ann):
+        """Polygons of annotation `ann` as flat views of `vertices`."""
+        offsets = self.poly_offsets[self.seg_offsets[ann]:self.seg_offsets[ann + 1] + 1]
+        return [self.vertices[b:e] for b, e in zip(offsets[:-1], offsets[1:])]
+
+    def _source_meta(self):
+        stat = os.stat(self.anno_file)
+        return stat.st_size, int(stat.st_mtime * 1e6)
+
+    def _load(self):
+        if self.cache_file is None:
+            return self._compile()
+        size, mtime = self._source_meta()
+        if os.path.isfile(self.cache_file):
+            with np.load(self.cache_file) as f:
+                meta = f['meta']
+                valid = int(meta[0]) == _VERSION and int(meta[1]) == size
+                if valid and int(meta[2]) != mtime:
+                    valid = str(f['sha1']) == _file_sha1(self.anno_file)
+                if valid:
+                    return {name: f[name] for name in self.ARRAYS}
+        arrays = self._compile()
+        try:
+            # write to a temporary file and rename, so an interrupted write is not used
+            tmp = '{}.{}.tmp'.format(self.cache_file, os.getpid())
+            with open(tmp, 'wb') as f:
+                np.savez(f, meta=np.array([_VERSION, size, mtime], dtype=np.int64),
+                         sha1=np.array(_file_sha1(self.anno_file)), **arrays)
+            os.rename(tmp, self.cache_file)
+        except (IOError, OSError) as e:
+            warnings.warn('Cannot save COCO index {}: {}'.format(self.cache_file, e))
+        return arrays
+
+    def _compile(self):
+        with open(self.anno_file) as f:
+            dataset = json.load(f)
+        images = sorted(dataset.get('images', []), key=lambda x: x['id'])
+        position = {img['id']: i for i, img in enumerate(images)}
+        anns = [a for a in dataset.get('annotations', []) if a['image_id'] in position]
+        ann_images = np.array([position[a['image_id']] for a in anns], dtype=np.int64)
+        order = np.argsort(ann_images, kind='stable')
+        anns = [anns[i] for i in order]
+        ann_offsets = np.zeros((len(images) + 1,), dtype=np.int64)
+        np.cumsum(np.bincount(ann_images, minlength=len(images)), out=ann_offsets[1:])
+
+        segms = [a.get('segmentation', []) for a in anns]
+        polys = [s if isinstance(s, list) else [] for s in segms]
+        seg_offsets = np.zeros((len(anns) + 1,), dtype=np.int64)
+        np.cumsum([len(p) for p in polys], out=seg_offsets[1:])
+        poly_lengths = [len(p) for p in chain.from_iterable(polys)]
+        poly_offsets = np.zeros((len(poly_lengths) + 1,), dtype=np.int64)
+        np.cumsum(poly_lengths, out=poly_offsets[1:])
+        vertices = np.fromiter(chain.from_iterable(chain.from_iterable(polys)),
+                               dtype=np.float32, count=int(poly_offsets[-1]))
+        cats = dataset.get('categories', [])
+        return {
+            'image_ids': np.array([img['id'] for img in images], dtype=np.int64),
+            'widths': np.array([img['width'] for img in images], dtype=np.int64),
+            'heights': np.array([img['height'] for img in images], dtype=np.int64),
+            'file_names': np.array([img.get('file_name', '') for img in images], dtype=np.str_),
+            'coco_urls': np.array([img.get('coco_url', '') for img in images], dtype=np.str_),
+            'ann_offsets': ann_offsets,
+            'bboxes': np.array([a['bbox'] for a in anns], dtype=np.float64).reshape(-1, 4),
+            'areas': np.array([a['area'] for a in anns], dtype=np.float64),
+            'category_ids': np.array([a['category_id'] for a in anns], dtype=np.int64),
+            'iscrowd': np.array([a.get('iscrowd', 0) for a in anns], dtype=np.int64),
+            'ignore': np.array([a.get('ignore', 0) for a in anns], dtype=np.int64),
+            'is_rle': np.array([not isinstance(s, list) for s in segms], dtype=np.bool_),
+            'seg_offsets': seg_offsets,
+            'poly_offsets': poly_offsets,
+            'vertices': vertices,
+            'cat_ids': np.array([c['id'] for c in cats], dtype=np.int64),
+            'cat_names': np.array([c['name'] for c in cats], dtype=np.str_)}
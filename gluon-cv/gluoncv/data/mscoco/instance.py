@@ -5,6 +5,7 @@ import os
 import numpy as np
 import mxnet as mx
 from .utils import try_import_pycocotools
+from .index import COCOIndex
 from ..base import VisionDataset
 
 __all__ = ['COCOInstance']
@@ -32,6 +33,9 @@ class COCOInstance(VisionDataset):
     skip_empty : bool, default is True
         Whether skip images with no valid object. This should be `True` in training, otherwise
         it will cause undefined behavior.
+    cache_index : bool, default is True
+        Compile annotation files into :py:class:`gluoncv.data.mscoco.index.COCOIndex`
+        caches next to them once, and load the caches instead of parsing JSON later.
 
     """
     CLASSES = ['person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train',
@@ -50,12 +54,13 @@ class COCOInstance(VisionDataset):
 
     def __init__(self, root=os.path.join('~', '.mxnet', 'datasets', 'coco'),
                  splits=('instances_val2017',), transform=None, min_object_area=1,
-                 skip_empty=True):
+                 skip_empty=True, cache_index=True):
         super(COCOInstance, self).__init__(root)
         self._root = os.path.expanduser(root)
         self._transform = transform
         self._min_object_area = min_object_area
         self._skip_empty = skip_empty
+        self._cache_index = cache_index
         if isinstance(splits, mx.base.string_types):
             splits = [splits]
         self._splits = splits
@@ -64,6 +69,7 @@ class COCOInstance(VisionDataset):
         self.json_id_to_contiguous = None
         self.contiguous_id_to_json = None
         self._coco = []
+        self._anno_files = []
         self._items, self._labels, self._segms = self._load_jsons()
         # print(self._items)
 
@@ -73,12 +79,17 @@ class COCOInstance(VisionDataset):
 
     @property
     def coco(self):
-        """Return pycocotools object for evaluation purposes."""
-        if not self._coco:
+        """Return pycocotools object for evaluation purposes, loaded on first use."""
+        if not self._anno_files:
             raise ValueError("No coco objects found, dataset not initialized.")
-        elif len(self._coco) > 1:
+        elif len(self._anno_files) > 1:
             raise NotImplementedError(
-                "Currently we don't support evaluating {} JSON files".format(len(self._coco)))
+                "Currently we don't support evaluating {} JSON files".format(len(self._anno_files)))
+        if not self._coco:
+            # lazy import pycocotools
+            try_import_pycocotools()
+            from pycocotools.coco import COCO
+            self._coco.append(COCO(self._anno_files[0]))
         return self._coco[0]
 
     @property
@@ -103,19 +114,16 @@ class COCOInstance(VisionDataset):
         items = []
         labels = []
         segms = []
-        # lazy import pycocotools
-        try_import_pycocotools()
-        from pycocotools.coco import COCO
         for split in self._splits:
             anno = os.path.join(self._root, 'annotations', split) + '.json'
-            _coco = COCO(anno)
-            self._coco.append(_coco)
-            classes = [c['name'] for c in _coco.loadCats(_coco.getCatIds())]
+            index = COCOIndex(anno, cache=self._cache_index)
+            self._anno_files.append(anno)
+            classes = index.cat_names.tolist()
             if not classes == self.classes:
                 raise ValueError("Incompatible category names with COCO: ")
             assert classes == self.classes
             json_id_to_contiguous = {
-                v: k for k, v in enumerate(_coco.getCatIds())}
+                v: k for k, v in enumerate(index.cat_ids.tolist())}
             if self.json_id_to_contiguous is None:
                 self.json_id_to_contiguous = json_id_to_contiguous
                 self.contiguous_id_to_json = {
@@ -123,61 +131,57 @@ class COCOInstance(VisionDataset):
             else:
                 assert self.json_id_to_contiguous == json_id_to_contiguous
 
-            # iterate through the annotations
-            image_ids = sorted(_coco.getImgIds())
-            for entry in _coco.loadImgs(image_ids):
+            # iterate through the images, sorted by id
+            objs, valid = self._check_load_bbox(index)
+            dirs = set()
+            for i in range(index.num_images):
+                entry = index.entry(i)
                 dirname, filename = entry['coco_url'].split('/')[-2:]
-                abs_path = os.path.join(self._root, dirname, filename)
-                if not os.path.exists(abs_path):
-                    raise IOError('Image: {} not exists.'.format(abs_path))
-                label, segm = self._check_load_bbox(_coco, entry)
+                if dirname not in dirs:
+                    if not os.path.isdir(os.path.join(self._root, dirname)):
+                        raise IOError('Image dir: {} not exists.'.format(
+                            os.path.join(self._root, dirname)))
+                    dirs.add(dirname)
+                begin, end = index.ann_offsets[i], index.ann_offsets[i + 1]
+                inds = np.nonzero(valid[begin:end])[0] + begin
                 # skip images without objects
-                if self._skip_empty and label is None:
+                if self._skip_empty and not len(inds):
+                    continue
+                items.append(os.path.join(self._root, dirname, filename))
+                if not len(inds):
+                    # there is no easy way to return a polygon placeholder: None is returned
+                    # in validation, None cannot be used for batchify -> drop label in transform
+                    labels.append(None)
+                    segms.append(None)
                     continue
-                items.append(abs_path)
-                labels.append(label)
-                segms.append(segm)
+                labels.append(objs[inds])
+                segms.append([[p.reshape(-1, 2) for p in index.polygons(j) if len(p) >= 6]
+                              for j in inds])
         return items, labels, segms
 
-    def _check_load_bbox(self, coco, entry):
-        """Check and load ground-truth labels"""
-        ann_ids = coco.getAnnIds(imgIds=entry['id'], iscrowd=None)
-        objs = coco.loadAnns(ann_ids)
-        # check valid bboxes
-        valid_objs = []
-        valid_segs = []
-        width = entry['width']
-        height = entry['height']
-        for obj in objs:
-            if obj.get('ignore', 0) == 1:
-                continue
-            # crowd objs cannot be used for segmentation
-            if obj.get('iscrowd', 0) == 1:
-                continue
-            # need accurate floating point box representation
-            x1, y1, w, h = obj['bbox']
-            x2, y2 = x1 + np.maximum(0, w), y1 + np.maximum(0, h)
-            # clip to image boundary
-            x1 = np.minimum(width, np.maximum(0, x1))
-            y1 = np.minimum(height, np.maximum(0, y1))
-            x2 = np.minimum(width, np.maximum(0, x2))
-            y2 = np.minimum(height, np.maximum(0, y2))
-            # require non-zero seg area and more than 1x1 box size
-            if obj['area'] > self._min_object_area and x2 > x1 and y2 > y1 \
-                    and (x2 - x1) * (y2 - y1) >= 4:
-                contiguous_cid = self.json_id_to_contiguous[obj['category_id']]
-                valid_objs.append([x1, y1, x2, y2, contiguous_cid])
-
-                segs = obj['segmentation']
-                assert isinstance(segs, list), '{}'.format(obj.get('iscrowd', 0))
-                valid_segs.append([np.asarray(p).reshape(-1, 2).astype('float32')
-                                   for p in segs if len(p) >= 6])
-        # there is no easy way to return a polygon placeholder: None is returned
-        # in validation, None cannot be used for batchify -> drop label in transform
-        # in training: empty images should be be skipped
-        if not valid_objs:
-            valid_objs = None
-            valid_segs = None
-        else:
-            valid_objs = np.asarray(valid_objs).astype('float32')
-        return valid_objs, valid_segs
+    def _check_load_bbox(self, index):
+        """Check ground-truth labels of all annotations.
+
+        Returns labels with shape (A, 5) of :math:`(x_{min}, y_{min}, x_{max}, y_{max}, cls)`
+        and whether each annotation is valid.
+        """
+        x1, y1 = index.bboxes[:, 0], index.bboxes[:, 1]
+        # need accurate floating point box representation
+        x2 = x1 + np.maximum(0, index.bboxes[:, 2])
+        y2 = y1 + np.maximum(0, index.bboxes[:, 3])
+        # clip to image boundary
+        img = np.repeat(np.arange(index.num_images), np.diff(index.ann_offsets))
+        width, height = index.widths[img], index.heights[img]
+        x1 = np.minimum(width, np.maximum(0, x1))
+        y1 = np.minimum(height, np.maximum(0, y1))
+        x2 = np.minimum(width, np.maximum(0, x2))
+        y2 = np.minimum(height, np.maximum(0, y2))
+        # crowd objs cannot be used for segmentation,
+        # require non-zero seg area and more than 1x1 box size
+        valid = (index.ignore != 1) & (index.iscrowd != 1) & \
+            (index.areas > self._min_object_area) & (x2 > x1) & (y2 > y1) & \
+            ((x2 - x1) * (y2 - y1) >= 4)
+        assert not np.any(valid & index.is_rle), 'segmentation of non-crowd objects must be polygons'
+        cids = [self.json_id_to_contiguous.get(c, -1) for c in index.category_ids.tolist()]
+        objs = np.stack((x1, y1, x2, y2, np.array(cids, dtype=np.float64)), axis=1)
+        return objs.astype('float32'), valid
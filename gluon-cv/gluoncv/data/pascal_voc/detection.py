@@ -11,6 +11,7 @@ except ImportError:
     import xml.etree.ElementTree as ET
 import mxnet as mx
 from ..base import VisionDataset
+from ..cache.labels import SharedLabelCache
 
 
 class VOCDetection(VisionDataset):
@@ -40,7 +41,8 @@ class VOCDetection(VisionDataset):
         If True, then parse and load all labels into memory during
         initialization. It often accelerate speed but require more memory
         usage. Typical preloaded labels took tens of MB. You only need to disable it
-        when your dataset is extremely large.
+        when your dataset is extremely large. Labels are kept in a
+        :py:class:`gluoncv.data.SharedLabelCache`, which is shared with data loader workers.
     """
     CLASSES = ('aeroplane', 'bicycle', 'bird', 'boat', 'bottle', 'bus', 'car',
                'cat', 'chair', 'cow', 'diningtable', 'dog', 'horse', 'motorbike',
@@ -157,7 +159,7 @@ class VOCDetection(VisionDataset):
     def _preload_labels(self):
         """Preload all labels into memory."""
         logging.debug("Preloading %s labels into memory...", str(self))
-        return [self._load_label(idx) for idx in range(len(self))]
+        return SharedLabelCache([self._load_label(idx) for idx in range(len(self))])
 
 
 class coco_pretrain_Detection(VisionDataset):
@@ -186,7 +188,8 @@ class coco_pretrain_Detection(VisionDataset):
         If True, then parse and load all labels into memory during
         initialization. It often accelerate speed but require more memory
         usage. Typical preloaded labels took tens of MB. You only need to disable it
-        when your dataset is extremely large.
+        when your dataset is extremely large. Labels are kept in a
+        :py:class:`gluoncv.data.SharedLabelCache`, which is shared with data loader workers.
     """
     CLASSES = ('airplane', 'bicycle', 'bird', 'boat', 'bottle', 'bus', 'car',
                'cat', 'chair', 'cow', 'dining table', 'dog', 'horse', 'motorcycle',
@@ -300,7 +303,7 @@ class coco_pretrain_Detection(VisionDataset):
     def _preload_labels(self):
         """Preload all labels into memory."""
         logging.debug("Preloading %s labels into memory...", str(self))
-        return [self._load_label(idx) for idx in range(len(self))]
+        return SharedLabelCache([self._load_label(idx) for idx in range(len(self))])
 
 
 class VOC_Val_Detection(VisionDataset):
@@ -330,7 +333,8 @@ class VOC_Val_Detection(VisionDataset):
         If True, then parse and load all labels into memory during
         initialization. It often accelerate speed but require more memory
         usage. Typical preloaded labels took tens of MB. You only need to disable it
-        when your dataset is extremely large.
+        when your dataset is extremely large. Labels are kept in a
+        :py:class:`gluoncv.data.SharedLabelCache`, which is shared with data loader workers.
     """
     CLASSES = ('aeroplane', 'bicycle', 'bird', 'boat', 'bottle', 'bus', 'car',
                'cat', 'chair', 'cow', 'diningtable', 'dog', 'horse', 'motorbike',
@@ -465,7 +469,7 @@ class VOC_Val_Detection(VisionDataset):
     def _preload_labels(self):
         """Preload all labels into memory."""
         logging.debug("Preloading %s labels into memory...", str(self))
-        return [self._load_label(idx) for idx in range(len(self))]
+        return SharedLabelCache([self._load_label(idx) for idx in range(len(self))])
 
 
 class cocoDetection(VisionDataset):
@@ -495,7 +499,8 @@ class cocoDetection(VisionDataset):
         If True, then parse and load all labels into memory during
         initialization. It often accelerate speed but require more memory
         usage. Typical preloaded labels took tens of MB. You only need to disable it
-        when your dataset is extremely large.
+        when your dataset is extremely large. Labels are kept in a
+        :py:class:`gluoncv.data.SharedLabelCache`, which is shared with data loader workers.
     """
     CLASSES = ('person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus',
                 'train', 'truck', 'boat', 'traffic light', 'fire hydrant',
@@ -628,5 +633,5 @@ class cocoDetection(VisionDataset):
     def _preload_labels(self):
         """Preload all labels into memory."""
         logging.debug("Preloading %s labels into memory...", str(self))
-        return [self._load_label(idx) for idx in range(len(self))]
+        return SharedLabelCache([self._load_label(idx) for idx in range(len(self))])
 
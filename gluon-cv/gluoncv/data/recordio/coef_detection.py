@@ -0,0 +1,151 @@
+"""Detection dataset with coefficient labels from sharded RecordIO files."""
+from __future__ import absolute_import
+from __future__ import division
+import os
+import json
+import bisect
+import numpy as np
+import mxnet as mx
+from ..base import VisionDataset
+
+__all__ = ['RecordFileCoefDetection', 'pack_coef_records']
+
+# number of rows and columns of the label, stored before the label
+_SHAPE_BYTES = 8
+
+
+def _shard_prefixes(prefix, num_shards):
+    if num_shards == 1:
+        return [prefix]
+    return ['{}-{:05d}'.format(prefix, i) for i in range(num_shards)]
+
+
+def _encode(label, img_bytes):
+    label = np.asarray(label, dtype=np.float64)
+    if label.ndim != 2:
+        label = label.reshape(len(label), -1) if label.size else label.reshape(0, 0)
+    shape = np.array(label.shape, dtype=np.int32)
+    return shape.tobytes() + label.tobytes() + img_bytes
+
+
+def _decode(payload):
+    rows, cols = np.frombuffer(payload[:_SHAPE_BYTES], dtype=np.int32)
+    end = _SHAPE_BYTES + 8 * rows * cols
+    label = np.frombuffer(payload[_SHAPE_BYTES:end], dtype=np.float64).reshape(rows, cols)
+    return label.copy(), payload[end:]
+
+
+def pack_coef_records(dataset, prefix, num_shards=1, image_paths=None):
+    """Pack images and labels of a detection dataset into sharded record files.
+
+    Images are stored as the original encoded files, labels as float64 rows of any
+    width, e.g. box, coefficients, class, difficult, width, height and image id, so
+    records are read back exactly as the dataset returns them.
+
+    Parameters
+    ----------
+    dataset : VisionDataset
+        Dataset whose `_items`, `_image_path` and labels are used, e.g.
+        :py:class:`gluoncv.data.VOCDetection` or :py:class:`gluoncv.data.VOC_Val_Detection`.
+    prefix : str
+        Output prefix, shards are written to `prefix-00000.rec/.idx`, ...
+        or `prefix.rec/.idx` for a single shard.
+    num_shards : int, default is 1
+        Number of shards. Images are assigned to shards in contiguous ranges.
+    image_paths : list of str, optional
+        Image file of each sample, default is derived from the dataset.
+
+    Returns
+    -------
+    int
+        Number of packed records.
+    """
+    num = len(dataset)
+    if image_paths is None:
+        image_paths = [dataset._image_path.format(*item) for item in dataset._items]
+    cache = getattr(dataset, '_label_cache', None)
+    bounds = np.linspace(0, num, num_shards + 1).astype(int)
+    counts = []
+    for shard, shard_prefix in enumerate(_shard_prefixes(prefix, num_shards)):
+        record = mx.recordio.MXIndexedRecordIO(shard_prefix + '.idx', shard_prefix + '.rec', 'w')
+        for key, idx in enumerate(range(bounds[shard], bounds[shard + 1])):
+            label = cache[idx] if cache else dataset._load_label(idx)
+            with open(image_paths[idx], 'rb') as f:
+                img_bytes = f.read()
+            header = mx.recordio.IRHeader(0, 0, idx, 0)
+            record.write_idx(key, mx.recordio.pack(header, _encode(label, img_bytes)))
+        record.close()
+        counts.append(int(bounds[shard + 1] - bounds[shard]))
+    with open(prefix + '.json', 'w') as f:
+        json.dump({'classes': list(dataset.classes), 'num_shards': num_shards,
+                   'counts': counts}, f)
+    return num
+
+
+class RecordFileCoefDetection(VisionDataset):
+    """Detection dataset with variable width labels, loaded from sharded record files.
+
+    Written by :py:func:`pack_coef_records`. Each record holds the encoded image and
+    its label rows in the same layout as the packed dataset, so transforms such as
+    `YOLO3DefaultTrainTransform` and `YOLO3DefaultValTransform` apply unchanged.
+    Samples are indexed globally across shards, so a shuffled sampler reads from all
+    shards at random. Record files are opened lazily in each process.
+
+    Parameters
+    ----------
+    prefix : str
+        Prefix given to :py:func:`pack_coef_records`.
+    transform : callable, default None
+        A function that takes data and label and transforms them.
+
+    """
+    def __init__(self, prefix, transform=None):
+        prefix = os.path.abspath(os.path.expanduser(prefix))
+        if not os.path.isfile(prefix + '.json'):
+            raise OSError('{}.json is not found. Did you forget to pack the split with '
+                          '`pack_coef_records`?'.format(prefix))
+        super(RecordFileCoefDetection, self).__init__(os.path.dirname(prefix))
+        with open(prefix + '.json') as f:
+            meta = json.load(f)
+        self._prefix = prefix
+        self._transform = transform
+        self._classes = tuple(meta['classes'])
+        self._shards = _shard_prefixes(prefix, meta['num_shards'])
+        self._starts = np.cumsum([0] + meta['counts']).tolist()
+        self._records = None
+        self._pid = None
+
+    def __str__(self):
+        return self.__class__.__name__ + '(' + self._prefix + ')'
+
+    @property
+    def classes(self):
+        """Category names."""
+        return self._classes
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def _open(self):
+        if self._records is None or self._pid != os.getpid():
+            self._records = [mx.recordio.MXIndexedRecordIO(p + '.idx', p + '.rec', 'r')
+                             for p in self._shards]
+            self._pid = os.getpid()
+        return self._records
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        shard = bisect.bisect_right(self._starts, idx) - 1
+        record = self._open()[shard].read_idx(idx - self._starts[shard])
+        _, payload = mx.recordio.unpack(record)
+        label, img_bytes = _decode(payload)
+        img = mx.image.imdecode(img_bytes, 1)
+        if self._transform is not None:
+            return self._transform(img, label)
+        return img, label
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_records'] = None
+        return state
@@ -0,0 +1,52 @@
+"""Samplers for data parallel training."""
+from __future__ import division
+import numpy as np
+from mxnet.gluon.data import Sampler
+
+__all__ = ['SplitSampler']
+
+
+class SplitSampler(Sampler):
+    """Sample one part of the indices of a dataset, e.g. for one of several processes.
+
+    Every epoch all parts shuffle the indices with the same seed and take every
+    `num_parts`-th of them, so the parts are disjoint and cover the dataset. Indices
+    wrap around to give every part the same length, so processes synchronizing each
+    iteration run the same number of iterations.
+
+    Parameters
+    ----------
+    length : int
+        Number of samples in the dataset.
+    num_parts : int, default is 1
+        Number of parts, e.g. number of processes.
+    part_index : int, default is 0
+        Index of this part, e.g. rank of this process.
+    shuffle : bool, default is True
+        Whether to shuffle indices every epoch.
+    seed : int, default is 0
+        Seed of the shuffling, which must be the same for all parts.
+
+    """
+    def __init__(self, length, num_parts=1, part_index=0, shuffle=True, seed=0):
+        assert 0 <= part_index < num_parts, "part_index {} not in [0, {})".format(
+            part_index, num_parts)
+        self._length = length
+        self._num_parts = num_parts
+        self._part_index = part_index
+        self._shuffle = shuffle
+        self._seed = seed
+        self._epoch = 0
+        self._part_len = (length + num_parts - 1) // num_parts
+
+    def __iter__(self):
+        indices = np.arange(self._length)
+        if self._shuffle:
+            np.random.RandomState(self._seed + self._epoch).shuffle(indices)
+        self._epoch += 1
+        pad = self._part_len * self._num_parts - self._length
+        indices = np.concatenate([indices, indices[:pad]])
+        return iter(indices[self._part_index::self._num_parts].tolist())
+
+    def __len__(self):
+        return self._part_len
@@ -5,5 +5,6 @@ from . import bbox
 from . import image
 from . import experimental
 from . import mask
+from . import coef
 from . import presets
 from .block import RandomCrop
@@ -0,0 +1,196 @@
+"""Dictionary coefficients of instance masks and their transforms in coefficient space."""
+from __future__ import division
+import numpy as np
+import cv2 as cv
+
+__all__ = ['rasterize', 'encode', 'flip_matrix', 'flip', 'reconstruct', 'flip_iou']
+
+
+def rasterize(segm, bbox, size=64, shift=4):
+    """Rasterize polygons of each instance into a fixed size mask inside its box.
+
+    Same as cropping the full size mask to the box and resizing it to `size`, as the
+    offline label scripts do, but without drawing the full size mask. Parts of polygons
+    outside the box, e.g. after random crop, are clipped.
+
+    Parameters
+    ----------
+    segm : list of list of numpy.ndarray
+        Polygons of each instance, each with shape (M, 2) of :math:`(x, y)` in image coordinates.
+    bbox : numpy.ndarray
+        Boxes with shape (N, 4+), :math:`(x_{min}, y_{min}, x_{max}, y_{max})`.
+    size : int, default is 64
+        Mask height and width.
+    shift : int, default is 4
+        Number of fractional bits of polygon vertices.
+
+    Returns
+    -------
+    numpy.ndarray
+        Masks with shape (N, size * size) and values 0 or 255.
+    """
+    masks = np.zeros((len(segm), size, size), dtype=np.uint8)
+    for mask, polys, box in zip(masks, segm, bbox):
+        scale = np.array([size / max(box[2] - box[0], 1e-6),
+                          size / max(box[3] - box[1], 1e-6)])
+        # pixel centers of the mask are at .5
+        pts = [np.round(((p - box[:2]) * scale - 0.5) * (1 << shift)).astype(np.int32)
+               for p in polys]
+        if pts:
+            cv.fillPoly(mask, pts, 255, lineType=cv.LINE_8, shift=shift)
+    return masks.reshape(len(segm), -1)
+
+
+def encode(segm, bbox, coder, mean=None, std=None, size=64):
+    """Coefficients of instance masks given as polygons.
+
+    Parameters
+    ----------
+    segm : list of list of numpy.ndarray
+        Polygons of each instance, see `rasterize`.
+    bbox : numpy.ndarray
+        Boxes with shape (N, 4+).
+    coder : gluoncv.utils.sparse_coding.SparseCoder
+        Sparse coder of the bases. All instances are encoded in one call.
+    mean, std : numpy.ndarray, optional
+        Normalization of codes, see `flip`.
+    size : int, default is 64
+        Mask height and width.
+
+    Returns
+    -------
+    numpy.ndarray
+        Codes with shape (N, K).
+    """
+    coefs = coder.encode(rasterize(segm, bbox, size))
+    if mean is not None and std is not None:
+        coefs = (coefs - mean) / std
+    return coefs
+
+
+def flip_matrix(bases, size=64, flip_x=True, flip_y=False):
+    """Fit a matrix mapping the code of a mask to the code of its flipped mask.
+
+    A mask is reconstructed as ``code . bases``. Flipping the mask permutes the
+    pixels, i.e. ``code . bases . P``. The returned matrix `F` is the least squares
+    solution of ``code . F . bases = code . bases . P`` for all codes, which is
+    ``bases . P . pinv(bases)``. It only depends on the bases, so it is computed once.
+
+    Parameters
+    ----------
+    bases : numpy.ndarray
+        Bases with shape (K, size * size).
+    size : int, default is 64
+        Mask height and width.
+    flip_x : bool
+        Whether flip horizontally.
+    flip_y : bool
+        Whether flip vertically.
+
+    Returns
+    -------
+    numpy.ndarray
+        Flip matrix with shape (K, K).
+    """
+    bases = np.asarray(bases, dtype=np.float64)
+    num_bases = bases.shape[0]
+    flipped = bases.reshape(num_bases, size, size)
+    if flip_y:
+        flipped = flipped[:, ::-1, :]
+    if flip_x:
+        flipped = flipped[:, :, ::-1]
+    flipped = flipped.reshape(num_bases, -1)
+    return np.dot(flipped, np.linalg.pinv(bases))
+
+
+def flip(coefs, matrix, mean=None, std=None):
+    """Flip codes of masks with a matrix from `flip_matrix`.
+
+    Parameters
+    ----------
+    coefs : numpy.ndarray
+        Codes with shape (N, K). If `mean` and `std` are provided, codes are
+        normalized as ``(code - mean) / std``, same as training labels.
+    matrix : numpy.ndarray
+        Flip matrix with shape (K, K).
+    mean : numpy.ndarray, optional
+        Mean of codes with shape (K,).
+    std : numpy.ndarray, optional
+        Standard deviation of codes with shape (K,).
+
+    Returns
+    -------
+    numpy.ndarray
+        Flipped codes with the same shape and normalization as `coefs`.
+    """
+    if mean is None or std is None:
+        return np.dot(coefs, matrix).astype(coefs.dtype)
+    raw = np.dot(coefs * std + mean, matrix)
+    return ((raw - mean) / std).astype(coefs.dtype)
+
+
+def reconstruct(coefs, bases, mean=None, std=None, size=64):
+    """Reconstruct binary masks from codes.
+
+    Each mask is thresholded at the middle of its value range, same as evaluation.
+
+    Parameters
+    ----------
+    coefs : numpy.ndarray
+        Codes with shape (N, K).
+    bases : numpy.ndarray
+        Bases with shape (K, size * size).
+    mean, std : numpy.ndarray, optional
+        Normalization of codes, see `flip`.
+    size : int, default is 64
+        Mask height and width.
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean masks with shape (N, size, size).
+    """
+    if mean is not None and std is not None:
+        coefs = coefs * std + mean
+    masks = np.dot(coefs, bases).reshape(-1, size * size)
+    theta = (masks.max(axis=1, keepdims=True) + masks.min(axis=1, keepdims=True)) / 2
+    return (masks > theta).reshape(-1, size, size)
+
+
+def flip_iou(coefs, bases, matrix, mean=None, std=None, size=64, flip_x=True, flip_y=False):
+    """Accuracy of a flip matrix on given codes.
+
+    Compare masks reconstructed from flipped codes with flipped masks reconstructed
+    from the original codes.
+
+    Parameters
+    ----------
+    coefs : numpy.ndarray
+        Codes with shape (N, K), e.g. training labels.
+    bases : numpy.ndarray
+        Bases with shape (K, size * size).
+    matrix : numpy.ndarray
+        Flip matrix from `flip_matrix`.
+    mean, std : numpy.ndarray, optional
+        Normalization of codes, see `flip`.
+    size : int, default is 64
+        Mask height and width.
+    flip_x : bool
+        Whether `matrix` flips horizontally.
+    flip_y : bool
+        Whether `matrix` flips vertically.
+
+    Returns
+    -------
+    numpy.ndarray
+        IoU of each mask with shape (N,).
+    """
+    target = reconstruct(coefs, bases, mean, std, size)
+    if flip_y:
+        target = target[:, ::-1, :]
+    if flip_x:
+        target = target[:, :, ::-1]
+    pred = reconstruct(flip(coefs, matrix, mean, std), bases, mean, std, size)
+    inter = np.logical_and(pred, target).reshape(len(pred), -1).sum(axis=1)
+    union = np.logical_or(pred, target).reshape(len(pred), -1).sum(axis=1)
+    return inter / np.maximum(union, 1)
@@ -6,10 +6,36 @@ import mxnet as mx
 from mxnet import nd
 from mxnet.base import numeric_types
 
-__all__ = ['imresize', 'resize_long', 'resize_short_within',
+__all__ = ['ResizedImage', 'imresize', 'resize_long', 'resize_short_within',
            'random_pca_lighting', 'random_expand', 'random_flip',
            'resize_contain', 'ten_crop']
 
+
+class ResizedImage(object):
+    """An image which is already resized, e.g. loaded from a resized image cache.
+
+    Transforms that resize to a fixed shape use `data` directly, and `shape` is the
+    shape of the original image, which labels are relative to.
+
+    Parameters
+    ----------
+    data : mxnet.nd.NDArray
+        Resized image with shape (H, W, C).
+    shape : tuple of int
+        Shape (H, W, C) of the original image.
+    interp : int
+        Interpolation method used to resize.
+
+    """
+    def __init__(self, data, shape, interp):
+        self.data = data
+        self.shape = tuple(shape)
+        self.interp = interp
+
+    def resized(self, w, h, interp):
+        """Whether the image was resized to `w` x `h` with `interp`."""
+        return self.data.shape[1] == w and self.data.shape[0] == h and self.interp == interp
+
 def imresize(src, w, h, interp=1):
     """Resize image with OpenCV.
 
@@ -1,10 +1,10 @@
 """Mask transformation functions."""
 import copy
 import numpy as np
-import mxnet as mx
+import cv2 as cv
 from ..mscoco.utils import try_import_pycocotools
 
-__all__ = ['flip', 'resize', 'to_mask', 'fill']
+__all__ = ['flip', 'resize', 'to_mask', 'fill', 'fill_batch']
 
 def flip(polys, size, flip_x=False, flip_y=False):
     """Flip polygons according to image flipping directions.
@@ -99,6 +99,16 @@ def to_mask(polys, size):
     return cocomask.decode(rle)
 
 
+def _paste_boxes(bboxes, M):
+    """Integer boxes of M x M masks padded by one pixel on each side."""
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    scale = (M + 2) * 1.0 / M
+    center = (bboxes[:, :2] + bboxes[:, 2:]) / 2
+    half = (bboxes[:, 2:] - bboxes[:, :2]) / 2 * scale
+    # quantize the same way as int()
+    return np.trunc(np.concatenate((center - half, center + half), axis=1)).astype(np.int64)
+
+
 def fill(mask, bbox, size):
     """Fill mask to full image size
 
@@ -116,31 +126,49 @@ def fill(mask, bbox, size):
     numpy.ndarray
         Full size binary mask of shape (height, width)
     """
+    return fill_batch(np.asarray(mask)[np.newaxis], [bbox], size)[0]
+
+
+def fill_batch(masks, bboxes, size, out=None, thresh=0.5):
+    """Fill masks of all instances to full image size.
+
+    Same as calling `fill` on each mask, but masks are resized by OpenCV directly
+    and written into one preallocated array, only inside their boxes.
+
+    Parameters
+    ----------
+    masks : numpy.ndarray
+        Mask predictions with shape (N, M, M).
+    bboxes : numpy.ndarray
+        Boxes with shape (N, 4), :math:`(x_{min}, y_{min}, x_{max}, y_{max})`.
+    size : tuple
+        Tuple of length 2: (width, height).
+    out : numpy.ndarray, optional
+        Zero initialized uint8 array with shape (N, height, width) to write to, e.g. a
+        transposed Fortran order array which pycocotools encodes without copying.
+    thresh : float, default is 0.5
+        Threshold of resized masks.
+
+    Returns
+    -------
+    numpy.ndarray
+        Full size binary masks with shape (N, height, width).
+    """
     width, height = size
-    # pad mask
-    M = mask.shape[0]
-    padded_mask = np.zeros((M + 2, M + 2))
-    padded_mask[1:-1, 1:-1] = mask
-    mask = padded_mask
-    # expand boxes
-    x1, y1, x2, y2 = bbox
-    x, y, hw, hh = (x1 + x2) / 2, (y1 + y2) / 2, (x2 - x1) / 2, (y2 - y1) / 2
-    hw = hw * ((M + 2) * 1.0 / M)
-    hh = hh * ((M + 2) * 1.0 / M)
-    x1, y1, x2, y2 = x - hw, y - hh, x + hw, y + hh
-    # quantize
-    x1, y1, x2, y2 = map(int, (x1, y1, x2, y2))
-    w, h = (x2 - x1 + 1), (y2 - y1 + 1)
-    # resize mask
-    mask = mx.nd.array(mask)
-    mask = mask.reshape((0, 0, 1))
-    mask = mx.image.imresize(mask, w=w, h=h, interp=1)
-    mask = mask.reshape((0, 0))
-    mask = mask.asnumpy()
-    # binarize and fill
-    mask = (mask > 0.5).astype('uint8')
-    ret = np.zeros((height, width), dtype='uint8')
-    xx1, yy1 = max(0, x1), max(0, y1)
-    xx2, yy2 = min(width, x2 + 1), min(height, y2 + 1)
-    ret[yy1:yy2, xx1:xx2] = mask[yy1 - y1:yy2 - y1, xx1 - x1:xx2 - x1]
-    return ret
+    masks = np.asarray(masks, dtype=np.float32)
+    if out is None:
+        out = np.zeros((len(masks), height, width), dtype=np.uint8)
+    if not len(masks):
+        return out
+    M = masks.shape[1]
+    padded = np.zeros((M + 2, M + 2), dtype=np.float32)
+    for ret, mask, (x1, y1, x2, y2) in zip(out, masks, _paste_boxes(bboxes, M)):
+        xx1, yy1 = max(0, x1), max(0, y1)
+        xx2, yy2 = min(width, x2 + 1), min(height, y2 + 1)
+        if xx2 <= xx1 or yy2 <= yy1:
+            continue
+        padded[1:-1, 1:-1] = mask
+        resized = cv.resize(padded, (int(x2 - x1 + 1), int(y2 - y1 + 1)),
+                            interpolation=cv.INTER_LINEAR)
+        ret[yy1:yy2, xx1:xx2] = resized[yy1 - y1:yy2 - y1, xx1 - x1:xx2 - x1] > thresh
+    return out
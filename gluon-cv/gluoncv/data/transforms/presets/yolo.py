@@ -6,9 +6,12 @@ import mxnet as mx
 from mxnet import autograd
 from .. import bbox as tbbox
 from .. import image as timage
+from .. import coef as tcoef
+from .. import mask as tmask
 from .. import experimental
 
-__all__ = ['transform_test', 'load_test', 'YOLO3DefaultTrainTransform', 'YOLO3DefaultValTransform']
+__all__ = ['transform_test', 'load_test', 'YOLO3DefaultTrainTransform', 'YOLO3UsdSegCocoTrainTransform',
+           'YOLO3DefaultValTransform']
 
 def transform_test(imgs, short=416, max_size=1024, stride=1, mean=(0.485, 0.456, 0.406),
                    std=(0.229, 0.224, 0.225)):
@@ -126,10 +129,19 @@ class YOLO3DefaultTrainTransform(object):
         IOU overlap threshold for maximum matching, default is 0.5.
     box_norm : array-like of size 4, default is (0.1, 0.1, 0.2, 0.2)
         Std value to be divided from encoded values.
+    coef_flip : numpy.ndarray, optional
+        Enable random horizontal flip of coefficient labels. Either bases with shape
+        (num_bases, 4096), from which the flip matrix is fitted, or a flip matrix with
+        shape (num_bases, num_bases) from :py:func:`gluoncv.data.transforms.coef.flip_matrix`.
+    coef_mean : array-like of size num_bases, optional
+        Mean used to normalize coefficient labels, default is `gluoncv.utils.bbox.x_mean`.
+    coef_std : array-like of size num_bases, optional
+        Std used to normalize coefficient labels, default is `gluoncv.utils.bbox.sqrt_var`.
 
     """
     def __init__(self, width, height, net=None, mean=(0.485, 0.456, 0.406),
-                 std=(0.229, 0.224, 0.225), mixup=False,num_bases=50, **kwargs):
+                 std=(0.229, 0.224, 0.225), mixup=False,num_bases=50, coef_flip=None,
+                 coef_mean=None, coef_std=None, **kwargs):
         self._width = width
         self._height = height
         self._mean = mean
@@ -137,16 +149,32 @@ class YOLO3DefaultTrainTransform(object):
         self._mixup = mixup
         self._target_generator = None
         self._num_bases = num_bases
+        self._flip_matrix = None
+        if coef_flip is not None:
+            coef_flip = np.asarray(coef_flip)
+            if coef_flip.shape[-1] != num_bases:
+                coef_flip = tcoef.flip_matrix(coef_flip)
+            if coef_mean is None or coef_std is None:
+                from ....utils.bbox import x_mean, sqrt_var
+                coef_mean, coef_std = x_mean, sqrt_var
+            self._flip_matrix = coef_flip
+            self._coef_mean = np.asarray(coef_mean)
+            self._coef_std = np.asarray(coef_std)
         if net is None:
             return
 
-        # in case network has reset_ctx to gpu
         self._fake_x = mx.nd.zeros((1, 3, height, width))
-        net = copy.deepcopy(net)
-        net.collect_params().reset_ctx(None)
-        # print(self._fake_x.shape)
-        with autograd.train_mode():
-            _, self._anchors, self._offsets, self._feat_maps, _, _, _, _, _ = net(self._fake_x)
+        from ....model_zoo.yolo.yolo_target import YOLOV3AnchorCache
+        anchor_cache = YOLOV3AnchorCache.from_net(net)
+        if anchor_cache.supports(height, width):
+            self._feat_maps, self._anchors, self._offsets = anchor_cache(height, width)
+        else:
+            # feature map shapes depend on rounding of each layer, run a copy of the network
+            # in case network has reset_ctx to gpu
+            net = copy.deepcopy(net)
+            net.collect_params().reset_ctx(None)
+            with autograd.train_mode():
+                _, self._anchors, self._offsets, self._feat_maps, _, _, _, _, _ = net(self._fake_x)
         from ....model_zoo.yolo.yolo_target import YOLOV3PrefetchTargetGenerator
         self._target_generator = YOLOV3PrefetchTargetGenerator(
             num_class=len(net.classes), num_bases = self._num_bases, **kwargs)
@@ -169,11 +197,19 @@ class YOLO3DefaultTrainTransform(object):
         img = timage.imresize(img, self._width, self._height, interp=interp)
         bbox = tbbox.resize(bbox, (w, h), (self._width, self._height))
 
-        # random horizontal flip - Should be disabled when training coefs!
-        # h, w, _ = img.shape
-        # img, flips = timage.random_flip(img, px=0.5)
-        # bbox = tbbox.flip(bbox, (w, h), flip_x=flips[0])
+        # random horizontal flip, coefs are flipped in coefficient space
+        if self._flip_matrix is not None:
+            h, w, _ = img.shape
+            img, flips = timage.random_flip(img, px=0.5)
+            bbox = tbbox.flip(bbox, (w, h), flip_x=flips[0])
+            if flips[0]:
+                bbox[:, 4:4+self._num_bases] = tcoef.flip(
+                    bbox[:, 4:4+self._num_bases], self._flip_matrix, self._coef_mean, self._coef_std)
+
+        return self._to_targets(img, bbox)
 
+    def _to_targets(self, img, bbox):
+        """Normalize image and generate training targets from the label."""
         # to tensor
         img = mx.nd.image.to_tensor(img)
         img = mx.nd.image.normalize(img, mean=self._mean, std=self._std)
@@ -198,9 +234,119 @@ class YOLO3DefaultTrainTransform(object):
         return (img, objectness[0], center_targets[0], scale_targets[0], coef_targets[0], weights[0],
                 class_targets[0], gt_bboxes[0])
 
+class YOLO3UsdSegCocoTrainTransform(YOLO3DefaultTrainTransform):
+    """USD-Seg training transform encoding coefficients from COCO polygons on the fly.
+
+    Takes `(img, label, segm)` from :py:class:`gluoncv.data.COCOInstance`. Polygons go
+    through the same random expansion, crop, resize and flip as the image, then each
+    instance is rasterized to a 64x64 mask inside its augmented box and all instances of
+    the image are encoded in one call of a batched sparse coder. No offline coefficient
+    labels are needed and any geometric augmentation stays consistent with the codes.
+
+    Parameters
+    ----------
+    width : int
+        Image width.
+    height : int
+        Image height.
+    bases : numpy.ndarray
+        Bases with shape (num_bases, 4096).
+    net : mxnet.gluon.HybridBlock, optional
+        The yolo network, see :py:class:`YOLO3DefaultTrainTransform`.
+    mean : array-like of size 3
+        Mean pixel values to be subtracted from image tensor. Default is [0.485, 0.456, 0.406].
+    std : array-like of size 3
+        Standard deviation to be divided from image. Default is [0.229, 0.224, 0.225].
+    coef_mean : array-like of size num_bases, optional
+        Mean used to normalize coefficients, default is `gluoncv.utils.bbox.x_mean`.
+    coef_std : array-like of size num_bases, optional
+        Std used to normalize coefficients, default is `gluoncv.utils.bbox.sqrt_var`.
+    n_nonzero_coefs : int, optional
+        Number of non-zero coefficients, `None` keeps all atoms as the offline labels.
+    crop : bool, default is True
+        Whether to apply random crop.
+    flip : bool, default is True
+        Whether to apply random horizontal flip.
+
+    """
+    def __init__(self, width, height, bases, net=None, mean=(0.485, 0.456, 0.406),
+                 std=(0.229, 0.224, 0.225), coef_mean=None, coef_std=None,
+                 n_nonzero_coefs=None, crop=True, flip=True, **kwargs):
+        from ....utils.sparse_coding import SparseCoder
+        bases = np.asarray(bases)
+        super(YOLO3UsdSegCocoTrainTransform, self).__init__(
+            width, height, net, mean, std, mixup=False, num_bases=bases.shape[0], **kwargs)
+        if coef_mean is None or coef_std is None:
+            from ....utils.bbox import x_mean, sqrt_var
+            coef_mean, coef_std = x_mean, sqrt_var
+        self._coef_mean = np.asarray(coef_mean)
+        self._coef_std = np.asarray(coef_std)
+        self._coder = SparseCoder(bases, n_nonzero_coefs=n_nonzero_coefs)
+        self._crop = crop
+        self._flip = flip
+
+    def __call__(self, src, label, segm):
+        """Apply transform to training image/label/polygons."""
+        # random color jittering
+        img = experimental.image.random_color_distort(src)
+        # keep track of instances dropped by crop
+        bbox = np.hstack([label[:, :4], np.arange(len(label))[:, np.newaxis]])
+
+        # random expansion with prob 0.5
+        if np.random.uniform(0, 1) > 0.5:
+            img, expand = timage.random_expand(img, fill=[m * 255 for m in self._mean])
+            bbox = tbbox.translate(bbox, x_offset=expand[0], y_offset=expand[1])
+            segm = [[p + np.array(expand[:2], dtype=p.dtype) for p in polys] for polys in segm]
+
+        # random cropping
+        if self._crop:
+            h, w, _ = img.shape
+            bbox, crop = experimental.bbox.random_crop_with_constraints(bbox, (w, h))
+            x0, y0, w, h = crop
+            img = mx.image.fixed_crop(img, x0, y0, w, h)
+            segm = [[p - np.array([x0, y0], dtype=p.dtype) for p in segm[int(i)]]
+                    for i in bbox[:, 4]]
+        else:
+            segm = [segm[int(i)] for i in bbox[:, 4]]
+
+        # resize with random interpolation
+        h, w, _ = img.shape
+        interp = np.random.randint(0, 5)
+        img = timage.imresize(img, self._width, self._height, interp=interp)
+        bbox = tbbox.resize(bbox, (w, h), (self._width, self._height))
+        segm = [tmask.resize(polys, (w, h), (self._width, self._height)) for polys in segm]
+
+        # random horizontal flip
+        if self._flip:
+            h, w, _ = img.shape
+            img, flips = timage.random_flip(img, px=0.5)
+            bbox = tbbox.flip(bbox, (w, h), flip_x=flips[0])
+            segm = [tmask.flip(polys, (w, h), flip_x=flips[0]) for polys in segm]
+
+        # encode all instances at once
+        coefs = tcoef.encode(segm, bbox, self._coder, self._coef_mean, self._coef_std)
+        ids = label[bbox[:, 4].astype(np.int64), 4:5]
+        bbox = np.hstack([bbox[:, :4], coefs, ids]).astype(np.float32)
+        return self._to_targets(img, bbox)
+
+
+def _resize_val(src, width, height, interp=9):
+    """Resize a validation image, or take it from a resized image cache."""
+    if isinstance(src, timage.ResizedImage):
+        if not src.resized(width, height, interp):
+            raise ValueError("Cached image with shape {} and interp {} does not match "
+                             "({}, {}) and interp {}".format(
+                                 src.data.shape, src.interp, height, width, interp))
+        return src.data
+    return timage.imresize(src, width, height, interp=interp)
+
+
 class YOLO3DefaultValTransform(object):
     """Default YOLO validation transform.
 
+    Images from :py:class:`gluoncv.data.ResizedImageCache` are already resized and
+    used as they are.
+
     Parameters
     ----------
     width : int
@@ -225,7 +371,7 @@ class YOLO3DefaultValTransform(object):
         """Apply transform to validation image/label."""
         # resize
         h, w, _ = src.shape
-        img = timage.imresize(src, self._width, self._height, interp=9)
+        img = _resize_val(src, self._width, self._height)
         img = mx.nd.image.to_tensor(img)
         img = mx.nd.image.normalize(img, mean=self._mean, std=self._std)
         bbox = tbbox.val_resize(label, in_size=(w, h), out_size=(self._width, self._height),
@@ -236,6 +382,9 @@ class YOLO3DefaultValTransform(object):
 class YOLO3UsdSegCocoValTransform(object):
     """ USD-SEG Transform for COCO
 
+    Images from :py:class:`gluoncv.data.ResizedImageCache` are already resized and
+    used as they are.
+
     Parameters
     ----------
     width : int
@@ -260,7 +409,7 @@ class YOLO3UsdSegCocoValTransform(object):
         """Apply transform to validation image/label."""
         # resize
         h, w, _ = src.shape
-        img = timage.imresize(src, self._width, self._height, interp=9)
+        img = _resize_val(src, self._width, self._height)
         img = mx.nd.image.to_tensor(img)
         img = mx.nd.image.normalize(img, mean=self._mean, std=self._std)
         # For COCO EVAL
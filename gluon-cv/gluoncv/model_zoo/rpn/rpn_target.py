@@ -6,12 +6,16 @@ import mxnet as mx
 from mxnet import gluon
 from mxnet import autograd
 from ...nn.bbox import BBoxSplit
+from ...nn.sampler import _quota_subsample
 from ...nn.coder import SigmoidClassEncoder, NormalizedBoxCenterEncoder
 
 
-class RPNTargetSampler(gluon.Block):
+class RPNTargetSampler(gluon.HybridBlock):
     """A sampler to choose positive/negative samples from RPN anchors
 
+    Subsampling is done in the graph by ranking random keys, see
+    :py:class:`gluoncv.nn.sampler.HybridQuotaSampler`, so it can be hybridized.
+
     Parameters
     ----------
     num_sample : int
@@ -31,10 +35,10 @@ class RPNTargetSampler(gluon.Block):
         self._max_pos = int(round(num_sample * pos_ratio))
         self._pos_iou_thresh = pos_iou_thresh
         self._neg_iou_thresh = neg_iou_thresh
-        self._eps = np.spacing(np.float32(1.0))
+        self._eps = float(np.spacing(np.float32(1.0)))
 
     # pylint: disable=arguments-differ
-    def forward(self, ious):
+    def hybrid_forward(self, F, ious):
         """RPNTargetSampler is only used in data transform with no batch dimension.
 
         Parameters
@@ -47,47 +51,31 @@ class RPNTargetSampler(gluon.Block):
         matches: (num_anchors,) value [0, M).
 
         """
-        matches = mx.nd.argmax(ious, axis=1)
+        matches = F.argmax(ious, axis=1)
 
         # samples init with 0 (ignore)
-        ious_max_per_anchor = mx.nd.max(ious, axis=1)
-        samples = mx.nd.zeros_like(ious_max_per_anchor)
+        ious_max_per_anchor = F.max(ious, axis=1)
+        samples = F.zeros_like(ious_max_per_anchor)
 
         # set argmax (1, num_gt)
-        ious_max_per_gt = mx.nd.max(ious, axis=0, keepdims=True)
+        ious_max_per_gt = F.max(ious, axis=0, keepdims=True)
         # ious (num_anchor, num_gt) >= argmax (1, num_gt) -> mark row as positive
-        mask = mx.nd.broadcast_greater(ious + self._eps, ious_max_per_gt)
+        mask = F.broadcast_greater(ious + self._eps, ious_max_per_gt)
         # reduce column (num_anchor, num_gt) -> (num_anchor)
-        mask = mx.nd.sum(mask, axis=1)
+        mask = F.sum(mask, axis=1)
         # row maybe sampled by 2 columns but still only matches to most overlapping gt
-        samples = mx.nd.where(mask, mx.nd.ones_like(samples), samples)
+        samples = F.where(mask, F.ones_like(samples), samples)
 
         # set positive overlap to 1
-        samples = mx.nd.where(ious_max_per_anchor >= self._pos_iou_thresh,
-                              mx.nd.ones_like(samples), samples)
+        samples = F.where(ious_max_per_anchor >= self._pos_iou_thresh,
+                          F.ones_like(samples), samples)
         # set negative overlap to -1
         tmp = (ious_max_per_anchor < self._neg_iou_thresh) * (ious_max_per_anchor >= 0)
-        samples = mx.nd.where(tmp, mx.nd.ones_like(samples) * -1, samples)
-
-        # subsample fg labels
-        samples = samples.asnumpy()
-        num_pos = int((samples > 0).sum())
-        if num_pos > self._max_pos:
-            disable_indices = np.random.choice(
-                np.where(samples > 0)[0], size=(num_pos - self._max_pos), replace=False)
-            samples[disable_indices] = 0  # use 0 to ignore
-
-        # subsample bg labels
-        num_neg = int((samples < 0).sum())
-        # if pos_sample is less than quota, we can have negative samples filling the gap
-        max_neg = self._num_sample - min(num_pos, self._max_pos)
-        if num_neg > max_neg:
-            disable_indices = np.random.choice(
-                np.where(samples < 0)[0], size=(num_neg - max_neg), replace=False)
-            samples[disable_indices] = 0
-
-        # convert to ndarray
-        samples = mx.nd.array(samples, ctx=matches.context)
+        samples = F.where(tmp, F.ones_like(samples) * -1, samples)
+
+        # subsample fg labels, then bg labels fill the gap of insufficient fg labels
+        samples = _quota_subsample(F, samples.reshape((1, -1)), self._max_pos, 0,
+                                   self._num_sample).reshape((-1,))
         return samples, matches
 
 
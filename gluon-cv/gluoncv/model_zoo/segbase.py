@@ -102,15 +102,22 @@ class SegEvalModel(object):
 
 
 class MultiEvalModel(object):
-    """Multi-size Segmentation Evaluator"""
+    """Multi-size Segmentation Evaluator
+
+    Grid crops of all scales of an image are padded to ``crop_size`` and forwarded
+    together in batches of ``batch_size`` crops, with the flipped crops in the same
+    batch, then accumulated into the outputs of their scale and normalized by the
+    number of overlapping crops.
+    """
     def __init__(self, module, nclass, ctx_list, flip=True,
-                 scales=[0.5, 0.75, 1.0, 1.25, 1.5, 1.75]):
+                 scales=[0.5, 0.75, 1.0, 1.25, 1.5, 1.75], batch_size=4):
         self.flip = flip
         self.ctx_list = ctx_list
         self.base_size = module.base_size
         self.crop_size = module.crop_size
         self.nclass = nclass
         self.scales = scales
+        self.batch_size = batch_size
         module.collect_params().reset_ctx(ctx=ctx_list)
         self.evalmodule = SegEvalModel(module)
 
@@ -126,13 +133,13 @@ class MultiEvalModel(object):
         image = image.expand_dims(0)
         batch, _, h, w = image.shape
         assert(batch == 1)
-        base_size = self.base_size
         crop_size = self.crop_size
         stride_rate = 2.0/3.0
         stride = int(crop_size * stride_rate)
         scores = mx.nd.zeros((batch, self.nclass, h, w), ctx=image.context)
+        pending = []
         for scale in self.scales:
-            long_size = int(math.ceil(base_size * scale))
+            long_size = int(math.ceil(self.base_size * scale))
             if h > w:
                 height = long_size
                 width = int(1.0 * w * long_size / h + 0.5)
@@ -141,61 +148,70 @@ class MultiEvalModel(object):
                 width = long_size
                 height = int(1.0 * h * long_size / w + 0.5)
                 short_size = height
-            # resize image to current size
+            # resize image to current size, pad if needed
             cur_img = _resize_image(image, height, width)
-            if long_size <= crop_size:
-                pad_img = _pad_image(cur_img, crop_size)
-                outputs = self.flip_inference(pad_img)
-                outputs = _crop_image(outputs, 0, height, 0, width)
-            else:
-                if short_size < crop_size:
-                    # pad if needed
-                    pad_img = _pad_image(cur_img, crop_size)
-                else:
-                    pad_img = cur_img
-                _, _, ph, pw = pad_img.shape
-                assert(ph >= height and pw >= width)
-                # grid forward and normalize
-                h_grids = int(math.ceil(1.0*(ph-crop_size)/stride)) + 1
-                w_grids = int(math.ceil(1.0*(pw-crop_size)/stride)) + 1
-                outputs = mx.nd.zeros((batch, self.nclass, ph, pw), ctx=image.context)
-                count_norm = mx.nd.zeros((batch, 1, ph, pw), ctx=image.context)
-                # grid evaluation
-                for idh in range(h_grids):
-                    for idw in range(w_grids):
-                        h0 = idh * stride
-                        w0 = idw * stride
-                        h1 = min(h0 + crop_size, ph)
-                        w1 = min(w0 + crop_size, pw)
-                        crop_img = _crop_image(pad_img, h0, h1, w0, w1)
-                        # pad if needed
-                        pad_crop_img = _pad_image(crop_img, crop_size)
-                        output = self.flip_inference(pad_crop_img)
-                        outputs[:, :, h0:h1, w0:w1] += _crop_image(
-                            output, 0, h1-h0, 0, w1-w0)
-                        count_norm[:, :, h0:h1, w0:w1] += 1
-                assert((count_norm == 0).sum() == 0)
-                outputs = outputs / count_norm
-                outputs = outputs[:, :, :height, :width]
-
-            score = _resize_image(outputs, h, w)
-            scores += score
-
+            if short_size < crop_size:
+                cur_img = _pad_image(cur_img, crop_size)
+            _, _, ph, pw = cur_img.shape
+            assert(ph >= height and pw >= width)
+            h_grids = _grid_ranges(ph, crop_size, stride)
+            w_grids = _grid_ranges(pw, crop_size, stride)
+            state = {'outputs': mx.nd.zeros((batch, self.nclass, ph, pw), ctx=image.context),
+                     'count_h': _grid_counts(ph, h_grids, image.context).reshape((1, 1, -1, 1)),
+                     'count_w': _grid_counts(pw, w_grids, image.context).reshape((1, 1, 1, -1)),
+                     'size': (height, width), 'remaining': len(h_grids) * len(w_grids)}
+            for h0, h1 in h_grids:
+                for w0, w1 in w_grids:
+                    crop_img = _crop_image(cur_img, h0, h1, w0, w1)
+                    if h1 - h0 < crop_size or w1 - w0 < crop_size:
+                        crop_img = _pad_image(crop_img, crop_size)
+                    pending.append((state, (h0, h1, w0, w1), crop_img))
+                    if len(pending) == self.batch_size:
+                        self._forward_crops(pending, scores)
+                        pending = []
+        if pending:
+            self._forward_crops(pending, scores)
         return scores
 
+    def _forward_crops(self, pending, scores):
+        """Forward a batch of crops and accumulate them, adding finished scales to scores."""
+        outputs = self.flip_inference(mx.nd.concat(*[crop for _, _, crop in pending], dim=0))
+        for i, (state, (h0, h1, w0, w1), _) in enumerate(pending):
+            state['outputs'][:, :, h0:h1, w0:w1] += outputs[i:i+1, :, :h1-h0, :w1-w0]
+            state['remaining'] -= 1
+            if not state['remaining']:
+                height, width = state['size']
+                output = mx.nd.broadcast_div(state['outputs'], state['count_h'])
+                output = mx.nd.broadcast_div(output, state['count_w'])
+                scores += _resize_image(output[:, :, :height, :width], *scores.shape[2:])
+
     def flip_inference(self, image):
         assert(isinstance(image, NDArray))
-        output = self.evalmodule(image)
-        if self.flip:
-            fimg = _flip_image(image)
-            foutput = self.evalmodule(fimg)
-            output += _flip_image(foutput)
+        if not self.flip:
+            return self.evalmodule(image).exp()
+        # fold flipped images into the batch
+        num = image.shape[0]
+        output = self.evalmodule(mx.nd.concat(image, _flip_image(image), dim=0))
+        output = output[:num] + _flip_image(output[num:])
         return output.exp()
 
     def collect_params(self):
         return self.evalmodule.collect_params()
 
 
+def _grid_ranges(size, crop_size, stride):
+    grids = int(math.ceil(1.0*(size-crop_size)/stride)) + 1
+    return [(i * stride, min(i * stride + crop_size, size)) for i in range(grids)]
+
+
+def _grid_counts(size, ranges, ctx):
+    counts = np.zeros((size,), dtype=np.float32)
+    for begin, end in ranges:
+        counts[begin:end] += 1
+    assert((counts == 0).sum() == 0)
+    return mx.nd.array(counts, ctx=ctx)
+
+
 def _resize_image(img, h, w):
     return mx.nd.contrib.BilinearResize2D(img, height=h, width=w)
 
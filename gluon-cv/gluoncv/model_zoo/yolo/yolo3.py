@@ -68,6 +68,8 @@ class YOLOOutputV4(gluon.HybridBlock):
         self._num_anchors = anchors.size // 2
         self._stride = stride
         self._num_bases = num_bases
+        # kept in numpy so targets can be generated without running the network
+        self._anchor_sizes = anchors.reshape(-1, 2)
         with self.name_scope():
             all_pred = self._num_pred * self._num_anchors
             self.prediction = nn.Conv2D(all_pred, kernel_size=1, padding=0, strides=1)
@@ -10,6 +10,76 @@ from mxnet import autograd
 from ...nn.bbox import BBoxCornerToCenter, BBoxCenterToCorner, BBoxBatchIOU
 
 
+class YOLOV3AnchorCache(object):
+    """Anchors, offsets and feature map shapes of YOLO V3 outputs for given input shapes.
+
+    They only depend on the anchors and strides of the output layers, so they are
+    derived analytically instead of running a copy of the network. Results are cached
+    per input shape. The instance only holds a few small arrays and is cheap to pickle
+    into DataLoader workers.
+
+    Parameters
+    ----------
+    anchors : list of array-like
+        Anchor sizes of each output layer, in the order of network outputs.
+    strides : list of int
+        Stride of each output layer, in the order of network outputs.
+
+    """
+    def __init__(self, anchors, strides):
+        self._anchors = [np.array(a, dtype='float32').reshape(1, 1, -1, 2) for a in anchors]
+        self._strides = list(strides)
+        self._cache = {}
+
+    @classmethod
+    def from_net(cls, net):
+        """Cache of the output layers of a YOLO V3 network."""
+        outputs = net.yolo_outputsV4
+        # the network only uses as many outputs as stages
+        outputs = [outputs[i] for i in range(min(len(outputs), len(net.stages)))]
+        return cls([o._anchor_sizes for o in outputs], [o._stride for o in outputs])
+
+    def supports(self, height, width):
+        """Whether feature map shapes of the input shape are exact, i.e. shapes are
+        multiples of all strides."""
+        return all(height % s == 0 and width % s == 0 for s in self._strides)
+
+    def __call__(self, height, width):
+        """Get feature maps, anchors and offsets as returned by the network in training mode.
+
+        Parameters
+        ----------
+        height : int
+            Input height.
+        width : int
+            Input width.
+
+        Returns
+        -------
+        tuple of list of mxnet.nd.NDArray
+            Fake feature maps with shape (1, 1, h, w), anchors with shape (1, 1, A, 2)
+            and offsets with shape (1, h * w, 1, 2) of each output layer.
+        """
+        key = (height, width)
+        if key not in self._cache:
+            feat_maps, anchors, offsets = [], [], []
+            for anchor, stride in zip(self._anchors, self._strides):
+                feat_h, feat_w = -(-height // stride), -(-width // stride)
+                grid_x, grid_y = np.meshgrid(np.arange(feat_w), np.arange(feat_h))
+                offset = np.stack((grid_x, grid_y), axis=-1).astype('float32')
+                feat_maps.append(nd.zeros((1, 1, feat_h, feat_w)))
+                anchors.append(nd.array(anchor))
+                offsets.append(nd.array(offset.reshape(1, -1, 1, 2)))
+            self._cache[key] = (feat_maps, anchors, offsets)
+        return self._cache[key]
+
+    def __getstate__(self):
+        # NDArrays are rebuilt lazily in each worker
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        return state
+
+
 class YOLOV3PrefetchTargetGenerator(gluon.Block):
     """YOLO V3 prefetch target generator.
     The target generated by this instance is invariant to network predictions.
@@ -11,7 +11,6 @@ from __future__ import absolute_import
 import numpy as np
 import mxnet as mx
 from mxnet import gluon
-from mxnet import nd
 
 
 class NaiveSampler(gluon.HybridBlock):
@@ -28,10 +27,14 @@ class NaiveSampler(gluon.HybridBlock):
         return y
 
 
-class OHEMSampler(gluon.Block):
+class OHEMSampler(gluon.HybridBlock):
     """A sampler implementing Online Hard-negative mining.
     As described in paper https://arxiv.org/abs/1604.03540.
 
+    Negatives of each image are ranked by their scores, and those ranked below the
+    number of negatives of the image are selected, so there is no per image loop
+    and the sampler can be hybridized.
+
     Parameters
     ----------
     ratio : float
@@ -54,34 +57,44 @@ class OHEMSampler(gluon.Block):
         self._thresh = thresh
 
     # pylint: disable=arguments-differ
-    def forward(self, x, logits, ious):
-        """Forward"""
-        F = nd
-        num_positive = F.sum(x > -1, axis=1)
+    def hybrid_forward(self, F, x, logits, ious):
+        """Hybrid forward
+
+        Parameters
+        ----------
+        x : NDArray or Symbol
+            (B, N) matching results, -1 for not matched.
+        logits : NDArray or Symbol
+            (B, N, C) class predictions, class 0 is background.
+        ious : NDArray or Symbol
+            (B, N, M) or (B, N) IOU overlaps.
+
+        Returns
+        -------
+        NDArray or Symbol
+            (B, N) samples, 1 for positive, -1 for negative, 0 for ignore.
+
+        """
+        num_positive = F.sum(x > -1, axis=1, keepdims=True)
         num_negative = self._ratio * num_positive
-        num_total = x.shape[1]  # scalar
-        num_negative = F.minimum(F.maximum(self._min_samples, num_negative),
-                                 num_total - num_positive)
+        num_total = F.sum(F.ones_like(x), axis=1, keepdims=True)
+        num_negative = F.floor(F.minimum(F.maximum(num_negative, self._min_samples),
+                                         num_total - num_positive))
         positive = logits.slice_axis(axis=2, begin=1, end=-1)
         background = logits.slice_axis(axis=2, begin=0, end=1).reshape((0, -1))
         maxval = positive.max(axis=2)
-        esum = F.exp(logits - maxval.reshape((0, 0, 1))).sum(axis=2)
+        esum = F.exp(F.broadcast_sub(logits, maxval.reshape((0, 0, 1)))).sum(axis=2)
         score = -F.log(F.exp(background - maxval) / esum)
         mask = F.ones_like(score) * -1
         score = F.where(x < 0, score, mask)  # mask out positive samples
-        if len(ious.shape) == 3:
-            ious = F.max(ious, axis=2)
+        ious = ious.reshape((0, 0, -1)).max(axis=2)
         score = F.where(ious < self._thresh, score, mask)  # mask out if iou is large
+        # rank of each sample by descending score, the top num_negative are negatives
         argmaxs = F.argsort(score, axis=1, is_ascend=False)
-
-        # neg number is different in each batch, using dynamic numpy operations.
-        y = np.zeros(x.shape)
-        y[np.where(x.asnumpy() >= 0)] = 1  # assign positive samples
-        argmaxs = argmaxs.asnumpy()
-        for i, num_neg in zip(range(x.shape[0]), num_negative.asnumpy().astype(np.int32)):
-            indices = argmaxs[i, :num_neg]
-            y[i, indices.astype(np.int32)] = -1  # assign negative samples
-        return F.array(y, ctx=x.context)
+        rank = F.argsort(argmaxs, axis=1)
+        y = F.where(x >= 0, F.ones_like(x), F.zeros_like(x))  # assign positive samples
+        negative = F.broadcast_lesser(rank, num_negative)
+        return F.where(negative, F.ones_like(x) * -1, y)  # assign negative samples
 
 
 class QuotaSampler(gluon.Block):
@@ -121,8 +134,7 @@ class QuotaSampler(gluon.Block):
         super(QuotaSampler, self).__init__()
         self._fill_negative = fill_negative
         self._num_sample = num_sample
-        if neg_ratio is None:
-            self._neg_ratio = 1. - pos_ratio
+        self._neg_ratio = 1. - pos_ratio if neg_ratio is None else neg_ratio
         self._pos_ratio = pos_ratio
         assert (self._neg_ratio + self._pos_ratio) <= 1.0, (
             "Positive and negative ratio {} exceed 1".format(self._neg_ratio + self._pos_ratio))
@@ -183,6 +195,112 @@ class QuotaSampler(gluon.Block):
         return mx.nd.stack(*results, axis=0)
 
 
+def _random_rank(F, mask):
+    """Random rank of each element along the last axis, elements of `mask` rank first."""
+    keys = F.random.uniform_like(mask) + mask
+    order = F.argsort(keys, axis=-1, is_ascend=False)
+    return F.argsort(order, axis=-1)
+
+
+def _quota_subsample(F, samples, max_pos, max_neg, num_sample=None):
+    """Randomly keep at most `max_pos` positive and the negative quota of samples.
+
+    Positives and negatives are ranked by random keys, and those ranked within the quota
+    are kept, so there is no host synchronization and the graph can be hybridized.
+
+    Parameters
+    ----------
+    samples : NDArray or Symbol
+        (B, N) samples, 1 for positive, -1 for negative, 0 for ignore.
+    max_pos : int
+        Maximum number of positive samples of each row.
+    max_neg : int
+        Maximum number of negative samples of each row.
+    num_sample : int, optional
+        If given, negative samples fill the gap of insufficient positive samples, i.e.
+        the negative quota is ``max(num_sample - num_pos, max_neg)``.
+
+    """
+    pos = samples > 0
+    neg = samples < 0
+    pos_keep = pos * (_random_rank(F, pos) < max_pos)
+    if num_sample:
+        quota = F.maximum(num_sample - F.sum(pos_keep, axis=-1, keepdims=True), max_neg)
+    else:
+        quota = F.zeros_like(F.sum(pos, axis=-1, keepdims=True)) + max_neg
+    neg_keep = neg * F.broadcast_lesser(_random_rank(F, neg), quota)
+    return pos_keep - neg_keep
+
+
+class HybridQuotaSampler(gluon.HybridBlock):
+    """Sampler that handles limited quota for positive and negative samples.
+
+    Same sampling as :py:class:`QuotaSampler` and the ``quota_sampler`` custom operator,
+    but selections are made by sorting random keys in the graph instead of
+    `numpy.random.choice` on the host, so it can be hybridized and runs batched.
+
+    Parameters
+    ----------
+    num_sample : int
+        Number of samples of each image.
+    pos_thresh : float
+        Proposal whose IOU larger than ``pos_thresh`` is regarded as positive samples.
+    neg_thresh_high : float
+        Proposal whose IOU smaller than ``neg_thresh_high``
+        and larger than ``neg_thresh_low`` is regarded as negative samples.
+    neg_thresh_low : float, default is -inf
+        See ``neg_thresh_high``.
+    pos_ratio : float, default is 0.5
+        ``pos_ratio`` defines how many positive samples (``pos_ratio * num_sample``) is
+        to be sampled.
+    neg_ratio : float or None
+        ``neg_ratio`` defines how many negative samples (``neg_ratio * num_sample``) is
+        to be sampled. If ``None`` is provided, it equals to ``1 - pos_ratio``.
+    fill_negative : bool, default is True
+        If ``True``, negative samples will fill the gap caused by insufficient positive samples.
+
+    """
+    def __init__(self, num_sample, pos_thresh, neg_thresh_high, neg_thresh_low=-np.inf,
+                 pos_ratio=0.5, neg_ratio=None, fill_negative=True):
+        super(HybridQuotaSampler, self).__init__()
+        if neg_ratio is None:
+            neg_ratio = 1. - pos_ratio
+        assert (neg_ratio + pos_ratio) <= 1.0, (
+            "Positive and negative ratio {} exceed 1".format(neg_ratio + pos_ratio))
+        self._num_sample = num_sample if fill_negative else None
+        self._max_pos = int(round(pos_ratio * num_sample))
+        self._max_neg = int(neg_ratio * num_sample)
+        self._pos_thresh = min(1., max(0., pos_thresh))
+        self._neg_thresh_high = min(1., max(0., neg_thresh_high))
+        self._neg_thresh_low = neg_thresh_low
+
+    def hybrid_forward(self, F, matches, ious):
+        """Quota Sampler
+
+        Parameters:
+        ----------
+        matches : NDArray or Symbol
+            (B, N) matching results, positive number for positive matching, -1 for not matched.
+        ious : NDArray or Symbol
+            (B, N, M) IOU overlaps.
+
+        Returns:
+        --------
+        NDArray or Symbol
+            Sampling results with same shape as ``matches``.
+            1 for positive, -1 for negative, 0 for ignore.
+
+        """
+        ious_max = ious.max(axis=-1)
+        neg_mask = (ious_max < self._neg_thresh_high) * (ious_max >= self._neg_thresh_low)
+        pos_mask = (matches >= 0) + (ious_max >= self._pos_thresh)
+        ones = F.ones_like(ious_max)
+        # negatives first, positives override them
+        samples = F.where(neg_mask, ones * -1, F.zeros_like(ious_max))
+        samples = F.where(pos_mask, ones, samples)
+        return _quota_subsample(F, samples, self._max_pos, self._max_neg, self._num_sample)
+
+
 class QuotaSamplerOp(mx.operator.CustomOp):
     """Sampler that handles limited quota for positive and negative samples.
 
@@ -222,8 +340,7 @@ class QuotaSamplerOp(mx.operator.CustomOp):
         super(QuotaSamplerOp, self).__init__()
         self._num_sample = num_sample
         self._fill_negative = fill_negative
-        if neg_ratio is None:
-            self._neg_ratio = 1. - pos_ratio
+        self._neg_ratio = 1. - pos_ratio if neg_ratio is None else neg_ratio
         self._pos_ratio = pos_ratio
         assert (self._neg_ratio + self._pos_ratio) <= 1.0, (
             "Positive and negative ratio {} exceed 1".format(self._neg_ratio + self._pos_ratio))
@@ -6,6 +6,7 @@ from . import viz
 from . import random
 from . import metrics
 from . import parallel
+from . import sparse_coding
 
 from .download import download, check_sha1
 from .filesystem import makedirs
@@ -13,4 +14,8 @@ from .bbox import bbox_iou
 from .block import recursive_visit, set_lr_mult, freeze_bn
 from .lr_scheduler import LRScheduler
 from .plot_history import TrainingHistory
-from .export_helper import export_block
+from .export_helper import export_block, export_coef_bases
+from .model_cache import get_cached_model
+from .train_profiler import TrainProfiler
+from .checkpoint import CheckpointManager
+from .distributed import launch_local, exit_code
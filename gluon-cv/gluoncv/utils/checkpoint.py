@@ -0,0 +1,266 @@
+"""Asynchronous checkpoints of network parameters and trainer states."""
+# pylint: disable=broad-except
+from __future__ import absolute_import
+import os
+import json
+import shutil
+import logging
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+import mxnet as mx
+
+__all__ = ['CheckpointManager']
+
+
+def _atomic_write(filename, write):
+    """Write through a temporary file and rename, so readers never see partial files."""
+    tmp = '{}.{}.tmp'.format(filename, os.getpid())
+    write(tmp)
+    os.rename(tmp, filename)
+
+
+class CheckpointManager(object):
+    """Save parameters and trainer states in a background thread.
+
+    `save` copies parameters and optimizer states to host memory on the calling
+    thread, which only waits for the device to host copy, and a background thread
+    writes them to disk with atomic renames. Periodic checkpoints keep the last
+    `keep_last`, and the `keep_best` checkpoints with the highest metric are kept
+    in addition. Files are named `{prefix}_{epoch:04d}_{metric:.4f}.params` and
+    `.states`, same as the training scripts, the best one is also copied to
+    `{prefix}_best.params` and `{prefix}_best.states`, and all kept checkpoints are
+    listed in the manifest `{prefix}_checkpoints.json`, which is reloaded when resuming.
+
+    Parameters
+    ----------
+    prefix : str
+        Prefix of checkpoint files.
+    keep_last : int, default is 3
+        Number of periodic checkpoints to keep, 0 keeps all.
+    keep_best : int, default is 1
+        Number of best checkpoints to keep.
+    async_write : bool, default is True
+        Write in a background thread. Otherwise `save` returns after writing.
+    resume : bool, default is False
+        Reload the manifest of a previous run with the same prefix, so its best metric
+        and kept checkpoints carry over. Otherwise the manifest is started anew, and
+        checkpoints of previous runs are neither pruned nor compared against.
+
+    """
+    def __init__(self, prefix, keep_last=3, keep_best=1, async_write=True, resume=False):
+        self._prefix = prefix
+        self._keep_last = keep_last
+        self._keep_best = keep_best
+        self._manifest = prefix + '_checkpoints.json'
+        self._last = []
+        self._best = []
+        if resume and os.path.isfile(self._manifest):
+            with open(self._manifest) as f:
+                manifest = json.load(f)
+            self._last = manifest.get('last', [])
+            self._best = manifest.get('best', [])
+        self._error = None
+        self._queue = None
+        if async_write:
+            self._queue = queue.Queue(maxsize=2)
+            self._thread = threading.Thread(target=self._worker)
+            self._thread.daemon = True
+            self._thread.start()
+
+    @property
+    def best_metric(self):
+        """Highest metric of saved checkpoints, 0 if none."""
+        return self._best[0]['metric'] if self._best else 0.
+
+    @property
+    def checkpoints(self):
+        """Kept checkpoints, the periodic ones first, then the best ones."""
+        return list(self._last) + [c for c in self._best if c not in self._last]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                job()
+            except Exception as e:
+                self._error = e
+                logging.error('Failed to write checkpoint: {}'.format(e))
+            finally:
+                self._queue.task_done()
+
+    def _check_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _submit(self, job):
+        self._check_error()
+        if self._queue is None:
+            job()
+        else:
+            self._queue.put(job)
+
+    def _qualifies_best(self, metric):
+        if metric is None or metric <= 0 or not self._keep_best:
+            return False
+        return len(self._best) < self._keep_best or metric > self._best[-1]['metric']
+
+    def save(self, net, trainer=None, epoch=0, metric=None, periodic=True):
+        """Snapshot and write a checkpoint if it is periodic or among the best.
+
+        Parameters
+        ----------
+        net : mxnet.gluon.Block
+            Network whose parameters are saved.
+        trainer : mxnet.gluon.Trainer, optional
+            Trainer whose optimizer states are saved.
+        epoch : int
+            Current epoch.
+        metric : float, optional
+            Validation metric, higher is better. Non-positive values, e.g. of epochs
+            without validation, are never the best.
+        periodic : bool, default is True
+            Whether this is a periodic checkpoint, e.g. every `--save-interval` epochs.
+
+        Returns
+        -------
+        bool
+            Whether a checkpoint is saved.
+        """
+        best = self._qualifies_best(metric)
+        if not periodic and not best:
+            return False
+        metric = 0. if metric is None else float(metric)
+        # snapshot on this thread, training may change parameters after returning
+        params = {name: p._reduce() for name, p in net._collect_params_with_prefix().items()}
+        for arr in params.values():
+            arr.wait_to_read()
+        states = self._trainer_states(trainer) if trainer is not None else None
+        stem = '{:s}_{:04d}_{:.4f}'.format(self._prefix, epoch, metric)
+        entry = {'epoch': epoch, 'metric': metric, 'params': stem + '.params',
+                 'states': stem + '.states' if states is not None else None}
+
+        new_best = best and metric > self.best_metric
+        if periodic:
+            self._last.append(entry)
+        if best:
+            self._best = sorted(self._best + [entry], key=lambda c: -c['metric'])
+        removed = []
+        if self._keep_last and len(self._last) > self._keep_last:
+            removed += self._last[:-self._keep_last]
+            self._last = self._last[-self._keep_last:]
+        if len(self._best) > self._keep_best:
+            removed += self._best[self._keep_best:]
+            self._best = self._best[:self._keep_best]
+        kept = self.checkpoints
+        removed = [c for c in removed if c not in kept]
+        manifest = {'last': list(self._last), 'best': list(self._best)}
+
+        def _job():
+            _atomic_write(entry['params'], lambda f: mx.nd.save(f, params))
+            if states is not None:
+                _atomic_write(entry['states'], lambda f: self._write_states(f, states))
+            if new_best:
+                _atomic_write(self._prefix + '_best.params',
+                              lambda f: shutil.copyfile(entry['params'], f))
+                if states is not None:
+                    _atomic_write(self._prefix + '_best.states',
+                                  lambda f: shutil.copyfile(entry['states'], f))
+                with open(self._prefix + '_best_map.log', 'a') as f:
+                    f.write('{:04d}:\t{:.4f}\n'.format(epoch, metric))
+            _atomic_write(self._manifest, lambda f: self._write_json(f, manifest))
+            for c in removed:
+                for filename in (c['params'], c['states']):
+                    if filename and os.path.isfile(filename):
+                        os.remove(filename)
+
+        self._submit(_job)
+        return True
+
+    @staticmethod
+    def _states_on_servers(trainer):
+        """Whether optimizer states live on distributed kvstore servers, out of reach of
+        workers, i.e. the trainer updates on a dist kvstore."""
+        if not trainer._kv_initialized:
+            trainer._init_kvstore()
+        if trainer._update_on_kvstore and trainer._kvstore._updater is None:
+            logging.warning('Optimizer states are on kvstore servers and not checkpointed, '
+                            'create the Trainer with update_on_kvstore=False to keep them.')
+            return True
+        return False
+
+    @classmethod
+    def _trainer_states(cls, trainer):
+        """Optimizer states in host memory, in the format of `Trainer.save_states`, or
+        `None` if they are on kvstore servers."""
+        if cls._states_on_servers(trainer):
+            return None
+        if trainer._params_to_init:
+            trainer._init_params()
+        if trainer._update_on_kvstore:
+            # states live in the updater of the local kvstore
+            return trainer._kvstore._updater.get_states(dump_optimizer=True)
+        return trainer._updaters[0].get_states(dump_optimizer=True)
+
+    @staticmethod
+    def _write_states(filename, states):
+        with open(filename, 'wb') as f:
+            f.write(states)
+
+    @staticmethod
+    def _write_json(filename, obj):
+        with open(filename, 'w') as f:
+            json.dump(obj, f, indent=2)
+
+    @classmethod
+    def load(cls, net, trainer, params_file, **kwargs):
+        """Load parameters, and trainer states saved next to them if present.
+
+        The learning rate scheduler of the trainer is kept instead of the pickled one,
+        so schedulers updated by the training loop keep driving the optimizer.
+
+        Parameters
+        ----------
+        net : mxnet.gluon.Block or None
+            Network to load parameters into, `None` only loads trainer states.
+        trainer : mxnet.gluon.Trainer or None
+            Trainer to load optimizer states into.
+        params_file : str
+            Parameter file, e.g. `yolo3_xxx_0123_0.0000.params`.
+        kwargs
+            Arguments of `load_parameters`, e.g. `allow_missing`.
+
+        Returns
+        -------
+        bool
+            Whether trainer states are loaded.
+        """
+        if net is not None:
+            net.load_parameters(params_file, **kwargs)
+        states_file = os.path.splitext(params_file)[0] + '.states'
+        if trainer is None or not os.path.isfile(states_file) or cls._states_on_servers(trainer):
+            return False
+        lr_scheduler = trainer._optimizer.lr_scheduler
+        trainer.load_states(states_file)
+        trainer._optimizer.lr_scheduler = lr_scheduler
+        return True
+
+    def wait(self):
+        """Wait until all submitted checkpoints are written."""
+        if self._queue is not None:
+            self._queue.join()
+        self._check_error()
+
+    def close(self):
+        """Write pending checkpoints and stop the background thread."""
+        if self._queue is not None:
+            self._queue.join()
+            self._queue.put(None)
+            self._thread.join()
+            self._queue = None
+        self._check_error()
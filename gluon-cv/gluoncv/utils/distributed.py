@@ -0,0 +1,107 @@
+"""Launch data parallel training in several local processes."""
+from __future__ import absolute_import
+from __future__ import division
+import os
+import sys
+import time
+import logging
+import subprocess
+import multiprocessing
+
+__all__ = ['launch_local', 'exit_code']
+
+
+def launch_local(command, num_workers, num_servers=1, threads_per_worker=None,
+                 port=9091, env=None, timeout=60):
+    """Run `command` in `num_workers` processes synchronized by a local `dist_sync` kvstore.
+
+    Starts the parameter server scheduler, `num_servers` servers and the workers on
+    this host with the environment variables of the MXNet distributed kvstore, so
+    `mx.kv.create('dist_sync')` in `command` connects them. CPU threads are divided
+    among workers with `OMP_NUM_THREADS` and `MXNET_CPU_WORKER_NTHREADS`, so workers
+    do not oversubscribe the cores.
+
+    Parameters
+    ----------
+    command : list of str
+        Worker command, e.g. `['python', 'train_tinyyolo.py', '--kvstore', 'dist_sync']`.
+    num_workers : int
+        Number of worker processes.
+    num_servers : int, default is 1
+        Number of parameter server processes.
+    threads_per_worker : int, optional
+        CPU threads of each worker, default divides all cores among workers.
+    port : int, default is 9091
+        Port of the scheduler.
+    env : dict, optional
+        Additional environment variables of all processes.
+    timeout : float, default is 60
+        Seconds to wait for the scheduler and servers to exit after the workers.
+
+    Returns
+    -------
+    list of int
+        Exit codes of the workers.
+    """
+    if threads_per_worker is None:
+        threads_per_worker = max(1, multiprocessing.cpu_count() // num_workers)
+    base = dict(os.environ)
+    base.update(env or {})
+    base.update({'DMLC_PS_ROOT_URI': '127.0.0.1',
+                 'DMLC_PS_ROOT_PORT': str(port),
+                 'DMLC_NUM_SERVER': str(num_servers),
+                 'DMLC_NUM_WORKER': str(num_workers)})
+    # scheduler and servers run their loop when importing mxnet
+    ps_command = [sys.executable, '-c', 'import mxnet']
+
+    def _spawn(role, cmd, threads):
+        proc_env = dict(base, DMLC_ROLE=role, OMP_NUM_THREADS=str(threads),
+                        MXNET_CPU_WORKER_NTHREADS=str(threads))
+        return subprocess.Popen(cmd, env=proc_env)
+
+    services = [_spawn('scheduler', ps_command, 1)]
+    services += [_spawn('server', ps_command, 1) for _ in range(num_servers)]
+    workers = [_spawn('worker', command, threads_per_worker) for _ in range(num_workers)]
+    codes = [None] * num_workers
+    try:
+        while None in codes:
+            for i, proc in enumerate(workers):
+                if codes[i] is None:
+                    codes[i] = proc.poll()
+            failed = [c for c in codes if c not in (None, 0)]
+            if failed:
+                logging.error('Worker exited with code {}, stopping all processes'.format(failed[0]))
+                break
+            time.sleep(0.1)
+    finally:
+        for proc in workers:
+            if proc.poll() is None:
+                proc.terminate()
+        deadline = time.time() + timeout
+        for proc in services:
+            while proc.poll() is None and time.time() < deadline:
+                time.sleep(0.1)
+            if proc.poll() is None:
+                proc.terminate()
+    return [proc.wait() for proc in workers]
+
+
+def exit_code(codes):
+    """Exit code of a launch from the exit codes of its workers.
+
+    The first non-zero code is returned, so a worker which crashed is not hidden by
+    others which succeeded. Workers killed by a signal have negative codes, which are
+    mapped to `128 + signal` as in shells.
+
+    Parameters
+    ----------
+    codes : list of int
+        Exit codes of the workers, as returned by :py:func:`launch_local`.
+
+    Returns
+    -------
+    int
+        Zero if all workers succeeded.
+    """
+    code = next((c for c in codes if c), 0)
+    return 128 - code if code < 0 else code
@@ -1,9 +1,11 @@
 """Helper utils for export HybridBlock to symbols."""
 from __future__ import absolute_import
+import numpy as np
 import mxnet as mx
 from mxnet.base import MXNetError
 from mxnet.gluon import HybridBlock
 from mxnet.gluon import nn
+from .bbox import x_mean, sqrt_var
 
 
 class _DefaultPreprocess(HybridBlock):
@@ -115,3 +117,39 @@ def export_block(path, block, data_shape=None, epoch=0, preprocess=True, layout=
             last_exception = e
     if last_exception is not None:
         raise RuntimeError(str(last_exception).splitlines()[0])
+
+def export_coef_bases(path, bases, coef_mean=None, coef_std=None):
+    """Save the bases and coefficient normalization of a USD-Seg network for the C++
+    interface, which reconstructs masks from the exported network outputs.
+
+    Parameters
+    ----------
+    path : str
+        Path to save, `path-bases.params` will be created with float32 arrays
+        `bases` (K, S * S), `coef_mean` (K,) and `coef_std` (K,), where masks
+        are S x S.
+    bases : numpy.ndarray or str
+        Bases with shape (K, S * S), or a `.npy` file of them.
+    coef_mean : array-like, default is None
+        Mean of coefficients, default is `gluoncv.utils.bbox.x_mean`.
+    coef_std : array-like, default is None
+        Standard deviation of coefficients, default is `gluoncv.utils.bbox.sqrt_var`.
+
+    Returns
+    -------
+    str
+        The saved file.
+
+    """
+    if isinstance(bases, str):
+        bases = np.load(bases)
+    bases = np.asarray(bases, dtype=np.float32)
+    coef_mean = np.asarray(x_mean if coef_mean is None else coef_mean, dtype=np.float32)
+    coef_std = np.asarray(sqrt_var if coef_std is None else coef_std, dtype=np.float32)
+    if coef_mean.shape != (bases.shape[0],) or coef_std.shape != (bases.shape[0],):
+        raise ValueError("Coefficient mean {} and std {} do not match {} bases".format(
+            coef_mean.shape, coef_std.shape, bases.shape[0]))
+    filename = path + '-bases.params'
+    mx.nd.save(filename, {'bases': mx.nd.array(bases), 'coef_mean': mx.nd.array(coef_mean),
+                          'coef_std': mx.nd.array(coef_std)})
+    return filename
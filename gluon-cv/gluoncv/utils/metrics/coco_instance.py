@@ -188,35 +188,38 @@ class COCOInstanceMetric(mx.metric.EvalMetric):
         pred_score = pred_score.flat[valid_pred].astype('float32')
         pred_coef = pred_coef[valid_pred].astype('float32')
 
-        imgid = self._img_ids[self._current_id]
-        self._current_id += 1
-        # print(imgid)
-        # for each bbox detection in each image
-        for bbox, label, score, coef in zip(pred_bbox, pred_label, pred_score, pred_coef):
-            if label not in self.dataset.contiguous_id_to_json:
-                # ignore non-exist class
-                continue
-            if score < self._score_thresh:
-                continue
-            category_id = self.dataset.contiguous_id_to_json[label]
-
-            # Reconstruct the mask
+        keep = [i for i, label in enumerate(pred_label)
+                if label in self.dataset.contiguous_id_to_json]  # ignore non-exist class
+        pred_bbox, pred_label, pred_score, pred_coef = [
+            x[keep] for x in [pred_bbox, pred_label, pred_score, pred_coef]]
+        if self._method == 'var':
+            pred_coef = pred_coef * sqrt_var + x_mean
+        else:  # uniform
+            pred_coef = pred_coef * (x_max - x_min) + x_min
+        # reconstruct masks of all detections in one product, and paste them into one
+        # Fortran order array which pycocotools encodes without copying
+        pred_masks = np.dot(pred_coef, self._bases).reshape((-1, 64, 64))
+        full_masks = np.zeros((im_height, im_width, len(pred_masks)), dtype=np.uint8, order='F')
+        for mask, pred_mask, bbox in zip(full_masks.transpose(2, 0, 1), pred_masks, pred_bbox):
             x1, x2, y1, y2 = int(bbox[0]), int(bbox[2]), int(bbox[1]), int(bbox[3])
             w, h = x2 - x1, y2 - y1
-            if(self._method == 'var'):
-                coef = coef * sqrt_var + x_mean
-            else:  # uniform
-                coef = coef * (x_max - x_min) + x_min
-            pred_mask = np.dot(coef, self._bases).reshape((64, 64))
+            xx1, yy1 = max(0, x1), max(0, y1)
+            xx2, yy2 = min(im_width, x2), min(im_height, y2)
+            if w <= 0 or h <= 0 or xx2 <= xx1 or yy2 <= yy1:
+                continue
             resized = cv.resize(pred_mask, (w, h))
-            resized = (resized >= ((pred_mask.max() + pred_mask.min())/2))  # bool
-            mask = np.zeros((im_height, im_width), dtype=np.uint8)  # Has to be uint8 instead of bool
-            mask[y1:y2, x1:x2] = np.array(resized)
+            mask[yy1:yy2, xx1:xx2] = resized[yy1 - y1:yy2 - y1, xx1 - x1:xx2 - x1] >= (
+                (pred_mask.max() + pred_mask.min()) / 2)
+        rles = self._cocomask.encode(full_masks) if len(pred_masks) else []
 
+        imgid = self._img_ids[self._current_id]
+        self._current_id += 1
+        # for each bbox detection in each image
+        for bbox, label, score, rle in zip(pred_bbox, pred_label, pred_score, rles):
+            category_id = self.dataset.contiguous_id_to_json[label]
             # convert [xmin, ymin, xmax, ymax]  to [xmin, ymin, w, h]
             bbox[2:4] -= bbox[:2]
-            # coco format full image mask to rle
-            rle = self._encode_mask(mask.astype(np.uint8))
+            rle['counts'] = rle['counts'].decode('ascii')
             self._results.append({'image_id': imgid,
                                   'category_id': category_id,
                                   'bbox': list(map(lambda x: float(round(x, 2)), bbox[:4])),
@@ -1,19 +1,32 @@
 """Evaluation Metrics for Semantic Segmentation"""
-import threading
 import numpy as np
 import mxnet as mx
 from mxnet.metric import EvalMetric
 
-__all__ = ['SegmentationMetric', 'batch_pix_accuracy', 'batch_intersection_union',
-           'pixelAccuracy', 'intersectionAndUnion']
+__all__ = ['SegmentationMetric', 'batch_confusion_matrix', 'batch_pix_accuracy',
+           'batch_intersection_union', 'pixelAccuracy', 'intersectionAndUnion']
 
 class SegmentationMetric(EvalMetric):
     """Computes pixAcc and mIoU metric scores
+
+    Predictions and labels are reduced to a ``nclass x nclass`` confusion matrix, rows
+    are labels and columns are predictions, from which pixAcc, per class IoU, mIoU and
+    frequency weighted IoU are derived. On GPU the matrix is computed on device, so only
+    the matrix is copied to host memory instead of full resolution predictions.
+
+    Parameters
+    ----------
+    nclass : int
+        Number of classes.
+    ignore_label : int, default is -1
+        Label of ignored pixels, e.g. background or boundary. Labels out of
+        ``[0, nclass)`` are ignored as well.
+
     """
-    def __init__(self, nclass):
-        super(SegmentationMetric, self).__init__('pixAcc & mIoU')
+    def __init__(self, nclass, ignore_label=-1):
         self.nclass = nclass
-        self.lock = threading.Lock()
+        self.ignore_label = ignore_label
+        super(SegmentationMetric, self).__init__('pixAcc & mIoU')
         self.reset()
 
     def update(self, labels, preds):
@@ -27,28 +40,13 @@ class SegmentationMetric(EvalMetric):
         preds : 'NDArray' or list of `NDArray`
             Predicted values.
         """
-        def evaluate_worker(self, label, pred):
-            correct, labeled = batch_pix_accuracy(
-                pred, label)
-            inter, union = batch_intersection_union(
-                pred, label, self.nclass)
-            with self.lock:
-                self.total_correct += correct
-                self.total_label += labeled
-                self.total_inter += inter
-                self.total_union += union
-
         if isinstance(preds, mx.nd.NDArray):
-            evaluate_worker(self, labels, preds)
-        elif isinstance(preds, (list, tuple)):
-            threads = [threading.Thread(target=evaluate_worker,
-                                        args=(self, label, pred),
-                                       )
-                       for (label, pred) in zip(labels, preds)]
-            for thread in threads:
-                thread.start()
-            for thread in threads:
-                thread.join()
+            labels, preds = [labels], [preds]
+        # launch the computation on all devices before copying any matrix
+        matrices = [_confusion_matrix(pred, label, self.nclass, self.ignore_label)
+                    for (label, pred) in zip(labels, preds)]
+        for matrix in matrices:
+            self.confusion_matrix += _as_numpy(matrix)
 
     def get(self):
         """Gets the current evaluation result.
@@ -59,16 +57,107 @@ class SegmentationMetric(EvalMetric):
             pixAcc and mIoU
         """
         pixAcc = 1.0 * self.total_correct / (np.spacing(1) + self.total_label)
-        IoU = 1.0 * self.total_inter / (np.spacing(1) + self.total_union)
-        mIoU = IoU.mean()
+        mIoU = self.get_iou().mean()
         return pixAcc, mIoU
 
+    def get_iou(self):
+        """Gets IoU of each class, 0 for classes which are neither labeled nor predicted.
+
+        Returns
+        -------
+        numpy.ndarray
+            (nclass,) IoU.
+        """
+        return 1.0 * self.total_inter / (np.spacing(1) + self.total_union)
+
+    def get_fwiou(self):
+        """Gets IoU weighted by the frequency of labels of each class.
+
+        Returns
+        -------
+        float
+            Frequency weighted IoU.
+        """
+        freq = self.confusion_matrix.sum(axis=1) / (np.spacing(1) + self.total_label)
+        return float((freq * self.get_iou()).sum())
+
+    @property
+    def total_correct(self):
+        """Number of correctly predicted pixels."""
+        return np.trace(self.confusion_matrix)
+
+    @property
+    def total_label(self):
+        """Number of labeled pixels."""
+        return self.confusion_matrix.sum()
+
+    @property
+    def total_inter(self):
+        """Intersection area of each class."""
+        return np.diag(self.confusion_matrix)
+
+    @property
+    def total_union(self):
+        """Union area of each class."""
+        return (self.confusion_matrix.sum(axis=0) + self.confusion_matrix.sum(axis=1) -
+                np.diag(self.confusion_matrix))
+
     def reset(self):
         """Resets the internal evaluation result to initial state."""
-        self.total_inter = 0
-        self.total_union = 0
-        self.total_correct = 0
-        self.total_label = 0
+        self.confusion_matrix = np.zeros((self.nclass, self.nclass), dtype=np.int64)
+
+def batch_confusion_matrix(output, target, nclass, ignore_label=-1):
+    """Confusion matrix of a batch
+
+    Parameters
+    ----------
+    output : NDArray
+        (B, nclass, H, W) predicted scores.
+    target : NDArray
+        (B, H, W) labels.
+    nclass : int
+        Number of classes.
+    ignore_label : int, default is -1
+        Label of ignored pixels. Labels out of ``[0, nclass)`` are ignored as well.
+
+    Returns
+    -------
+    numpy.ndarray
+        (nclass, nclass) int64 numbers of pixels of each label (row) and prediction (column).
+    """
+    return _as_numpy(_confusion_matrix(output, target, nclass, ignore_label))
+
+# pixels of one-hot products on GPU, limits the memory of one-hot maps
+_DEVICE_CHUNK = 1 << 22
+
+def _confusion_matrix(output, target, nclass, ignore_label):
+    """Confusion matrix as a numpy array, or a pending NDArray on GPU."""
+    predict = mx.nd.argmax(output, axis=1).reshape((-1,))
+    target = target.as_in_context(predict.context).astype(predict.dtype).reshape((-1,))
+    assert predict.size == target.size, "Prediction and label sizes do not match"
+    if predict.context.device_type != 'gpu':
+        predict = predict.asnumpy().astype(np.int64)
+        target = target.asnumpy().astype(np.int64)
+        valid = (target >= 0) & (target < nclass) & (target != ignore_label)
+        return np.bincount(nclass * target[valid] + predict[valid],
+                           minlength=nclass * nclass).reshape(nclass, nclass)
+    valid = (target >= 0) * (target < nclass) * (target != ignore_label)
+    # one_hot of labels out of range is all zeros
+    target = mx.nd.where(valid, target, -mx.nd.ones_like(target))
+    matrix = mx.nd.zeros((nclass, nclass), ctx=predict.context, dtype='float64')
+    chunk = max(1, _DEVICE_CHUNK // nclass)
+    for begin in range(0, predict.size, chunk):
+        end = min(begin + chunk, predict.size)
+        # counts of a chunk are exact in float32
+        matrix += mx.nd.dot(mx.nd.one_hot(target[begin:end], nclass),
+                            mx.nd.one_hot(predict[begin:end], nclass),
+                            transpose_a=True).astype('float64')
+    return matrix
+
+def _as_numpy(matrix):
+    if isinstance(matrix, mx.nd.NDArray):
+        return np.rint(matrix.asnumpy()).astype(np.int64)
+    return matrix
 
 def batch_pix_accuracy(output, target):
     """PixAcc"""
@@ -5,22 +5,33 @@ from collections import defaultdict
 import numpy as np
 import mxnet as mx
 from ..bbox import coef_polygon_iou, new_iou
+from ..filesystem import makedirs
 from PIL import Image
 import os
 
-class VOCPolygonMApMetric(mx.metric.EvalMetric):
+class PolygonMApMetric(mx.metric.EvalMetric):
     """
-    Calculate mean AP for ESE-Seg task (Polygon mAP)
+    Base class of polygon(mask) mAP metrics.
+
+    The IoU matrix between predictions and ground-truths of one class in one image
+    is computed only once by the subclass `update`, then matched against every
+    threshold in `iou_thresh`. Evaluating AP@0.5, AP@0.75 and COCO-style AP
+    therefore costs a single pass of mask IoU computation.
 
     Parameters:
     ---------
-    iou_thresh : float
-        IOU overlap threshold for TP
+    iou_thresh : float or list of float
+        IOU overlap threshold(s) for TP
     class_names : list of str
         optional, if provided, will print out AP for each class
     """
     def __init__(self, iou_thresh=0.5, class_names=None):
-        super(VOCPolygonMApMetric, self).__init__('VOCMeanAP')
+        if isinstance(iou_thresh, (list, tuple)):
+            assert len(iou_thresh) > 0, "at least one iou threshold is required"
+            self.iou_threshs = tuple(float(t) for t in iou_thresh)
+        else:
+            self.iou_threshs = (float(iou_thresh),)
+        super(PolygonMApMetric, self).__init__('VOCMeanAP')
         if class_names is None:
             self.num = None
         else:
@@ -33,7 +44,6 @@ class VOCPolygonMApMetric(mx.metric.EvalMetric):
         self.reset()
         self.iou_thresh = iou_thresh
         self.class_names = class_names
-        self.bases = np.load('/home/tutian/dataset/sbd/all_50_1.npy')
 
     def reset(self):
         """Clear the internal statistics to initial state."""
@@ -45,7 +55,14 @@ class VOCPolygonMApMetric(mx.metric.EvalMetric):
             self.sum_metric = [0.0] * self.num
         self._n_pos = defaultdict(int)
         self._score = defaultdict(list)
-        self._match = defaultdict(list)
+        self._matches = [defaultdict(list) for _ in self.iou_threshs]
+        # per threshold aps, filled by `_update`
+        self._aps = []
+
+    @property
+    def _match(self):
+        """Match records of the first iou threshold."""
+        return self._matches[0]
 
     def get(self):
         """Get the current evaluation result.
@@ -58,6 +75,8 @@ class VOCPolygonMApMetric(mx.metric.EvalMetric):
            Value of the evaluation.
         """
         self._update()  # update metric at this time
+        if len(self.iou_threshs) > 1:
+            return self._get_multi()
         if self.num is None:
             if self.num_inst == 0:
                 return (self.name, float('nan'))
@@ -69,6 +88,245 @@ class VOCPolygonMApMetric(mx.metric.EvalMetric):
                 for x, y in zip(self.sum_metric, self.num_inst)]
             return (names, values)
 
+    def _get_multi(self):
+        """Get per threshold results and the mAP averaged over all thresholds."""
+        map_name = self.name if self.num is None else self.name[-1]
+        names, values, maps = [], [], []
+        for thresh, aps in zip(self.iou_threshs, self._aps):
+            if self.num is not None:
+                names.extend(['%s@%s' % (n, thresh) for n in self.name[:-1]])
+                values.extend(self._pad_aps(aps))
+            maps.append(np.nanmean(aps))
+            names.append('%s@%s' % (map_name, thresh))
+            values.append(maps[-1])
+        names.append('%s@[%s:%s]' % (map_name, min(self.iou_threshs), max(self.iou_threshs)))
+        values.append(np.mean(maps))
+        return (names, values)
+
+    def _pad_aps(self, aps):
+        """Pad per class aps to the number of classes."""
+        aps = list(aps)[:self.num - 1]
+        return aps + [np.nan] * (self.num - 1 - len(aps))
+
+    def _match_update(self, l, iou, gt_difficult_l):
+        """Record matches of class `l` for every iou threshold.
+
+        Parameters
+        ----------
+        l : int
+            Class id.
+        iou : numpy.ndarray
+            IoU matrix with shape `N, M`, predictions are sorted by score.
+        gt_difficult_l : numpy.ndarray
+            Ground-truth difficulty labels with shape `M`.
+        """
+        best_gt = iou.argmax(axis=1)  # best_gt[pd] = gt_id
+        best_iou = iou.max(axis=1)
+        for thresh, match in zip(self.iou_threshs, self._matches):
+            # set -1 if there is no matching ground truth
+            gt_index = np.where(best_iou < thresh, -1, best_gt)
+            selec = np.zeros(iou.shape[1], dtype=bool)
+            for gt_idx in gt_index:
+                if gt_idx >= 0:
+                    if gt_difficult_l[gt_idx]:
+                        match[l].append(-1)
+                    else:
+                        if not selec[gt_idx]:
+                            match[l].append(1)
+                        else:
+                            match[l].append(0)
+                    selec[gt_idx] = True
+                else:
+                    match[l].append(0)
+
+    def _miss_update(self, l, num_pred):
+        """Record `num_pred` false positives of class `l` for every iou threshold."""
+        for match in self._matches:
+            match[l].extend((0,) * num_pred)
+
+    def _update(self):
+        """ update num_inst and sum_metric """
+        self._aps = []
+        for i, match in enumerate(self._matches):
+            aps = []
+            recall, precs = self._recall_prec(match)
+            for l, rec, prec in zip(range(len(precs)), recall, precs):
+                ap = self._average_precision(rec, prec)
+                aps.append(ap)
+                if i == 0 and self.num is not None and l < (self.num - 1):
+                    self.sum_metric[l] = ap
+                    self.num_inst[l] = 1
+            self._aps.append(aps)
+            if i > 0:
+                continue
+            if self.num is None:
+                self.num_inst = 1
+                self.sum_metric = np.nanmean(aps)
+            else:
+                self.num_inst[-1] = 1
+                self.sum_metric[-1] = np.nanmean(aps)
+
+    def _recall_prec(self, match=None):
+        """ get recall and precision from internal records """
+        if match is None:
+            match = self._match
+        n_fg_class = max(self._n_pos.keys()) + 1
+        prec = [None] * n_fg_class
+        rec = [None] * n_fg_class
+
+        for l in self._n_pos.keys():
+            score_l = np.array(self._score[l])
+            match_l = np.array(match[l], dtype=np.int32)
+
+            order = score_l.argsort()[::-1]
+            match_l = match_l[order]
+
+            tp = np.cumsum(match_l == 1)
+            fp = np.cumsum(match_l == 0)
+
+            # If an element of fp + tp is 0,
+            # the corresponding element of prec[l] is nan.
+            with np.errstate(divide='ignore', invalid='ignore'):
+                prec[l] = tp / (fp + tp)
+            # If n_pos[l] is 0, rec[l] is None.
+            if self._n_pos[l] > 0:
+                rec[l] = tp / self._n_pos[l]
+
+        return rec, prec
+
+    def _average_precision(self, rec, prec):
+        """
+        calculate average precision
+
+        Params:
+        ----------
+        rec : numpy.array
+            cumulated recall
+        prec : numpy.array
+            cumulated precision
+        Returns:
+        ----------
+        ap as float
+        """
+        if rec is None or prec is None:
+            return np.nan
+
+        # append sentinel values at both ends
+        mrec = np.concatenate(([0.], rec, [1.]))
+        mpre = np.concatenate(([0.], np.nan_to_num(prec), [0.]))
+
+        # compute precision integration ladder
+        for i in range(mpre.size - 1, 0, -1):
+            mpre[i - 1] = np.maximum(mpre[i - 1], mpre[i])
+
+        # look for recall value changes
+        i = np.where(mrec[1:] != mrec[:-1])[0]
+
+        # sum (\delta recall) * prec
+        ap = np.sum((mrec[i + 1] - mrec[i]) * mpre[i + 1])
+        return ap
+
+
+class CoefAnalysisRecorder(object):
+    """
+    Buffer matched gt/pred coefficient pairs in memory and dump them into one `.npz` file.
+
+    Each record holds the image id, class label, gt and predicted coefficients and
+    boxes of one matched prediction. Records are only written when `save` is called.
+
+    Parameters:
+    ---------
+    filename : str
+        Path of the `.npz` file to write.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.reset()
+
+    def reset(self):
+        """Drop all buffered records."""
+        self._imgids = []
+        self._labels = []
+        self._gt_coefs = []
+        self._pred_coefs = []
+        self._gt_bboxes = []
+        self._pred_bboxes = []
+
+    def __len__(self):
+        return sum(len(x) for x in self._labels)
+
+    def record(self, imgid, label, gt_coefs, pred_coefs, gt_bboxes, pred_bboxes):
+        """Buffer K matched pairs of one class in one image.
+
+        Parameters
+        ----------
+        imgid : int
+            Image id.
+        label : int
+            Class id shared by the pairs.
+        gt_coefs, pred_coefs : numpy.ndarray
+            Coefficients with shape `K, num_bases`.
+        gt_bboxes, pred_bboxes : numpy.ndarray
+            Boxes with shape `K, 4`.
+        """
+        num = len(gt_coefs)
+        if num == 0:
+            return
+        self._imgids.append(np.full(num, imgid, dtype=np.int64))
+        self._labels.append(np.full(num, label, dtype=np.int32))
+        self._gt_coefs.append(np.asarray(gt_coefs, dtype=np.float32))
+        self._pred_coefs.append(np.asarray(pred_coefs, dtype=np.float32))
+        self._gt_bboxes.append(np.asarray(gt_bboxes, dtype=np.float32))
+        self._pred_bboxes.append(np.asarray(pred_bboxes, dtype=np.float32))
+
+    def save(self):
+        """Write all buffered records into `filename`."""
+        if not self._labels:
+            return
+        dirname = os.path.dirname(self.filename)
+        if dirname:
+            makedirs(dirname)
+        np.savez(self.filename,
+                 imgids=np.concatenate(self._imgids),
+                 labels=np.concatenate(self._labels),
+                 gt_coefs=np.concatenate(self._gt_coefs),
+                 pred_coefs=np.concatenate(self._pred_coefs),
+                 gt_bboxes=np.concatenate(self._gt_bboxes),
+                 pred_bboxes=np.concatenate(self._pred_bboxes))
+
+
+class VOCPolygonMApMetric(PolygonMApMetric):
+    """
+    Calculate mean AP for ESE-Seg task (Polygon mAP)
+
+    Parameters:
+    ---------
+    iou_thresh : float or list of float
+        IOU overlap threshold(s) for TP
+    class_names : list of str
+        optional, if provided, will print out AP for each class
+    analysis_file : str, optional, default is None
+        If provided, gt/pred coefficient pairs of matched predictions are buffered
+        and written into this `.npz` file by `get`. Requires `gt_coefs` and
+        `gt_imgids` in `update`. Disabled by default.
+    """
+    def __init__(self, iou_thresh=0.5, class_names=None, analysis_file=None):
+        self._recorder = CoefAnalysisRecorder(analysis_file) if analysis_file else None
+        super(VOCPolygonMApMetric, self).__init__(iou_thresh, class_names)
+        self.bases = np.load('/home/tutian/dataset/sbd/all_50_1.npy')
+
+    def reset(self):
+        """Clear the internal statistics to initial state."""
+        super(VOCPolygonMApMetric, self).reset()
+        if getattr(self, '_recorder', None) is not None:
+            self._recorder.reset()
+
+    def get(self):
+        """Get the current evaluation result, and dump analysis records if enabled."""
+        if self._recorder is not None:
+            self._recorder.save()
+        return super(VOCPolygonMApMetric, self).get()
+
     def update(self, pred_bboxes, pred_coefs, pred_labels, pred_scores,
                gt_bboxes, gt_points_xs, gt_points_ys, gt_labels, widths, heights, gt_difficults=None, gt_coefs=None, gt_imgids=None):
         """Update internal buffer with latest prediction and gt pairs.
@@ -134,8 +392,10 @@ class VOCPolygonMApMetric(mx.metric.EvalMetric):
             gt_bbox = gt_bbox[valid_gt, :]
             gt_points_xs = gt_points_xs[valid_gt, :]
             gt_points_ys = gt_points_ys[valid_gt, :]
-            gt_coef = gt_coef[valid_gt, :]
-            gt_imgid = gt_imgid[valid_gt, :]
+            if gt_coef is not None:
+                gt_coef = gt_coef[valid_gt, :]
+            if gt_imgid is not None:
+                gt_imgid = gt_imgid[valid_gt, :]
             gt_label = gt_label.flat[valid_gt].astype(int)
             if gt_difficult is None:
                 gt_difficult = np.zeros(gt_bbox.shape[0])
@@ -157,8 +417,9 @@ class VOCPolygonMApMetric(mx.metric.EvalMetric):
 
                 gt_mask_l = gt_label == l
                 gt_bbox_l = gt_bbox[gt_mask_l]
-                gt_coef_l = gt_coef[gt_mask_l]
-                gt_imgid_l = gt_imgid[gt_mask_l]
+                if self._recorder is not None:
+                    gt_coef_l = gt_coef[gt_mask_l]
+                    gt_imgid_l = gt_imgid[gt_mask_l].ravel()
                 gt_points_xs_l = gt_points_xs[gt_mask_l]
                 gt_points_ys_l = gt_points_ys[gt_mask_l]
                 gt_difficult_l = gt_difficult[gt_mask_l]
@@ -169,7 +430,7 @@ class VOCPolygonMApMetric(mx.metric.EvalMetric):
                 if len(pred_bbox_l) == 0:
                     continue
                 if len(gt_bbox_l) == 0:
-                    self._match[l].extend((0,) * pred_bbox_l.shape[0])
+                    self._miss_update(l, pred_bbox_l.shape[0])
                     continue
                 pred_bbox_l = pred_bbox_l.copy()
                 # pred_center_l = pred_center_l.copy()
@@ -179,113 +440,15 @@ class VOCPolygonMApMetric(mx.metric.EvalMetric):
                 gt_points_ys_l = gt_points_ys_l.copy()
                 iou = coef_polygon_iou(pred_coef_l, self.bases, pred_bbox_l, gt_points_xs_l, gt_points_ys_l)
                 # iou: shape [pd, gt]
-                gt_index = iou.argmax(axis=1)  # gt_index[pd] = gt_id
-                # set -1 if there is no matching ground truth
-                gt_index[iou.max(axis=1) < self.iou_thresh] = -1
+                self._match_update(l, iou, gt_difficult_l)
+                if self._recorder is not None:
+                    gt_index = iou.argmax(axis=1)  # gt_index[pd] = gt_id
+                    matched = np.where(iou.max(axis=1) >= self.iou_threshs[0])[0]
+                    gt_index = gt_index[matched]
+                    self._recorder.record(int(gt_imgid_l[0]), l, gt_coef_l[gt_index], pred_coef_l[matched],
+                                          gt_bbox_l[gt_index], pred_bbox_l[matched])
                 del iou
 
-                # print(np.unique(gt_imgid_l))
-                # coef_analysis_var_first_20_label
-                # coef_analysis_uniform_50_label
-                with open(f'/home/tutian/coef_analysis_var_first_20_label/{int(np.unique(gt_imgid_l)[0])}.txt', 'a+') as f:
-                    for (pd, gt) in enumerate(gt_index):
-                        if gt == -1:
-                            continue
-                        to_write = str(gt_coef_l[gt])+str(pred_coef_l[pd])+ str(gt_bbox_l[gt])+str(pred_bbox_l[pd]) + str(gt_label[gt]) + ' '+ str(pred_label[pd])
-                        to_write = to_write.replace('[', ' ').replace(']', ' ').strip().replace('\n', ' ')
-
-                        f.writelines(to_write + '\n')
-
-                selec = np.zeros(gt_bbox_l.shape[0], dtype=bool)
-                for gt_idx in gt_index:
-                    if gt_idx >= 0:
-                        if gt_difficult_l[gt_idx]:
-                            self._match[l].append(-1)
-                        else:
-                            if not selec[gt_idx]:
-                                self._match[l].append(1)
-                            else:
-                                self._match[l].append(0)
-                        selec[gt_idx] = True
-                    else:
-                        self._match[l].append(0)
-
-    def _update(self):
-        """ update num_inst and sum_metric """
-        aps = []
-        recall, precs = self._recall_prec()
-        for l, rec, prec in zip(range(len(precs)), recall, precs):
-            ap = self._average_precision(rec, prec)
-            aps.append(ap)
-            if self.num is not None and l < (self.num - 1):
-                self.sum_metric[l] = ap
-                self.num_inst[l] = 1
-        if self.num is None:
-            self.num_inst = 1
-            self.sum_metric = np.nanmean(aps)
-        else:
-            self.num_inst[-1] = 1
-            self.sum_metric[-1] = np.nanmean(aps)
-
-    def _recall_prec(self):
-        """ get recall and precision from internal records """
-        n_fg_class = max(self._n_pos.keys()) + 1
-        prec = [None] * n_fg_class
-        rec = [None] * n_fg_class
-
-        for l in self._n_pos.keys():
-            score_l = np.array(self._score[l])
-            match_l = np.array(self._match[l], dtype=np.int32)
-
-            order = score_l.argsort()[::-1]
-            match_l = match_l[order]
-
-            tp = np.cumsum(match_l == 1)
-            fp = np.cumsum(match_l == 0)
-
-            # If an element of fp + tp is 0,
-            # the corresponding element of prec[l] is nan.
-            with np.errstate(divide='ignore', invalid='ignore'):
-                prec[l] = tp / (fp + tp)
-            # If n_pos[l] is 0, rec[l] is None.
-            if self._n_pos[l] > 0:
-                rec[l] = tp / self._n_pos[l]
-
-        return rec, prec
-
-    def _average_precision(self, rec, prec):
-        """
-        calculate average precision
-
-        Params:
-        ----------
-        rec : numpy.array
-            cumulated recall
-        prec : numpy.array
-            cumulated precision
-        Returns:
-        ----------
-        ap as float
-        """
-        if rec is None or prec is None:
-            return np.nan
-
-        # append sentinel values at both ends
-        mrec = np.concatenate(([0.], rec, [1.]))
-        mpre = np.concatenate(([0.], np.nan_to_num(prec), [0.]))
-
-        # compute precision integration ladder
-        for i in range(mpre.size - 1, 0, -1):
-            mpre[i - 1] = np.maximum(mpre[i - 1], mpre[i])
-
-        # look for recall value changes
-        i = np.where(mrec[1:] != mrec[:-1])[0]
-
-        # sum (\delta recall) * prec
-        ap = np.sum((mrec[i + 1] - mrec[i]) * mpre[i + 1])
-        return ap
-
-
 class VOC07PolygonMApMetric(VOCPolygonMApMetric):
     """ Mean average precision metric for PASCAL V0C 07 dataset
 
@@ -327,70 +490,24 @@ class VOC07PolygonMApMetric(VOCPolygonMApMetric):
         return ap
 
 
-class NewPolygonMApMetric(mx.metric.EvalMetric):
+class NewPolygonMApMetric(PolygonMApMetric):
     """
     Calculate mean AP for ESE-Seg task (Polygon mAP)
 
     Parameters:
     ---------
-    iou_thresh : float
-        IOU overlap threshold for TP
+    iou_thresh : float or list of float
+        IOU overlap threshold(s) for TP
     class_names : list of str
         optional, if provided, will print out AP for each class
     """
     def __init__(self, iou_thresh=0.5, class_names=None, root=None):
-        super(NewPolygonMApMetric, self).__init__('VOCMeanAP')
-        if class_names is None:
-            self.num = None
-        else:
-            assert isinstance(class_names, (list, tuple))
-            for name in class_names:
-                assert isinstance(name, str), "must provide names as str"
-            num = len(class_names)
-            self.name = list(class_names) + ['mAP']
-            self.num = num + 1
-        self.reset()
-        self.iou_thresh = iou_thresh
-        self.class_names = class_names
+        super(NewPolygonMApMetric, self).__init__(iou_thresh, class_names)
         bases_root = '/home/tutian/dataset/coco_to_voc/coco_all_50_1.npy'
         print(f"Metric is loading {bases_root}")
         self.bases = np.load(bases_root)
         self.root = root
 
-    def reset(self):
-        """Clear the internal statistics to initial state."""
-        if getattr(self, 'num', None) is None:
-            self.num_inst = 0
-            self.sum_metric = 0.0
-        else:
-            self.num_inst = [0] * self.num
-            self.sum_metric = [0.0] * self.num
-        self._n_pos = defaultdict(int)
-        self._score = defaultdict(list)
-        self._match = defaultdict(list)
-
-    def get(self):
-        """Get the current evaluation result.
-
-        Returns
-        -------
-        name : str
-           Name of the metric.
-        value : float
-           Value of the evaluation.
-        """
-        self._update()  # update metric at this time
-        if self.num is None:
-            if self.num_inst == 0:
-                return (self.name, float('nan'))
-            else:
-                return (self.name, self.sum_metric / self.num_inst)
-        else:
-            names = ['%s'%(self.name[i]) for i in range(self.num)]
-            values = [x / y if y != 0 else float('nan') \
-                for x, y in zip(self.sum_metric, self.num_inst)]
-            return (names, values)
-
     def update(self, pred_bboxes, pred_coefs, pred_labels, pred_scores,
                gt_bboxes, gt_labels, widths, heights, gt_difficults=None, gt_coefs=None, gt_imgids=None, gt_inst_ids=None):
         """Update internal buffer with latest prediction and gt pairs.
@@ -509,108 +626,16 @@ class NewPolygonMApMetric(mx.metric.EvalMetric):
                 if len(pred_bbox_l) == 0:
                     continue
                 if len(gt_bbox_l) == 0:
-                    self._match[l].extend((0,) * pred_bbox_l.shape[0])
+                    self._miss_update(l, pred_bbox_l.shape[0])
                     continue
                 pred_bbox_l = pred_bbox_l.copy()
                 pred_coef_l = pred_coef_l.copy()
                 gt_bbox_l = gt_bbox_l.copy()
 
                 iou = new_iou(pred_coef_l, self.bases, pred_bbox_l, gt_masks_l)
-                gt_index = iou.argmax(axis=1)  # gt_index[pd] = gt_id
-                # set -1 if there is no matching ground truth
-                gt_index[iou.max(axis=1) < self.iou_thresh] = -1
+                self._match_update(l, iou, gt_difficult_l)
                 del iou
 
-                selec = np.zeros(gt_bbox_l.shape[0], dtype=bool)
-                for gt_idx in gt_index:
-                    if gt_idx >= 0:
-                        if gt_difficult_l[gt_idx]:
-                            self._match[l].append(-1)
-                        else:
-                            if not selec[gt_idx]:
-                                self._match[l].append(1)
-                            else:
-                                self._match[l].append(0)
-                        selec[gt_idx] = True
-                    else:
-                        self._match[l].append(0)
-
-    def _update(self):
-        """ update num_inst and sum_metric """
-        aps = []
-        recall, precs = self._recall_prec()
-        for l, rec, prec in zip(range(len(precs)), recall, precs):
-            ap = self._average_precision(rec, prec)
-            aps.append(ap)
-            if self.num is not None and l < (self.num - 1):
-                self.sum_metric[l] = ap
-                self.num_inst[l] = 1
-        if self.num is None:
-            self.num_inst = 1
-            self.sum_metric = np.nanmean(aps)
-        else:
-            self.num_inst[-1] = 1
-            self.sum_metric[-1] = np.nanmean(aps)
-
-    def _recall_prec(self):
-        """ get recall and precision from internal records """
-        n_fg_class = max(self._n_pos.keys()) + 1
-        prec = [None] * n_fg_class
-        rec = [None] * n_fg_class
-
-        for l in self._n_pos.keys():
-            score_l = np.array(self._score[l])
-            match_l = np.array(self._match[l], dtype=np.int32)
-
-            order = score_l.argsort()[::-1]
-            match_l = match_l[order]
-
-            tp = np.cumsum(match_l == 1)
-            fp = np.cumsum(match_l == 0)
-
-            # If an element of fp + tp is 0,
-            # the corresponding element of prec[l] is nan.
-            with np.errstate(divide='ignore', invalid='ignore'):
-                prec[l] = tp / (fp + tp)
-            # If n_pos[l] is 0, rec[l] is None.
-            if self._n_pos[l] > 0:
-                rec[l] = tp / self._n_pos[l]
-
-        return rec, prec
-
-    def _average_precision(self, rec, prec):
-        """
-        calculate average precision
-
-        Params:
-        ----------
-        rec : numpy.array
-            cumulated recall
-        prec : numpy.array
-            cumulated precision
-        Returns:
-        ----------
-        ap as float
-        """
-        if rec is None or prec is None:
-            return np.nan
-
-        # append sentinel values at both ends
-        mrec = np.concatenate(([0.], rec, [1.]))
-        mpre = np.concatenate(([0.], np.nan_to_num(prec), [0.]))
-
-        # compute precision integration ladder
-        for i in range(mpre.size - 1, 0, -1):
-            mpre[i - 1] = np.maximum(mpre[i - 1], mpre[i])
-
-        # look for recall value changes
-        i = np.where(mrec[1:] != mrec[:-1])[0]
-
-        # sum (\delta recall) * prec
-        ap = np.sum((mrec[i + 1] - mrec[i]) * mpre[i + 1])
-        return ap
-
-
 class New07PolygonMApMetric(NewPolygonMApMetric):
     """ Mean average precision metric for PASCAL V0C 07 dataset
 
@@ -0,0 +1,160 @@
+"""Export hybridized networks once and reload them as cached SymbolBlocks."""
+from __future__ import absolute_import
+import os
+import json
+import time
+import hashlib
+import logging
+import warnings
+import mxnet as mx
+from mxnet import gluon
+from .export_helper import export_block
+from .filesystem import makedirs
+
+__all__ = ['model_cache_key', 'get_cached_model']
+
+
+def _file_sha1(filename):
+    """Sha1 hash of the file content in hexadecimal digits."""
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        while True:
+            data = f.read(1048576)
+            if not data:
+                break
+            sha1.update(data)
+    return sha1.hexdigest()
+
+
+def model_cache_key(name, params_file=None, data_shape=416, num_bases=50,
+                    nms_thresh=0.45, nms_topk=400, post_nms=100):
+    """Key of exported artifacts.
+
+    Parameters
+    ----------
+    name : str
+        Model name in the model zoo, e.g. `yolo3_darknet53_coco`.
+        The name includes both the network and the dataset.
+    params_file : str, default is None
+        Parameters to load. `None` means the default pretrained weights.
+    data_shape : int or tuple of int
+        Fixed input shape, int for square inputs or (H, W).
+    num_bases : int
+        Number of bases of the coefficient head.
+    nms_thresh, nms_topk, post_nms
+        NMS settings, which are frozen into the exported symbol.
+
+    Returns
+    -------
+    str
+        The cache key.
+    """
+    if isinstance(data_shape, int):
+        data_shape = (data_shape, data_shape)
+    params_hash = _file_sha1(params_file)[:8] if params_file else 'pretrained'
+    return '{}_b{}_{}x{}_nms{}-{}-{}_{}'.format(
+        name, num_bases, data_shape[0], data_shape[1],
+        nms_thresh, nms_topk, post_nms, params_hash)
+
+
+def get_cached_model(name, params_file=None, data_shape=416, num_bases=50, ctx=mx.cpu(),
+                     nms_thresh=0.45, nms_topk=400, post_nms=100, static_alloc=True,
+                     warmup=True, batch_size=1, root=os.path.join('~', '.mxnet', 'exported'), **kwargs):
+    """Get a hybridized network with fixed input shape, exporting it on first use.
+
+    On a cold start the network is built by `get_model`, parameters are loaded and
+    it is exported to symbol and params by `export_block`. Later calls with the same
+    key only import the exported files into a `SymbolBlock`, skipping network
+    construction and graph tracing. The returned block is hybridized with static
+    memory allocation, so inputs must keep the shape `(B, 3, H, W)`.
+
+    Parameters
+    ----------
+    name : str
+        Model name in the model zoo, e.g. `yolo3_darknet53_coco`.
+    params_file : str, default is None
+        Parameters to load. `None` means the default pretrained weights.
+    data_shape : int or tuple of int, default is 416
+        Fixed input shape, int for square inputs or (H, W).
+    num_bases : int, default is 50
+        Number of bases of the coefficient head.
+    ctx : mxnet.Context, default is mx.cpu()
+        Context of the returned network.
+    nms_thresh : float, default is 0.45
+        Non-maximum suppression threshold.
+    nms_topk : int, default is 400
+        Apply NMS to top k detection results.
+    post_nms : int, default is 100
+        Only return top `post_nms` detection results.
+    static_alloc : bool, default is True
+        Hybridize with `static_alloc` and `static_shape`.
+    warmup : bool, default is True
+        Run one forward pass with zero input, so the first real batch does not pay
+        for memory planning.
+    batch_size : int, default is 1
+        Batch size of the warm up input.
+    root : str
+        Directory of exported artifacts.
+
+    Returns
+    -------
+    tuple of (mxnet.gluon.SymbolBlock, dict)
+        The network and loading information, including `cold` (whether the model
+        was exported in this call), `classes`, `export_time`, `load_time`,
+        `warmup_time` and `total_time` in seconds.
+    """
+    if isinstance(data_shape, int):
+        data_shape = (data_shape, data_shape)
+    tic = time.time()
+    root = os.path.expanduser(root)
+    makedirs(root)
+    key = model_cache_key(name, params_file, data_shape, num_bases,
+                          nms_thresh, nms_topk, post_nms)
+    prefix = os.path.join(root, key)
+    manifest_file = prefix + '.json'
+    info = {'key': key, 'cold': False, 'export_time': 0.0}
+
+    if not os.path.isfile(manifest_file):
+        from ..model_zoo import get_model
+        info['cold'] = True
+        btic = time.time()
+        if params_file:
+            net = get_model(name, pretrained=False, pretrained_base=False, **kwargs)
+            net.load_parameters(params_file)
+        else:
+            net = get_model(name, pretrained=True, **kwargs)
+        if getattr(net, '_num_bases', num_bases) != num_bases:
+            raise ValueError("Network {} has {} bases, given {}".format(
+                name, net._num_bases, num_bases))
+        if hasattr(net, 'set_nms'):
+            net.set_nms(nms_thresh, nms_topk, post_nms)
+        export_block(prefix, net, data_shape=(data_shape[0], data_shape[1], 3),
+                     preprocess=None, layout='CHW')
+        # write manifest last, an interrupted export is redone next time
+        with open(manifest_file, 'w') as f:
+            json.dump({'name': name, 'params': params_file, 'num_bases': num_bases,
+                       'data_shape': list(data_shape),
+                       'classes': list(getattr(net, 'classes', []))}, f)
+        info['export_time'] = time.time() - btic
+        logging.info('Exported %s to %s in %.3f sec', name, prefix, info['export_time'])
+
+    with open(manifest_file) as f:
+        info['classes'] = json.load(f)['classes']
+    btic = time.time()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        net = gluon.SymbolBlock.imports(prefix + '-symbol.json', ['data'],
+                                        prefix + '-0000.params', ctx=ctx)
+    net.hybridize(static_alloc=static_alloc, static_shape=static_alloc)
+    info['load_time'] = time.time() - btic
+
+    btic = time.time()
+    if warmup:
+        x = mx.nd.zeros((batch_size, 3, data_shape[0], data_shape[1]), ctx=ctx)
+        for y in net(x):
+            y.wait_to_read()
+    info['warmup_time'] = time.time() - btic
+    info['total_time'] = time.time() - tic
+    logging.info('Loaded %s (%s start) in %.3f sec', key,
+                 'cold' if info['cold'] else 'warm', info['total_time'])
+    return net, info
@@ -0,0 +1,170 @@
+"""Reduced precision (int8/float16) inference of exported networks."""
+from __future__ import absolute_import
+import os
+import json
+import time
+import logging
+import warnings
+import mxnet as mx
+from mxnet import gluon
+from .model_cache import get_cached_model
+
+__all__ = ['head_conv_names', 'get_reduced_precision_model']
+
+
+class _CastBlock(gluon.HybridBlock):
+    """Run `net` in `dtype` with float32 inputs and outputs."""
+    def __init__(self, net, dtype='float16', **kwargs):
+        super(_CastBlock, self).__init__(**kwargs)
+        self._dtype = dtype
+        with self.name_scope():
+            self.net = net
+
+    # pylint: disable=arguments-differ
+    def hybrid_forward(self, F, x):
+        outs = self.net(F.cast(x, self._dtype))
+        return tuple(F.cast(out, 'float32') for out in outs)
+
+
+def _has_mkldnn():
+    """Whether MXNet is built with MKLDNN, which cpu int8 kernels require."""
+    try:
+        from mxnet.runtime import Features
+    except ImportError:
+        return False
+    return Features().is_enabled('MKLDNN')
+
+
+def head_conv_names(sym, pattern='yolooutputv4'):
+    """Names of convolution layers in the output heads of an exported symbol.
+
+    The last convolution of YOLO outputs predicts boxes, objectness, classes and the
+    coefficients at once, so it is kept in float32 to preserve coefficient accuracy.
+    Fusion for MKLDNN renames fused layers, so for a fused symbol the names of fused
+    nodes containing a head convolution are returned.
+
+    Parameters
+    ----------
+    sym : mxnet.sym.Symbol
+        Exported network symbol.
+    pattern : str
+        Name pattern of output head blocks.
+
+    Returns
+    -------
+    list of str
+        Layer names which can be passed as `excluded_sym_names` of quantization.
+    """
+    def _is_head(node):
+        if node['op'] == 'Convolution' and pattern in node['name']:
+            return True
+        return any(_is_head(n) for g in node.get('subgraphs', []) for n in g['nodes'])
+
+    nodes = json.loads(sym.tojson())['nodes']
+    return [n['name'] for n in nodes if _is_head(n)]
+
+
+def get_reduced_precision_model(name, params_file=None, dtype='int8', data_shape=416, num_bases=50,
+                                ctx=mx.cpu(), calib_data=None, calib_mode='naive',
+                                num_calib_examples=None, exclude_heads=True, nms_thresh=0.45,
+                                nms_topk=400, post_nms=100,
+                                root=os.path.join('~', '.mxnet', 'exported'), **kwargs):
+    """Get a network running in reduced precision for inference.
+
+    The network is exported once by `get_cached_model`. For `int8`/`uint8` the exported
+    symbol is quantized by `mxnet.contrib.quantization`, calibrated with `calib_data`,
+    and fused for MKLDNN on cpu. Output head convolutions are excluded from quantization
+    by default, and quantization on cpu requires MXNet built with MKLDNN. For `float16` all
+    parameters are cast while inputs and outputs stay float32, which requires a gpu.
+
+    Parameters
+    ----------
+    name : str
+        Model name in the model zoo, e.g. `yolo3_tiny_darknet_voc`.
+    params_file : str, default is None
+        Parameters to load. `None` means the default pretrained weights.
+    dtype : str, default is 'int8'
+        One of 'float32', 'float16', 'int8' and 'uint8'.
+    data_shape : int or tuple of int, default is 416
+        Fixed input shape, int for square inputs or (H, W).
+    num_bases : int, default is 50
+        Number of bases of the coefficient head.
+    ctx : mxnet.Context, default is mx.cpu()
+        Context of the returned network.
+    calib_data : mxnet.NDArray or mxnet.io.DataIter, default is None
+        Normalized images with shape `(N, 3, H, W)` for calibration. Required by
+        `calib_mode` other than 'none'.
+    calib_mode : str, default is 'naive'
+        'none', 'naive' (min/max) or 'entropy' (KL divergence) calibration.
+    num_calib_examples : int, default is None
+        Number of examples used for calibration, `None` to use all of `calib_data`.
+    exclude_heads : bool, default is True
+        Keep output head convolutions in float32.
+    nms_thresh, nms_topk, post_nms
+        NMS settings, which are frozen into the exported symbol.
+    root : str
+        Directory of exported artifacts.
+
+    Returns
+    -------
+    tuple of (mxnet.gluon.HybridBlock, dict)
+        The network and loading information, see `get_cached_model`. `quantize_time` is
+        added for quantized networks.
+    """
+    if dtype not in ('float32', 'float16', 'int8', 'uint8'):
+        raise ValueError("Unsupported dtype {}".format(dtype))
+    if ctx.device_type == 'cpu':
+        if dtype == 'float16':
+            raise ValueError("float16 inference is not supported on cpu, MXNet has no float16 "
+                             "cpu kernels of these layers")
+        if dtype in ('int8', 'uint8') and not _has_mkldnn():
+            raise RuntimeError("{} inference on cpu requires MXNet built with MKLDNN, "
+                               "e.g. the mxnet-mkl package".format(dtype))
+    if isinstance(data_shape, int):
+        data_shape = (data_shape, data_shape)
+    net, info = get_cached_model(name, params_file, data_shape, num_bases, ctx=ctx,
+                                 nms_thresh=nms_thresh, nms_topk=nms_topk, post_nms=post_nms,
+                                 warmup=(dtype == 'float32'), root=root, **kwargs)
+    info['dtype'] = dtype
+    if dtype == 'float32':
+        return net, info
+    if dtype == 'float16':
+        net.cast('float16')
+        net = _CastBlock(net, 'float16')
+        net.hybridize(static_alloc=True, static_shape=True)
+        return net, info
+
+    from mxnet.contrib.quantization import quantize_model
+    tic = time.time()
+    prefix = os.path.join(os.path.expanduser(root), info['key'])
+    sym, arg_params, aux_params = mx.model.load_checkpoint(prefix, 0)
+    if ctx.device_type == 'cpu':
+        sym = sym.get_backend_symbol('MKLDNN_QUANTIZE')
+    # after fusion, which renames fused layers
+    excluded = head_conv_names(sym) if exclude_heads else []
+    if calib_mode != 'none':
+        if calib_data is None:
+            raise ValueError("calib_data is required by calib_mode {}".format(calib_mode))
+        if isinstance(calib_data, mx.nd.NDArray):
+            calib_data = mx.io.NDArrayIter(data=calib_data, batch_size=1, data_name='data')
+        if num_calib_examples is None:
+            num_calib_examples = sum(b.data[0].shape[0] for b in calib_data)
+            calib_data.reset()
+    qsym, qarg_params, aux_params = quantize_model(
+        sym=sym, arg_params=arg_params, aux_params=aux_params, data_names=('data',),
+        label_names=None, ctx=ctx, excluded_sym_names=excluded, calib_mode=calib_mode,
+        calib_data=calib_data, num_calib_examples=num_calib_examples,
+        quantized_dtype=dtype, logger=logging)
+    if ctx.device_type == 'cpu':
+        qsym = qsym.get_backend_symbol('MKLDNN_QUANTIZE')
+    qprefix = '{}-{}-{}'.format(prefix, dtype, calib_mode)
+    mx.model.save_checkpoint(qprefix, 0, qsym, qarg_params, aux_params)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        net = gluon.SymbolBlock.imports(qprefix + '-symbol.json', ['data'],
+                                        qprefix + '-0000.params', ctx=ctx)
+    net.hybridize(static_alloc=True, static_shape=True)
+    info['quantize_time'] = time.time() - tic
+    logging.info('Quantized %s to %s with %s calibration in %.3f sec, %d head layers in float32',
+                 info['key'], dtype, calib_mode, info['quantize_time'], len(excluded))
+    return net, info
@@ -0,0 +1,220 @@
+"""Batched sparse coding of masks against a fixed dictionary."""
+from __future__ import division
+import pickle
+import numpy as np
+
+__all__ = ['SparseCoder', 'load_sparse_coder']
+
+
+class SparseCoder(object):
+    """Encode many signals against fixed bases at once.
+
+    Quantities which only depend on the bases, i.e. the Gram matrix, the basis norms
+    and the step size of ISTA, are computed once in the constructor, so each call of
+    `encode` is a few matrix products over all signals. Codes are the same as
+    `transform` of a sklearn dictionary with the corresponding algorithm.
+
+    Parameters
+    ----------
+    bases : numpy.ndarray or str
+        Bases with shape (K, D), e.g. `components_` of the sklearn dictionary, or a
+        `.npy` file of them.
+    algorithm : str, default is 'omp'
+        'omp' (Orthogonal Matching Pursuit), 'lars' (Least Angle Regression),
+        'ista' (lasso by accelerated proximal gradient, same objective as sklearn
+        'lasso_lars' and 'lasso_cd') or 'threshold'.
+    n_nonzero_coefs : int, default is None
+        Number of non-zero coefficients of 'omp' and 'lars'. `None` or a value not
+        smaller than K keeps all atoms, same as sklearn `transform` with default
+        parameters, and the codes are the least squares solution.
+    alpha : float, default is 1.0
+        Penalty of the l1 norm of 'ista', or the threshold of 'threshold'.
+    max_iter : int, default is 1000
+        Maximum number of iterations of 'ista'.
+    tol : float, default is 1e-6
+        'ista' stops when the largest change of codes is below `tol` times the largest code.
+    dtype : numpy.dtype, default is numpy.float64
+        Computation type.
+
+    """
+    def __init__(self, bases, algorithm='omp', n_nonzero_coefs=None, alpha=1.0,
+                 max_iter=1000, tol=1e-6, dtype=np.float64):
+        if isinstance(bases, str):
+            bases = np.load(bases)
+        if algorithm not in ('omp', 'lars', 'ista', 'threshold'):
+            raise ValueError("Unknown algorithm {}".format(algorithm))
+        self.bases = np.asarray(bases, dtype=dtype)
+        self.num_bases = self.bases.shape[0]
+        self.algorithm = algorithm
+        if n_nonzero_coefs is None or n_nonzero_coefs >= self.num_bases:
+            n_nonzero_coefs = self.num_bases
+        self.n_nonzero_coefs = int(n_nonzero_coefs)
+        self.alpha = alpha
+        self.max_iter = max_iter
+        self.tol = tol
+        self.dtype = dtype
+        self.gram = np.dot(self.bases, self.bases.T)
+        self.norms = np.sqrt(np.diag(self.gram))
+        # Lipschitz constant of the gradient of the squared error
+        self._lipschitz = np.linalg.eigvalsh(self.gram)[-1]
+        # (D, K) projection of least squares, used when all atoms are kept
+        self._proj = np.linalg.solve(self.gram, self.bases).T
+
+    @classmethod
+    def from_sklearn(cls, model, **kwargs):
+        """Coder with the bases and transform parameters of a sklearn dictionary.
+
+        Parameters
+        ----------
+        model : sklearn.decomposition.DictionaryLearning
+            Fitted dictionary, e.g. the pickled `all_50_1.sklearnmodel`.
+
+        """
+        algorithm = getattr(model, 'transform_algorithm', 'omp')
+        algorithm = {'lasso_lars': 'ista', 'lasso_cd': 'ista'}.get(algorithm, algorithm)
+        alpha = getattr(model, 'transform_alpha', None)
+        params = {'algorithm': algorithm,
+                  'n_nonzero_coefs': getattr(model, 'transform_n_nonzero_coefs', None),
+                  'alpha': 1.0 if alpha is None else alpha}
+        params.update(kwargs)
+        return cls(model.components_, **params)
+
+    def encode(self, x):
+        """Encode signals.
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            Signals with shape (N, D), e.g. flattened 64x64 masks.
+
+        Returns
+        -------
+        numpy.ndarray
+            Codes with shape (N, K).
+        """
+        x = np.asarray(x, dtype=self.dtype).reshape(-1, self.bases.shape[1])
+        if self.algorithm in ('omp', 'lars') and self.n_nonzero_coefs == self.num_bases:
+            return np.dot(x, self._proj)
+        cov = np.dot(x, self.bases.T)
+        if self.algorithm == 'omp':
+            return self._omp(cov)
+        if self.algorithm == 'lars':
+            return self._lars(cov)
+        if self.algorithm == 'ista':
+            return self._ista(cov)
+        return np.sign(cov) * np.maximum(np.abs(cov) - self.alpha, 0)
+
+    def _omp(self, cov):
+        """Batch OMP from correlations `cov` (N, K), all signals share each step."""
+        num = cov.shape[0]
+        rows = np.arange(num)[:, np.newaxis]
+        support = np.zeros((num, 0), dtype=np.int64)
+        selected = np.zeros(cov.shape, dtype=bool)
+        gamma = np.zeros((num, 0), dtype=self.dtype)
+        alpha = cov
+        for _ in range(self.n_nonzero_coefs):
+            score = np.abs(alpha) / self.norms
+            score[selected] = -1
+            atom = np.argmax(score, axis=1)
+            selected[rows[:, 0], atom] = True
+            support = np.concatenate([support, atom[:, np.newaxis]], axis=1)
+            # (N, k, k) sub Gram matrices and (N, k) correlations of the supports
+            sub_gram = self.gram[support[:, :, np.newaxis], support[:, np.newaxis, :]]
+            gamma = np.linalg.solve(sub_gram, cov[rows, support][:, :, np.newaxis])[:, :, 0]
+            alpha = cov - np.einsum('nk,nkj->nj', gamma, self.gram[support])
+        codes = np.zeros(cov.shape, dtype=self.dtype)
+        codes[rows, support] = gamma
+        return codes
+
+    def _lars(self, cov):
+        """Batch LARS from correlations `cov` (N, K), one atom joins each signal per step."""
+        num = cov.shape[0]
+        rows = np.arange(num)[:, np.newaxis]
+        tiny = np.finfo(self.dtype).tiny
+        codes = np.zeros(cov.shape, dtype=self.dtype)
+        corr = cov.copy()
+        active = np.zeros(cov.shape, dtype=bool)
+        support = np.argmax(np.abs(corr), axis=1)[:, np.newaxis]
+        active[rows[:, 0], support[:, 0]] = True
+        for step in range(self.n_nonzero_coefs):
+            signs = np.sign(corr[rows, support])
+            big_c = np.abs(corr[rows[:, 0], support[:, 0]])
+            sub_gram = self.gram[support[:, :, np.newaxis], support[:, np.newaxis, :]]
+            # equiangular direction of the active atoms
+            weights = np.linalg.solve(sub_gram, signs[:, :, np.newaxis])[:, :, 0]
+            norm = 1. / np.sqrt(np.maximum(np.sum(signs * weights, axis=1), tiny))
+            weights *= norm[:, np.newaxis]
+            angles = np.einsum('nk,nkj->nj', weights, self.gram[support])
+            # move until the next atom is as correlated as the active ones
+            with np.errstate(divide='ignore', invalid='ignore'):
+                g1 = (big_c[:, np.newaxis] - corr) / (norm[:, np.newaxis] - angles)
+                g2 = (big_c[:, np.newaxis] + corr) / (norm[:, np.newaxis] + angles)
+            g1[~(g1 > tiny)] = np.inf
+            g2[~(g2 > tiny)] = np.inf
+            steps = np.minimum(g1, g2)
+            steps[active] = np.inf
+            atom = np.argmin(steps, axis=1)
+            gamma = np.minimum(steps[rows[:, 0], atom], big_c / norm)
+            codes[rows, support] += gamma[:, np.newaxis] * weights
+            corr -= gamma[:, np.newaxis] * angles
+            if step < self.n_nonzero_coefs - 1:
+                active[rows[:, 0], atom] = True
+                support = np.concatenate([support, atom[:, np.newaxis]], axis=1)
+        return codes
+
+    def _ista(self, cov):
+        """FISTA for ``0.5 * |x - code . bases|^2 + alpha * |code|_1``."""
+        step = 1. / self._lipschitz
+        thresh = self.alpha * step
+        codes = np.zeros(cov.shape, dtype=self.dtype)
+        momentum = codes
+        t = 1.
+        for _ in range(self.max_iter):
+            grad = np.dot(momentum, self.gram) - cov
+            z = momentum - step * grad
+            new_codes = np.sign(z) * np.maximum(np.abs(z) - thresh, 0)
+            new_t = (1. + np.sqrt(1. + 4. * t * t)) / 2.
+            momentum = new_codes + ((t - 1.) / new_t) * (new_codes - codes)
+            delta = np.abs(new_codes - codes).max() if codes.size else 0.
+            codes, t = new_codes, new_t
+            if delta <= self.tol * max(np.abs(codes).max(), 1e-12):
+                break
+        return codes
+
+
+class _SklearnUnpickler(pickle.Unpickler):
+    """Load dictionaries pickled by old scikit-learn, whose modules were renamed."""
+    def find_class(self, module, name):
+        if module.startswith('sklearn.') and module.rsplit('.', 1)[-1] in ('dict_learning', 'base'):
+            try:
+                return super(_SklearnUnpickler, self).find_class(module, name)
+            except (ImportError, AttributeError):
+                parent, child = module.rsplit('.', 1)
+                return super(_SklearnUnpickler, self).find_class(parent + '._' + child, name)
+        return super(_SklearnUnpickler, self).find_class(module, name)
+
+
+def load_sparse_coder(filename, **kwargs):
+    """Load a coder from a `.npy` of bases or a pickled sklearn dictionary.
+
+    Only the bases and transform parameters of a sklearn dictionary are used, so it
+    can be loaded by any version of scikit-learn which can unpickle it.
+
+    Parameters
+    ----------
+    filename : str
+        `.npy` file of bases with shape (K, D), or a pickled sklearn dictionary such
+        as `all_50_1.sklearnmodel`.
+    kwargs
+        Override parameters of :py:class:`SparseCoder`.
+
+    Returns
+    -------
+    SparseCoder
+        The coder.
+    """
+    if filename.endswith('.npy'):
+        return SparseCoder(np.load(filename), **kwargs)
+    with open(filename, 'rb') as f:
+        model = _SklearnUnpickler(f).load()
+    return SparseCoder.from_sklearn(model, **kwargs)
@@ -0,0 +1,208 @@
+"""Per iteration timing of training stages."""
+from __future__ import absolute_import
+from __future__ import division
+import json
+import time
+import logging
+from collections import OrderedDict
+import numpy as np
+import mxnet as mx
+
+__all__ = ['TrainProfiler']
+
+
+class TrainProfiler(object):
+    """Measure the time of each stage of training iterations.
+
+    Wrap the data loader with `iterate`, which measures the time waiting for batches,
+    and call `mark` after each stage of the loop body, which records the time since
+    the previous mark. `log` aggregates mean and percentiles of every stage since the
+    last call, writes them to the logger and as one JSON line to `log_file`.
+
+    MXNet runs operators asynchronously, so with `sync` each mark waits for all
+    pending operators, which attributes time to the stage that launched the work
+    but removes overlap of stages. Optionally `mx.profiler` runs for a window of
+    iterations and dumps a Chrome trace, which can be opened in chrome://tracing.
+
+    Parameters
+    ----------
+    enabled : bool, default is True
+        Whether to measure. Disabled profilers pass batches through and ignore marks,
+        but still run `mx.profiler` for `trace_iters`.
+    log_file : str, optional
+        JSON lines file of the aggregated stage times.
+    logger : logging.Logger, optional
+        Logger of the aggregated stage times, default is the root logger.
+    sync : bool, default is True
+        Wait for pending operators at each mark.
+    percentiles : tuple of int, default is (50, 90, 99)
+        Percentiles to report in addition to the mean.
+    trace_iters : tuple of int, optional
+        Global iterations `(begin, end)` to run `mx.profiler` for.
+    trace_file : str, default is 'profile.json'
+        Chrome trace of `mx.profiler`.
+
+    Examples
+    --------
+    >>> profiler = TrainProfiler(log_file='train_profile.jsonl')
+    >>> for i, batch in enumerate(profiler.iterate(train_data)):
+    ...     data = gluon.utils.split_and_load(batch[0], ctx_list=ctx)
+    ...     profiler.mark('split')
+    ...     with autograd.record():
+    ...         losses = [net(x) for x in data]
+    ...         profiler.mark('forward')
+    ...         autograd.backward(losses)
+    ...     profiler.mark('backward')
+    ...     trainer.step(batch_size)
+    ...     profiler.mark('step')
+    ...     if not (i + 1) % 100:
+    ...         profiler.log(epoch, i)
+
+    """
+    def __init__(self, enabled=True, log_file=None, logger=None, sync=True,
+                 percentiles=(50, 90, 99), trace_iters=None, trace_file='profile.json'):
+        self.enabled = enabled
+        self._log_file = log_file
+        self._logger = logger if logger is not None else logging.getLogger()
+        self._sync = sync
+        self._percentiles = tuple(percentiles)
+        self._trace_iters = tuple(trace_iters) if trace_iters else None
+        self._trace_file = trace_file
+        self._tracing = False
+        self._times = OrderedDict()
+        self._last = None
+        self._num_samples = 0
+        self._window_begin = None
+        self.global_iter = 0
+
+    def _record(self, name, value):
+        if name not in self._times:
+            self._times[name] = []
+        self._times[name].append(value)
+
+    def iterate(self, loader):
+        """Iterate over batches of `loader` and record the time waiting for each.
+
+        Parameters
+        ----------
+        loader : iterable
+            Data loader.
+
+        """
+        if not self.enabled:
+            # stage times are not measured, but the trace window still runs
+            for batch in loader:
+                self._update_trace()
+                yield batch
+                self.global_iter += 1
+            self._stop_trace()
+            return
+        it = iter(loader)
+        while True:
+            tic = time.time()
+            try:
+                batch = next(it)
+            except StopIteration:
+                break
+            self._last = time.time()
+            if self._window_begin is None:
+                self._window_begin = tic
+            self._record('data', self._last - tic)
+            try:
+                self._num_samples += batch[0].shape[0]
+            except (AttributeError, IndexError, TypeError):
+                pass
+            self._update_trace()
+            yield batch
+            self.global_iter += 1
+        self._stop_trace()
+
+    def mark(self, name):
+        """Record the time since the previous mark or batch as stage `name`."""
+        if not self.enabled or self._last is None:
+            return
+        if self._sync:
+            mx.nd.waitall()
+        now = time.time()
+        self._record(name, now - self._last)
+        self._last = now
+
+    def _update_trace(self):
+        if self._trace_iters is None:
+            return
+        begin, end = self._trace_iters
+        if self.global_iter == begin and not self._tracing:
+            mx.nd.waitall()
+            mx.profiler.set_config(profile_all=True, aggregate_stats=True,
+                                   filename=self._trace_file)
+            mx.profiler.set_state('run')
+            self._tracing = True
+        elif self.global_iter >= end:
+            self._stop_trace()
+
+    def _stop_trace(self):
+        if not self._tracing:
+            return
+        mx.nd.waitall()
+        mx.profiler.set_state('stop')
+        mx.profiler.dump()
+        self._tracing = False
+        self._logger.info('Saved mx.profiler trace to {}'.format(self._trace_file))
+
+    def summary(self):
+        """Statistics of stage times in milliseconds since the last `log`.
+
+        Returns
+        -------
+        OrderedDict
+            Mean and percentiles of each stage, e.g. `{'data': {'mean': 1.2, 'p50': 1.1}}`.
+        """
+        stats = OrderedDict()
+        for name, times in self._times.items():
+            times = np.array(times) * 1000.
+            stats[name] = OrderedDict([('mean', float(times.mean()))])
+            for p, value in zip(self._percentiles, np.percentile(times, self._percentiles)):
+                stats[name]['p{}'.format(p)] = float(value)
+        return stats
+
+    def log(self, epoch=None, batch=None, **kwargs):
+        """Log stage times since the last call and start a new window.
+
+        Parameters
+        ----------
+        epoch : int, optional
+            Current epoch.
+        batch : int, optional
+            Current batch in the epoch.
+        kwargs
+            Other values added to the JSON record, e.g. learning rate or losses.
+
+        Returns
+        -------
+        OrderedDict
+            The JSON record, `None` if disabled or nothing was recorded.
+        """
+        if not self.enabled or not self._times:
+            return None
+        stats = self.summary()
+        elapsed = time.time() - self._window_begin
+        num_iters = len(self._times['data'])
+        record = OrderedDict([('epoch', epoch), ('batch', batch),
+                              ('global_iter', self.global_iter), ('iters', num_iters),
+                              ('iters_per_sec', num_iters / max(elapsed, 1e-9)),
+                              ('samples_per_sec', self._num_samples / max(elapsed, 1e-9))])
+        record.update(kwargs)
+        record['stages'] = stats
+        total = sum(s['mean'] for s in stats.values())
+        key = 'p{}'.format(self._percentiles[-1]) if self._percentiles else 'mean'
+        self._logger.info('[Epoch {}][Batch {}] Profile: {}'.format(epoch, batch, ', '.join(
+            '{}={:.1f}ms({:.0f}%, {}={:.1f})'.format(
+                name, s['mean'], 100. * s['mean'] / max(total, 1e-9), key, s[key])
+            for name, s in stats.items())))
+        if self._log_file:
+            with open(self._log_file, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        self._times = OrderedDict()
+        self._num_samples = 0
+        self._window_begin = None
+        return record
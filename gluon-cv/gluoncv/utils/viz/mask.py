@@ -4,7 +4,7 @@ from __future__ import absolute_import, division
 import numpy as np
 import mxnet as mx
 
-from ...data.transforms.mask import fill
+from ...data.transforms.mask import fill_batch
 
 def expand_mask(masks, bboxes, im_shape, scores=None, thresh=0.5):
     """Expand instance segmentation mask to full image size.
@@ -46,16 +46,9 @@ def expand_mask(masks, bboxes, im_shape, scores=None, thresh=0.5):
 
     areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
     sorted_inds = np.argsort(-areas)
-
-    full_masks = []
-    for i in sorted_inds:
-        if scores is not None and scores[i] < thresh:
-            continue
-        mask = masks[i]
-        bbox = bboxes[i]
-        full_masks.append(fill(mask, bbox, im_shape))
-    full_masks = np.array(full_masks)
-    return full_masks
+    if scores is not None:
+        sorted_inds = sorted_inds[scores[sorted_inds] >= thresh]
+    return fill_batch(masks[sorted_inds], bboxes[sorted_inds], im_shape)
 
 
 def plot_mask(img, masks, alpha=0.5):
@@ -116,7 +116,7 @@ def plot_r_polygon(img, bboxes, coefs, img_w, img_h, scores=None, labels=None, t
     if colors is None:
         colors = dict()
 
-    bases = np.load('/home/tutian/dataset/coco_to_voc/coco_all_50_1.npy')
+    bases = np.load('/home/tutian/dataset/coco_to_voc/coco_all_50_1.npy').astype(np.float32)
     masks = []
 
     for i, bbox in enumerate(bboxes):
@@ -158,7 +158,7 @@ def plot_r_polygon(img, bboxes, coefs, img_w, img_h, scores=None, labels=None, t
         elif method == 'uniform':
             coefs_single = coefs[i] * (x_max-x_min) + x_min
 
-        mask_single = np.dot(coefs_single, bases).reshape(64, 64)
+        mask_single = np.dot(coefs_single.astype(np.float32), bases).reshape(64, 64)
         theta = (mask_single.max() + mask_single.min()) / 2
         resized = (cv.resize(mask_single, (bboxw , bboxh)) > theta)
         if (ymin<0):
@@ -0,0 +1,76 @@
+/*
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing,
+ * software distributed under the License is distributed on an
+ * "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+ * KIND, either express or implied.  See the License for the
+ * specific language governing permissions and limitations
+ * under the License.
+ */
+
+/*!
+ * \file coco_json.hpp
+ * \brief COCO RLE strings and JSON string escaping, without mxnet and OpenCV
+ *        dependencies so they can be checked on their own
+ */
+#ifndef GLUONCV_COCO_JSON_HPP_
+#define GLUONCV_COCO_JSON_HPP_
+
+#include <cstdio>
+#include <string>
+#include <vector>
+
+// compress run length counts to string, same as rleToString of pycocotools
+inline std::string RLECountsToString(const std::vector<long>& counts) {
+    std::string s;
+    for (size_t i = 0; i < counts.size(); ++i) {
+        long x = counts[i];
+        if (i > 2) x -= counts[i - 2];
+        bool more = true;
+        while (more) {
+            char c = x & 0x1f;
+            x >>= 5;
+            more = (c & 0x10) ? x != -1 : x != 0;
+            if (more) c |= 0x20;
+            s += static_cast<char>(c + 48);
+        }
+    }
+    return s;
+}
+
+// escape a string for a JSON string literal, RLE strings may contain '\'
+inline std::string EscapeJson(const std::string& value) {
+    std::string s;
+    s.reserve(value.size());
+    for (char ch : value) {
+        switch (ch) {
+            case '"': s += "\\\""; break;
+            case '\\': s += "\\\\"; break;
+            case '\b': s += "\\b"; break;
+            case '\f': s += "\\f"; break;
+            case '\n': s += "\\n"; break;
+            case '\r': s += "\\r"; break;
+            case '\t': s += "\\t"; break;
+            default:
+                if (static_cast<unsigned char>(ch) < 0x20) {
+                    char buf[8];
+                    std::snprintf(buf, sizeof(buf), "\\u%04x", static_cast<unsigned char>(ch));
+                    s += buf;
+                } else {
+                    s += ch;
+                }
+        }
+    }
+    return s;
+}
+
+#endif  // GLUONCV_COCO_JSON_HPP_
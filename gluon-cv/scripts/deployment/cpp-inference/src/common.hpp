@@ -131,6 +131,58 @@ inline std::vector<std::string> LoadClassNames(std::string filename) {
     return classes;
 }
 
+namespace synset {
+// some commonly used datasets
+static std::vector<std::string> VOC_CLASS_NAMES = {
+     "aeroplane", "bicycle", "bird", "boat",
+     "bottle", "bus", "car", "cat", "chair",
+     "cow", "diningtable", "dog", "horse",
+     "motorbike", "person", "pottedplant",
+     "sheep", "sofa", "train", "tvmonitor"
+ };
+
+static std::vector<std::string> COCO_CLASS_NAMES = {
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train",
+    "truck", "boat", "traffic light", "fire hydrant", "stop sign",
+    "parking meter", "bench", "bird", "cat", "dog", "horse", "sheep",
+    "cow", "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella",
+    "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard",
+    "sports ball", "kite", "baseball bat", "baseball glove", "skateboard",
+    "surfboard", "tennis racket", "bottle", "wine glass", "cup", "fork",
+    "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
+    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair",
+    "couch", "potted plant", "bed", "dining table", "toilet", "tv",
+    "laptop", "mouse", "remote", "keyboard", "cell phone", "microwave",
+    "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase",
+    "scissors", "teddy bear", "hair drier", "toothbrush"
+};
+
+// by default class names are empty
+static std::vector<std::string> CLASS_NAMES = {};
+
+// class names of a class file, or guessed from the model name
+inline std::vector<std::string> GetClassNames(const std::string& model,
+                                              const std::string& class_name_file, bool verbose) {
+    if (!class_name_file.empty()) {
+        return LoadClassNames(class_name_file);
+    }
+    if (EndsWith(model, "voc")) {
+        if (verbose) {
+            LOG(INFO) << "Using Pascal VOC names...";
+        }
+        return VOC_CLASS_NAMES;
+    }
+    if (EndsWith(model, "coco")) {
+        if (verbose) {
+            LOG(INFO) << "Using COCO names...";
+        }
+        return COCO_CLASS_NAMES;
+    }
+    LOG(ERROR) << "Cannot determine class names, you can specify --class-file with a text file...";
+    return CLASS_NAMES;
+}
+}  // namespace synset
+
 namespace viz {
 // convert color from hsv to bgr for plotting
 inline cv::Scalar HSV2BGR(cv::Scalar hsv) {
@@ -27,36 +27,6 @@
 #include "clipp.hpp"
 #include <chrono>
 
-namespace synset {
-// some commonly used datasets
-static std::vector<std::string> VOC_CLASS_NAMES = {
-     "aeroplane", "bicycle", "bird", "boat",
-     "bottle", "bus", "car", "cat", "chair",
-     "cow", "diningtable", "dog", "horse",
-     "motorbike", "person", "pottedplant",
-     "sheep", "sofa", "train", "tvmonitor"
- };
-
-static std::vector<std::string> COCO_CLASS_NAMES = {
-    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train",
-    "truck", "boat", "traffic light", "fire hydrant", "stop sign",
-    "parking meter", "bench", "bird", "cat", "dog", "horse", "sheep",
-    "cow", "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella",
-    "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard",
-    "sports ball", "kite", "baseball bat", "baseball glove", "skateboard",
-    "surfboard", "tennis racket", "bottle", "wine glass", "cup", "fork",
-    "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
-    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair",
-    "couch", "potted plant", "bed", "dining table", "toilet", "tv",
-    "laptop", "mouse", "remote", "keyboard", "cell phone", "microwave",
-    "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase",
-    "scissors", "teddy bear", "hair drier", "toothbrush"
-};
-
-// by default class names are empty
-static std::vector<std::string> CLASS_NAMES = {};
-}  // namespace synset
-
 namespace args {
 static std::string model;
 static std::string image;
@@ -92,23 +62,7 @@ void ParseArgs(int argc, char** argv) {
     }
 
     // parse class names
-    if (args::class_name_file.empty()) {
-        if (EndsWith(args::model, "voc")) {
-            if (!args::quite) {
-                LOG(INFO) << "Using Pascal VOC names...";
-            }
-            synset::CLASS_NAMES = synset::VOC_CLASS_NAMES;
-        } else if (EndsWith(args::model, "coco")) {
-            if (!args::quite) {
-                LOG(INFO) << "Using COCO names...";
-            }
-            synset::CLASS_NAMES = synset::COCO_CLASS_NAMES;
-        } else {
-            LOG(ERROR) << "Cannot determine class names, you can specify --class-file with a text file...";
-        }
-    } else {
-        synset::CLASS_NAMES = LoadClassNames(args::class_name_file);
-    }
+    synset::CLASS_NAMES = synset::GetClassNames(args::model, args::class_name_file, !args::quite);
 }
 
 void RunDemo() {
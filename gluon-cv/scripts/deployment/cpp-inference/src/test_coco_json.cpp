@@ -0,0 +1,50 @@
+/*
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing,
+ * software distributed under the License is distributed on an
+ * "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+ * KIND, either express or implied.  See the License for the
+ * specific language governing permissions and limitations
+ * under the License.
+ */
+
+/*!
+ * \file test_coco_json.cpp
+ * \brief Checks of COCO RLE strings and JSON escaping used by gluoncv-usdseg
+ */
+#include "coco_json.hpp"
+#include <iostream>
+
+static int failures = 0;
+
+static void Expect(const std::string& name, const std::string& got, const std::string& expected) {
+    if (got != expected) {
+        std::cerr << name << ": got " << got << ", expected " << expected << std::endl;
+        ++failures;
+    }
+}
+
+int main() {
+    // a 1 x 45 mask with only the last pixel set, pycocotools encodes it as "\11"
+    std::vector<long> counts = {44, 1};
+    std::string rle = RLECountsToString(counts);
+    Expect("rle", rle, "\\11");
+    Expect("escaped rle", EscapeJson(rle), "\\\\11");
+    // image paths on windows and names with quotes
+    Expect("path", EscapeJson("C:\\data\\a \"b\".jpg"), "C:\\\\data\\\\a \\\"b\\\".jpg");
+    Expect("control", EscapeJson(std::string("a\nb\tc\x01", 6)), "a\\nb\\tc\\u0001");
+    Expect("plain", EscapeJson("person"), "person");
+    if (failures == 0) {
+        std::cout << "All checks passed" << std::endl;
+    }
+    return failures == 0 ? 0 : 1;
+}
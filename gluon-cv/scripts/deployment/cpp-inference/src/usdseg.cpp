@@ -0,0 +1,385 @@
+/*
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing,
+ * software distributed under the License is distributed on an
+ * "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+ * KIND, either express or implied.  See the License for the
+ * specific language governing permissions and limitations
+ * under the License.
+ */
+
+/*!
+ * \file usdseg.cpp
+ * \brief GluonCV cpp inference demo for USD-Seg instance segmentation models,
+ *        masks are reconstructed from predicted coefficients and bases
+ */
+#include "common.hpp"
+#include "clipp.hpp"
+#include "coco_json.hpp"
+#include <chrono>
+
+namespace args {
+static std::string model;
+static std::string image;
+static std::string bases;
+static std::string output;
+static std::string json;
+static std::string class_name_file;
+static int epoch = 0;
+static int gpu = -1;
+static bool quite = false;
+static bool no_display = false;
+static bool polygon = false;
+static float viz_thresh = 0.45;
+static int data_shape = 416;
+static int repeat = 1;
+}  // namespace args
+
+void ParseArgs(int argc, char** argv) {
+    using namespace clipp;
+
+    auto cli = (
+        value("model file", args::model),
+        value("image file", args::image),
+        (option("-b", "--bases") & value(match::prefix_not("-"), "basesfile", args::bases)) % "bases and coefficient normalization saved by export_usdseg.py, by default <model file>-bases.params",
+        (option("-o", "--output") & value(match::prefix_not("-"), "outfile", args::output)) % "output image, by default no output",
+        (option("--json") & value(match::prefix_not("-"), "jsonfile", args::json)) % "output instances with COCO RLE masks, by default no output",
+        option("--polygon").set(args::polygon).doc("Also output mask contours as polygons"),
+        (option("--class-file") & value(match::prefix_not("-"), "classfile", args::class_name_file)) % "plain text file for class names, one name per line",
+        (option("-e", "--epoch") & integer("epoch", args::epoch)) % "Epoch number to load parameters, by default is 0",
+        (option("--gpu") & integer("gpu", args::gpu)) % "Which gpu to use, by default is -1, means cpu only.",
+        (option("-s", "--size") & integer("size", args::data_shape)) % "Network input size, by default is 416.",
+        (option("-r", "--repeat") & integer("repeat", args::repeat)) % "Number of timed runs after a warm up run, by default is 1.",
+        option("-q", "--quite").set(args::quite).doc("Quite mode, no screen output except latency"),
+        option("--no-disp").set(args::no_display).doc("Do not display image"),
+        (option("-t", "--thresh") & number("thresh", args::viz_thresh)) % "Score threshold, from 0 to 1, default 0.45."
+    );
+    if (!parse(argc, argv, cli) || args::model.empty() || args::image.empty() || args::repeat < 1) {
+        std::cout << make_man_page(cli, argv[0]);
+        exit(-1);
+    }
+    if (args::bases.empty()) {
+        args::bases = args::model + "-bases.params";
+    }
+    synset::CLASS_NAMES = synset::GetClassNames(args::model, args::class_name_file, !args::quite);
+}
+
+// bases and coefficient normalization of the network
+struct CoefBases {
+    cv::Mat bases;      // (K, S * S)
+    cv::Mat coef_mean;  // (1, K)
+    cv::Mat coef_std;   // (1, K)
+    int mask_size;      // S
+};
+
+// a reconstructed instance, mask is binary in the box clipped by the image
+struct Instance {
+    int id;
+    float score;
+    cv::Rect2f bbox;
+    cv::Rect roi;
+    cv::Mat mask;
+};
+
+// copy a float32 NDArray to a (rows, size / rows) matrix
+inline cv::Mat AsMat(NDArray arr, int rows) {
+    cv::Mat mat(rows, static_cast<int>(arr.Size()) / rows, CV_32F);
+    arr.SyncCopyToCPU(mat.ptr<float>(0), arr.Size());
+    return mat;
+}
+
+inline CoefBases LoadCoefBases(const std::string& filename) {
+    std::map<std::string, NDArray> params = NDArray::LoadToMap(filename);
+    for (auto name : {"bases", "coef_mean", "coef_std"}) {
+        CHECK(params.count(name)) << "Missing " << name << " in " << filename;
+    }
+    CoefBases b;
+    b.bases = AsMat(params["bases"], params["bases"].GetShape()[0]);
+    b.coef_mean = AsMat(params["coef_mean"], 1);
+    b.coef_std = AsMat(params["coef_std"], 1);
+    b.mask_size = static_cast<int>(std::round(std::sqrt(b.bases.cols)));
+    CHECK_EQ(b.mask_size * b.mask_size, b.bases.cols) << "Bases are not square masks";
+    CHECK_EQ(b.coef_mean.cols, b.bases.rows);
+    CHECK_EQ(b.coef_std.cols, b.bases.rows);
+    return b;
+}
+
+// Reconstruct masks of detections above thresh, boxes are scaled back to the image,
+// same as the python post-process: coef * std + mean, projected to bases, binarized at
+// the middle of the min and max values, resized to the box and clipped by the image.
+inline std::vector<Instance> ReconstructMasks(NDArray ids, NDArray scores, NDArray bboxes,
+                                              NDArray coefs, const CoefBases& b, float thresh,
+                                              int width, int height, int data_shape) {
+    int num = ids.GetShape()[1];
+    int num_bases = coefs.GetShape()[2];
+    CHECK_EQ(num_bases, b.bases.rows) << "Number of coefficients and bases do not match";
+    cv::Mat ids_mat = AsMat(ids, num);
+    cv::Mat scores_mat = AsMat(scores, num);
+    cv::Mat bboxes_mat = AsMat(bboxes, num);
+    cv::Mat coefs_mat = AsMat(coefs, num);
+
+    std::vector<int> valid;
+    for (int i = 0; i < num; ++i) {
+        if (ids_mat.at<float>(i, 0) >= 0 && scores_mat.at<float>(i, 0) >= thresh) {
+            valid.emplace_back(i);
+        }
+    }
+    std::vector<Instance> instances;
+    if (valid.empty()) return instances;
+    cv::Mat selected(static_cast<int>(valid.size()), num_bases, CV_32F);
+    for (size_t i = 0; i < valid.size(); ++i) {
+        cv::Mat row = selected.row(static_cast<int>(i));
+        cv::multiply(coefs_mat.row(valid[i]), b.coef_std, row);
+        row += b.coef_mean;
+    }
+    // one matrix product for all instances
+    cv::Mat masks = selected * b.bases;
+
+    float scale_x = static_cast<float>(width) / data_shape;
+    float scale_y = static_cast<float>(height) / data_shape;
+    cv::Rect image_rect(0, 0, width, height);
+    for (size_t i = 0; i < valid.size(); ++i) {
+        Instance inst;
+        inst.id = static_cast<int>(ids_mat.at<float>(valid[i], 0));
+        inst.score = scores_mat.at<float>(valid[i], 0);
+        const float* box = bboxes_mat.ptr<float>(valid[i]);
+        inst.bbox = cv::Rect2f(box[0] * scale_x, box[1] * scale_y,
+                               (box[2] - box[0]) * scale_x, (box[3] - box[1]) * scale_y);
+        int xmin = static_cast<int>(box[0] * scale_x);
+        int ymin = static_cast<int>(box[1] * scale_y);
+        int xmax = static_cast<int>(box[2] * scale_x);
+        int ymax = static_cast<int>(box[3] * scale_y);
+        cv::Rect rect(xmin, ymin, xmax - xmin, ymax - ymin);
+        inst.roi = rect & image_rect;
+        if (rect.width > 0 && rect.height > 0 && inst.roi.area() > 0) {
+            cv::Mat mask = masks.row(static_cast<int>(i)).reshape(1, b.mask_size);
+            double min_val, max_val;
+            cv::minMaxLoc(mask, &min_val, &max_val);
+            cv::Mat resized;
+            cv::resize(mask, resized, rect.size());
+            cv::Mat binary = resized > (min_val + max_val) / 2;
+            inst.mask = binary(inst.roi - rect.tl()).clone();
+        } else {
+            inst.roi = cv::Rect();
+        }
+        instances.emplace_back(inst);
+    }
+    return instances;
+}
+
+// COCO run length encoding of the mask in the whole image, in column major order
+inline std::string EncodeRLE(const Instance& inst, int width, int height) {
+    std::vector<long> counts;
+    long run = 0;
+    bool value = false;
+    for (int x = 0; x < width; ++x) {
+        bool in_col = x >= inst.roi.x && x < inst.roi.x + inst.roi.width;
+        for (int y = 0; y < height; ++y) {
+            bool v = in_col && y >= inst.roi.y && y < inst.roi.y + inst.roi.height &&
+                inst.mask.at<uchar>(y - inst.roi.y, x - inst.roi.x);
+            if (v != value) {
+                counts.emplace_back(run);
+                run = 0;
+                value = v;
+            }
+            ++run;
+        }
+    }
+    counts.emplace_back(run);
+    return RLECountsToString(counts);
+}
+
+// outer contours of the mask as polygons [x0, y0, x1, y1, ...]
+inline std::vector<std::vector<int>> MaskPolygons(const Instance& inst) {
+    std::vector<std::vector<int>> polygons;
+    if (inst.mask.empty()) return polygons;
+    std::vector<std::vector<cv::Point>> contours;
+    cv::findContours(inst.mask.clone(), contours, cv::RETR_EXTERNAL, cv::CHAIN_APPROX_SIMPLE,
+                     inst.roi.tl());
+    for (auto& contour : contours) {
+        if (contour.size() < 3) continue;
+        std::vector<int> polygon;
+        for (auto& pt : contour) {
+            polygon.emplace_back(pt.x);
+            polygon.emplace_back(pt.y);
+        }
+        polygons.emplace_back(polygon);
+    }
+    return polygons;
+}
+
+inline std::string InstancesToJson(const std::vector<Instance>& instances,
+                                   const std::vector<std::string>& rles,
+                                   const std::vector<std::vector<std::vector<int>>>& polygons,
+                                   int width, int height) {
+    std::stringstream ss;
+    ss << "{\"image\": \"" << EscapeJson(args::image) << "\", \"width\": " << width
+       << ", \"height\": " << height << ", \"instances\": [";
+    for (size_t i = 0; i < instances.size(); ++i) {
+        const Instance& inst = instances[i];
+        auto& box = inst.bbox;
+        ss << (i ? ", " : "") << "{\"id\": " << inst.id;
+        if (inst.id < static_cast<int>(synset::CLASS_NAMES.size())) {
+            ss << ", \"class\": \"" << EscapeJson(synset::CLASS_NAMES[inst.id]) << "\"";
+        }
+        ss << ", \"score\": " << inst.score << ", \"bbox\": [" << box.x << ", " << box.y
+           << ", " << box.x + box.width << ", " << box.y + box.height << "]"
+           << ", \"segmentation\": {\"size\": [" << height << ", " << width
+           << "], \"counts\": \"" << EscapeJson(rles[i]) << "\"}";
+        if (!polygons.empty()) {
+            ss << ", \"polygons\": [";
+            for (size_t j = 0; j < polygons[i].size(); ++j) {
+                ss << (j ? ", [" : "[");
+                for (size_t k = 0; k < polygons[i][j].size(); ++k) {
+                    ss << (k ? ", " : "") << polygons[i][j][k];
+                }
+                ss << "]";
+            }
+            ss << "]";
+        }
+        ss << "}";
+    }
+    ss << "]}";
+    return ss.str();
+}
+
+// blend masks and draw boxes on raw image
+inline cv::Mat PlotMasks(cv::Mat img, const std::vector<Instance>& instances,
+                         const std::vector<std::string>& class_names) {
+    int csize = static_cast<int>(class_names.size());
+    for (auto& inst : instances) {
+        float hue = csize > 0 ? static_cast<float>(inst.id) / csize
+                              : std::fmod(inst.id * 0.618033988749895f, 1.0f);
+        cv::Scalar color = viz::HSV2BGR(cv::Scalar(hue * 255, 0.75, 0.95));
+        if (!inst.mask.empty()) {
+            cv::Mat roi = img(inst.roi);
+            cv::Mat blend;
+            cv::addWeighted(roi, 0.5, cv::Mat(roi.size(), CV_8UC3, color), 0.5, 0.0, blend);
+            blend.copyTo(roi, inst.mask);
+        }
+        cv::rectangle(img, inst.bbox, color, 2);
+        std::stringstream ss;
+        if (inst.id < csize) {
+            ss << class_names[inst.id] << " ";
+        }
+        ss << std::fixed << std::setprecision(3) << inst.score;
+        viz::PutLabel(img, ss.str(), inst.bbox.tl(), color);
+    }
+    return img;
+}
+
+inline double ElapsedMs(std::chrono::steady_clock::time_point start,
+                        std::chrono::steady_clock::time_point end) {
+    return std::chrono::duration<double, std::milli>(end - start).count();
+}
+
+void RunDemo() {
+    // context
+    Context ctx = Context::cpu();
+    if (args::gpu >= 0) {
+        ctx = Context::gpu(args::gpu);
+        if (!args::quite) {
+          LOG(INFO) << "Using GPU(" << args::gpu << ")...";
+        }
+    }
+
+    // load symbol, parameters and bases
+    Symbol net;
+    std::map<std::string, NDArray> args, auxs;
+    LoadCheckpoint(args::model, args::epoch, &net, &args, &auxs, ctx);
+    CoefBases bases = LoadCoefBases(args::bases);
+
+    cv::Mat image = cv::imread(args::image, 1);
+    CHECK(!image.empty()) << "Cannot read image " << args::image;
+    int width = image.cols;
+    int height = image.rows;
+    if (!args::quite) {
+        LOG(INFO) << "Image shape: " << width << " x " << height;
+    }
+
+    // bind executor with fixed input shape
+    args["data"] = NDArray(Shape(1, args::data_shape, args::data_shape, 3), ctx, false);
+    Executor *exec = net.SimpleBind(
+      ctx, args, std::map<std::string, NDArray>(),
+      std::map<std::string, OpReqType>(), auxs);
+    NDArray data = exec->arg_dict()["data"];
+
+    // the first run is a warm up
+    double pre_ms = 0, forward_ms = 0, post_ms = 0;
+    std::vector<Instance> instances;
+    std::vector<std::string> rles;
+    std::vector<std::vector<std::vector<int>>> polygons;
+    for (int run = 0; run <= args::repeat; ++run) {
+        NDArray::WaitAll();
+        auto start = std::chrono::steady_clock::now();
+        cv::Mat resized;
+        cv::resize(image, resized, cv::Size(args::data_shape, args::data_shape), 0, 0, cv::INTER_CUBIC);
+        AsData(resized, ctx).CopyTo(&data);
+        NDArray::WaitAll();
+        auto forward_start = std::chrono::steady_clock::now();
+        exec->Forward(false);
+        auto ids = exec->outputs[0].Copy(Context(kCPU, 0));
+        auto scores = exec->outputs[1].Copy(Context(kCPU, 0));
+        auto bboxes = exec->outputs[2].Copy(Context(kCPU, 0));
+        auto coefs = exec->outputs[3].Copy(Context(kCPU, 0));
+        NDArray::WaitAll();
+        auto post_start = std::chrono::steady_clock::now();
+        instances = ReconstructMasks(ids, scores, bboxes, coefs, bases, args::viz_thresh,
+                                     width, height, args::data_shape);
+        rles.clear();
+        polygons.clear();
+        for (auto& inst : instances) {
+            rles.emplace_back(EncodeRLE(inst, width, height));
+            if (args::polygon) {
+                polygons.emplace_back(MaskPolygons(inst));
+            }
+        }
+        auto end = std::chrono::steady_clock::now();
+        if (run > 0) {
+            pre_ms += ElapsedMs(start, forward_start);
+            forward_ms += ElapsedMs(forward_start, post_start);
+            post_ms += ElapsedMs(post_start, end);
+        }
+    }
+    // always printed, parsed by the latency comparison script
+    std::cout << "Average latency over " << args::repeat << " runs "
+              << "{Preprocess, Forward, Postprocess, Total}: " << std::fixed << std::setprecision(3)
+              << pre_ms / args::repeat << ", " << forward_ms / args::repeat << ", "
+              << post_ms / args::repeat << ", "
+              << (pre_ms + forward_ms + post_ms) / args::repeat << " ms, "
+              << instances.size() << " instances" << std::endl;
+
+    if (!args::json.empty()) {
+        std::ofstream outfile(args::json);
+        outfile << InstancesToJson(instances, rles, polygons, width, height) << std::endl;
+    }
+
+    if (!args::no_display || !args::output.empty()) {
+        auto plt = PlotMasks(image.clone(), instances, synset::CLASS_NAMES);
+        if (!args::no_display) {
+            cv::imshow("plot", plt);
+            cv::waitKey();
+        }
+        if (!args::output.empty()) {
+            cv::imwrite(args::output, plt);
+        }
+    }
+
+    delete exec;
+    MXNotifyShutdown();
+}
+
+int main(int argc, char** argv) {
+    ParseArgs(argc, argv);
+    RunDemo();
+    return 0;
+}
@@ -0,0 +1,31 @@
+"""Script for export USD-Seg networks and bases for the C++ inference demo."""
+from __future__ import print_function
+import argparse
+import gluoncv as gcv
+
+def parse_args():
+    parser = argparse.ArgumentParser("Export USD-Seg model helper.")
+    parser.add_argument('--model', '-m', required=True, type=str,
+                        help='Name of the model, e.g. yolo3_darknet53_coco')
+    parser.add_argument('--params', type=str, required=True,
+                        help='Trained parameters of the model.')
+    parser.add_argument('--bases', type=str, required=True,
+                        help='Basis matrix with shape (num_bases, 4096) in a .npy file.')
+    parser.add_argument('--prefix', type=str, default='',
+                        help='Prefix of exported files, default is the model name.')
+    parser.add_argument('--data-shape', type=int, default=416,
+                        help='Network input shape.')
+    parser.add_argument('--nms-thresh', type=float, default=0.45, help='NMS threshold.')
+    parser.add_argument('--nms-topk', type=int, default=200, help='Number of boxes after NMS.')
+    args = parser.parse_args()
+    return args
+
+args = parse_args()
+prefix = args.prefix if args.prefix else args.model
+net = gcv.model_zoo.get_model(args.model, pretrained=False, pretrained_base=False)
+net.load_parameters(args.params)
+net.set_nms(args.nms_thresh, args.nms_topk)
+gcv.utils.export_block(prefix, net, data_shape=(args.data_shape, args.data_shape, 3),
+                       preprocess=True, layout='HWC')
+gcv.utils.export_coef_bases(prefix, args.bases)
+print('Done...')
@@ -69,6 +69,9 @@ def parse_args():
     parser.add_argument('--mixup', action='store_true', help='Use mixup training.')
     parser.add_argument('--no-mixup-epochs', type=int, default=20,
                         help='Disable mixup training if enabled in the last N epochs.')
+    parser.add_argument('--benchmark-sampler', action='store_true',
+                        help='Compare speed of the quota sampler custom operator and the '
+                             'hybridized graph sampler on CPU, then exit.')
     args = parser.parse_args()
     if args.dataset == 'voc':
         args.epochs = int(args.epochs) if args.epochs else 20
@@ -400,11 +403,40 @@ def train(net, train_data, val_data, eval_metric, ctx, args):
             current_map = 0.
         save_params(net, logger, best_map, current_map, epoch, args.save_interval, args.save_prefix)
 
+def benchmark_sampler(num_image=2, num_proposal=2000, num_gt=20, num_sample=128,
+                      repeat=20, logger=logging):
+    """Time the quota sampler custom operator against the hybridized graph sampler."""
+    ctx = mx.cpu()
+    ious = mx.nd.random.uniform(0, 1, shape=(num_image, num_proposal, num_gt), ctx=ctx) ** 4
+    matches = mx.nd.where(ious.max(axis=-1) >= 0.5, ious.argmax(axis=-1),
+                          mx.nd.ones((num_image, num_proposal), ctx=ctx) * -1)
+    kwargs = dict(num_sample=num_sample, pos_thresh=0.5, neg_thresh_high=0.5,
+                  neg_thresh_low=0., pos_ratio=0.25)
+    hybrid = gcv.nn.sampler.HybridQuotaSampler(**kwargs)
+    hybrid.hybridize(static_alloc=True)
+    samplers = [('custom op', lambda: mx.nd.Custom(matches, ious, op_type='quota_sampler',
+                                                   **kwargs)),
+                ('hybrid', lambda: hybrid(matches, ious))]
+    for name, sampler in samplers:
+        sampler().wait_to_read()  # warm up
+        tic = time.time()
+        for _ in range(repeat):
+            samples = sampler()
+            samples.wait_to_read()
+        logger.info('[{}] {:.3f} ms/batch, {} pos, {} neg'.format(
+            name, (time.time() - tic) * 1000. / repeat,
+            int((samples > 0).sum().asscalar()), int((samples < 0).sum().asscalar())))
+
 if __name__ == '__main__':
     args = parse_args()
     # fix seed for mxnet, numpy and python builtin random generator.
     gutils.random.seed(args.seed)
 
+    if args.benchmark_sampler:
+        logging.basicConfig(level=logging.INFO)
+        benchmark_sampler()
+        raise SystemExit
+
     # training contexts
     ctx = [mx.gpu(int(i)) for i in args.gpus.split(',') if i.strip()]
     ctx = ctx if ctx else [mx.cpu()]
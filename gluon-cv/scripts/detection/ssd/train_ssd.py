@@ -66,6 +66,9 @@ def parse_args():
                         help='Random seed to be fixed.')
     parser.add_argument('--syncbn', action='store_true',
                         help='Use synchronize BN across devices.')
+    parser.add_argument('--benchmark-ohem', action='store_true',
+                        help='Compare throughput of the per image NumPy OHEM loop and the '
+                             'hybridized OHEM sampler on CPU, then exit.')
     args = parser.parse_args()
     return args
 
@@ -226,11 +229,56 @@ def train(net, train_data, val_data, eval_metric, ctx, args):
             current_map = 0.
         save_params(net, best_map, current_map, epoch, args.save_interval, args.save_prefix)
 
+def _numpy_ohem(sampler, x, logits, ious):
+    """Reference OHEM assigning negatives of each image in a NumPy loop."""
+    num_positive = (x > -1).sum(axis=1)
+    num_negative = nd.minimum(nd.maximum(sampler._min_samples, sampler._ratio * num_positive),
+                              x.shape[1] - num_positive)
+    positive = logits.slice_axis(axis=2, begin=1, end=-1)
+    background = logits.slice_axis(axis=2, begin=0, end=1).reshape((0, -1))
+    maxval = positive.max(axis=2)
+    esum = nd.exp(logits - maxval.reshape((0, 0, 1))).sum(axis=2)
+    score = -nd.log(nd.exp(background - maxval) / esum)
+    mask = nd.ones_like(score) * -1
+    score = nd.where(x < 0, score, mask)
+    score = nd.where(ious.max(axis=2) < sampler._thresh, score, mask)
+    argmaxs = nd.argsort(score, axis=1, is_ascend=False).asnumpy()
+    y = np.zeros(x.shape)
+    y[np.where(x.asnumpy() >= 0)] = 1
+    for i, num_neg in enumerate(num_negative.asnumpy().astype(np.int32)):
+        y[i, argmaxs[i, :num_neg].astype(np.int32)] = -1
+    return nd.array(y, ctx=x.context)
+
+def benchmark_ohem(batch_size=32, num_anchors=8732, num_classes=21, num_gt=10, repeat=10,
+                   logger=logging):
+    """Throughput of the NumPy loop and the hybridized OHEM sampler on CPU."""
+    ious = nd.random.uniform(0, 1, shape=(batch_size, num_anchors, num_gt)) ** 8
+    x = nd.where(ious.max(axis=2) >= 0.5, ious.argmax(axis=2),
+                 nd.ones((batch_size, num_anchors)) * -1)
+    logits = nd.random.normal(shape=(batch_size, num_anchors, num_classes))
+    sampler = gcv.nn.sampler.OHEMSampler(3, thresh=0.5)
+    sampler.hybridize(static_alloc=True)
+    for name, fn in [('numpy loop', lambda: _numpy_ohem(sampler, x, logits, ious)),
+                     ('hybrid', lambda: sampler(x, logits, ious))]:
+        fn().wait_to_read()  # warm up
+        tic = time.time()
+        for _ in range(repeat):
+            samples = fn()
+            samples.wait_to_read()
+        logger.info('[{}] {:.1f} images/sec, {} negatives'.format(
+            name, batch_size * repeat / (time.time() - tic),
+            int((samples < 0).sum().asscalar())))
+
 if __name__ == '__main__':
     args = parse_args()
     # fix seed for mxnet, numpy and python builtin random generator.
     gutils.random.seed(args.seed)
 
+    if args.benchmark_ohem:
+        logging.basicConfig(level=logging.INFO)
+        benchmark_ohem()
+        raise SystemExit
+
     # training contexts
     ctx = [mx.gpu(int(i)) for i in args.gpus.split(',') if i.strip()]
     ctx = ctx if ctx else [mx.cpu()]
@@ -52,7 +52,8 @@ def test(args):
             raise RuntimeError("=> no checkpoint found at '{}'" \
                 .format(args.resume))
     print(model)
-    evaluator = MultiEvalModel(model, testset.num_class, ctx_list=args.ctx)
+    evaluator = MultiEvalModel(model, testset.num_class, ctx_list=args.ctx,
+                               batch_size=args.eval_batch_size)
     metric = gluoncv.utils.metrics.SegmentationMetric(testset.num_class)
 
     tbar = tqdm(test_data)
@@ -51,6 +51,9 @@ def parse_args():
     parser.add_argument('--test-batch-size', type=int, default=16,
                         metavar='N', help='input batch size for \
                         testing (default: 32)')
+    parser.add_argument('--eval-batch-size', type=int, default=4,
+                        metavar='N', help='number of crops forwarded together \
+                        in multi-scale evaluation (default: 4)')
     parser.add_argument('--lr', type=float, default=1e-3, metavar='LR',
                         help='learning rate (default: 1e-3)')
     parser.add_argument('--momentum', type=float, default=0.9,
@@ -6,7 +6,7 @@ import numpy as np
 
 import gluoncv as gcv
 from gluoncv.data.batchify import *
-from gluoncv.data import DetectionDataLoader, RandomTransformDataLoader
+from gluoncv.data import DetectionDataLoader, RandomTransformDataLoader, DataWorkerPool
 
 
 class DummyDetectionDataset(mx.gluon.data.Dataset):
@@ -98,6 +98,83 @@ def test_random_transform_dataloader():
             for batch in loader:
                 results += batch.asnumpy().astype('int').tolist()
 
+def test_persistent_workers():
+    pool = DataWorkerPool(2)
+    train = DummySequentialDataset(20)
+    val = DummySequentialDataset(6)
+    train_loader = RandomTransformDataLoader(
+        dataset=train, shuffle=True, batch_size=4, transform_fns=[_fn0], last_batch='keep',
+        worker_pool=pool, persistent=True)
+    val_loader = RandomTransformDataLoader(
+        dataset=val, batch_size=4, transform_fns=[_fn0], last_batch='keep',
+        worker_pool=pool, persistent=True)
+    for epoch in range(3):
+        for loader, dataset in ((train_loader, train), (val_loader, val)):
+            results = []
+            for batch in loader:
+                results += batch.asnumpy().astype('int').flatten().tolist()
+            assert sorted(results) == list(range(len(dataset)))
+            # the next epoch is sent to workers when this one is
+            assert loader._next_iter is not None
+    assert len(train_loader.epoch_stalls) == 3 and len(val_loader.epoch_stalls) == 3
+    pool.close()
+
+def test_bucket_prefetch():
+    dataset = DummySequentialDataset(20)
+    for num_workers, persistent in ((0, False), (2, False), (2, True)):
+        loader = RandomTransformDataLoader(
+            dataset=dataset, shuffle=True, batch_size=2, transform_fns=[_fn1, _fn2],
+            last_batch='keep', interval=3, num_workers=num_workers, prefetch=1,
+            persistent=persistent, bucket_prefetch=2)
+        for epoch in range(2):
+            results = []
+            widths = []
+            for batch in loader:
+                results += batch.asnumpy()[:, 0].astype('int').tolist()
+                widths.append(batch.shape[1])
+            assert sorted(results) == list(range(len(dataset)))
+            # one shape every interval, in order
+            for i in range(0, len(widths), 3):
+                assert len(set(widths[i:i + 3])) == 1
+    warmup = loader.warmup_batches()
+    assert [batch.shape for batch in warmup] == [(2, 2), (2, 3)]
+    # every interval start sends the first batches of the next one, also when the
+    # interval start itself was sent early
+    from gluoncv.data.dataloader import _RandomTransformMultiWorkerIter
+    sent = []
+    orig_send = _RandomTransformMultiWorkerIter._send
+    def _send(self, idx):
+        sent.append(idx)
+        orig_send(self, idx)
+    _RandomTransformMultiWorkerIter._send = _send
+    try:
+        loader = RandomTransformDataLoader(
+            dataset=DummySequentialDataset(40), batch_size=1, transform_fns=[_fn1, _fn2],
+            interval=10, num_workers=2, prefetch=1, bucket_prefetch=2)
+        assert len(list(loader)) == 40
+    finally:
+        _RandomTransformMultiWorkerIter._send = orig_send
+    expected = [0, 10, 11] + list(range(1, 10)) + [20, 21] + list(range(12, 20)) + \
+        [30, 31] + list(range(22, 30)) + list(range(32, 40))
+    assert sent == expected
+
+def test_split_sampler():
+    from gluoncv.data import SplitSampler
+    dataset = DummySequentialDataset(10)
+    for epoch in range(2):
+        results = []
+        for rank in range(4):
+            sampler = SplitSampler(len(dataset), 4, rank, seed=1)
+            for _ in range(epoch):
+                list(sampler)
+            loader = RandomTransformDataLoader(
+                dataset=dataset, sampler=sampler, batch_size=3, transform_fns=[_fn0],
+                last_batch='keep', num_workers=0)
+            batches = [batch.asnumpy().astype('int').flatten().tolist() for batch in loader]
+            assert len(batches) == 1 and len(batches[0]) == 3
+            results += batches[0]
+        assert sorted(set(results)) == list(range(len(dataset)))
+
 if __name__ == '__main__':
     import nose
     nose.runmodule()
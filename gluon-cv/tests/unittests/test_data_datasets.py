@@ -56,6 +56,43 @@ def test_coco_instance():
         index = np.random.randint(0, len(val))
         _ = val[index]
 
+def test_coco_index():
+    import json
+    import tempfile
+    from gluoncv.data.mscoco.index import COCOIndex
+    root = tempfile.mkdtemp()
+    anno_file = osp.join(root, 'instances_tiny.json')
+    anno = {'images': [{'id': 9, 'width': 20, 'height': 10, 'coco_url': 'x/val/9.jpg'},
+                       {'id': 3, 'width': 30, 'height': 40, 'coco_url': 'x/val/3.jpg'}],
+            'annotations': [
+                {'image_id': 9, 'bbox': [1, 2, 3, 4], 'area': 5., 'category_id': 7,
+                 'segmentation': [[0, 0, 1, 0, 1, 1], [2, 2, 3, 3]]},
+                {'image_id': 3, 'bbox': [0, 0, 5, 5], 'area': 9., 'category_id': 1,
+                 'iscrowd': 1, 'segmentation': {'counts': 'abc', 'size': [40, 30]}},
+                {'image_id': 9, 'bbox': [4, 4, 2, 2], 'area': 2., 'category_id': 1,
+                 'segmentation': [[5, 5, 6, 5, 6, 6]]}],
+            'categories': [{'id': 7, 'name': 'a'}, {'id': 1, 'name': 'b'}]}
+    with open(anno_file, 'w') as f:
+        json.dump(anno, f)
+    for _ in range(2):  # compile, then load the cache
+        index = COCOIndex(anno_file)
+        assert osp.isfile(index.cache_file)
+        np.testing.assert_array_equal(index.image_ids, [3, 9])
+        np.testing.assert_array_equal(index.ann_offsets, [0, 1, 3])
+        np.testing.assert_array_equal(index.category_ids, [1, 7, 1])
+        np.testing.assert_array_equal(index.is_rle, [True, False, False])
+        assert index.cat_names.tolist() == ['a', 'b']
+        assert index.entry(1)['coco_url'] == 'x/val/9.jpg'
+        assert index.polygons(0) == []
+        polys = index.polygons(1)
+        assert len(polys) == 2
+        np.testing.assert_array_equal(polys[1], [2, 2, 3, 3])
+    # changed annotations are compiled again
+    anno['annotations'].pop()
+    with open(anno_file, 'w') as f:
+        json.dump(anno, f)
+    np.testing.assert_array_equal(COCOIndex(anno_file).ann_offsets, [0, 1, 2])
+
 def test_voc_segmentation():
     if not osp.isdir(osp.expanduser('~/.mxnet/datasets/voc')):
         return
@@ -155,6 +192,144 @@ def test_lst_detection():
     except IOError:
         pass
 
+def test_recordfile_coef_detection():
+    import cv2
+    import tempfile
+    from gluoncv.data.recordio.coef_detection import pack_coef_records
+
+    class _Dataset(object):
+        classes = ('dog', 'cat')
+
+        def __init__(self, root):
+            self._image_path = osp.join(root, '{}.jpg')
+            self._items = [(str(i),) for i in range(5)]
+            self._label_cache = []
+            for i, item in enumerate(self._items):
+                cv2.imwrite(self._image_path.format(*item), np.full((32, 48, 3), i * 40, np.uint8))
+                # box, 50 coefficients, class, difficult, width, height and image id
+                label = np.random.uniform(size=(i + 1, 59))
+                label[:, -1] = 2008000000 + i
+                self._label_cache.append(label)
+
+        def __len__(self):
+            return len(self._items)
+
+    root = tempfile.mkdtemp()
+    dataset = _Dataset(root)
+    prefix = osp.join(root, 'packed')
+    assert pack_coef_records(dataset, prefix, num_shards=2) == 5
+    rec = data.RecordFileCoefDetection(prefix)
+    assert len(rec) == 5
+    assert rec.classes == dataset.classes
+    for i in [4, 0, 3, -4]:
+        img, label = rec[i]
+        assert img.shape == (32, 48, 3)
+        np.testing.assert_array_equal(label, dataset._label_cache[i])
+    try:
+        data.RecordFileCoefDetection(osp.join(root, 'missing'))
+        assert False, 'missing records should raise'
+    except OSError as e:
+        assert 'pack_coef_records' in str(e)
+
+def test_resized_image_cache():
+    import tempfile
+    from gluoncv.data.transforms import image as timage
+
+    class _Dataset(object):
+        classes = ('dog',)
+
+        def __init__(self):
+            self._images = [mx.nd.random.uniform(0, 255, (40 + i, 60, 3)).astype('uint8')
+                            for i in range(3)]
+            self._label_cache = [np.full((2, 6), i) for i in range(3)]
+            self._items = [('fake', str(i)) for i in range(3)]
+
+        def _load_label(self, idx):
+            return self._label_cache[idx]
+
+        def __len__(self):
+            return len(self._images)
+
+        def __getitem__(self, idx):
+            return self._images[idx], self._label_cache[idx]
+
+    dataset = _Dataset()
+    root = tempfile.mkdtemp()
+    for kwargs in [dict(root=root), dict(root=root), dict(root=None)]:
+        cache = data.ResizedImageCache(dataset, 32, 24, name='fake', **kwargs)
+        assert len(cache) == 3
+        for idx in range(3):
+            img, label = cache[idx]
+            assert img.shape == dataset._images[idx].shape
+            expected = timage.imresize(dataset._images[idx], 32, 24, interp=9)
+            np.testing.assert_array_equal(img.data.asnumpy(), expected.asnumpy())
+            np.testing.assert_array_equal(label, dataset._label_cache[idx])
+    # a split with other images of the same length is not served from the stale cache
+    for attr in ('_images', '_label_cache', '_items'):
+        setattr(dataset, attr, getattr(dataset, attr)[::-1])
+    cache = data.ResizedImageCache(dataset, 32, 24, root=root, name='fake')
+    for idx in range(3):
+        img, label = cache[idx]
+        assert img.shape == dataset._images[idx].shape
+        expected = timage.imresize(dataset._images[idx], 32, 24, interp=9)
+        np.testing.assert_array_equal(img.data.asnumpy(), expected.asnumpy())
+
+def test_shared_label_cache():
+    import pickle
+    import multiprocessing
+    labels = [np.random.uniform(size=(np.random.randint(0, 5), 58)) for _ in range(20)]
+    labels.append(np.array([]))
+    cache = data.SharedLabelCache(labels)
+    assert len(cache) == len(labels)
+    for label, cached in zip(labels, cache):
+        np.testing.assert_array_equal(cached, label)
+        assert cached.shape == label.shape
+    # pickled as a file name, the buffer is removed with the original only
+    copied = pickle.loads(pickle.dumps(cache))
+    assert len(pickle.dumps(cache)) < 1000
+    np.testing.assert_array_equal(copied[3], labels[3])
+    filename = cache._filename
+    del copied
+    assert osp.isfile(filename)
+    pool = multiprocessing.Pool(2)
+    for label, cached in zip(labels, pool.map(cache.__getitem__, range(len(labels)))):
+        np.testing.assert_array_equal(cached, label)
+    pool.close()
+    pool.join()
+    cache.close()
+    assert not osp.isfile(filename)
+
+def test_mixup_detection():
+    class _Dataset(object):
+        def __init__(self):
+            self._images = [mx.nd.full((10 + i, 12, 3), 100 + i, dtype='uint8') for i in range(4)]
+
+        def __len__(self):
+            return 4
+
+        def __getitem__(self, idx):
+            # box, 2 coefficients, class, difficult, width, height
+            return self._images[idx], np.array([[1, 2, 5, 6, 0.1, 0.2, idx, 0, 12, 10 + idx]])
+
+    for in_batch in [False, True]:
+        mixup = data.MixupDetection(_Dataset(), np.random.beta, 1.5, 1.5, in_batch=in_batch)
+        for idx in range(4):
+            img, label = mixup[idx]
+            assert label.shape[1] == 11
+            if label.shape[0] == 1:
+                assert label[0, -1] == 1 and img.shape == (10 + idx, 12, 3)
+                continue
+            other = int(label[1, 6])
+            assert other != idx
+            lambd = label[0, -1]
+            np.testing.assert_allclose(label[1, -1], 1 - lambd)
+            assert img.dtype == np.uint8 and img.shape == (10 + max(idx, other), 12, 3)
+            expected = np.uint8(np.float32(100 + idx) * np.float32(lambd) +
+                                np.float32(100 + other) * np.float32(1 - lambd))
+            assert img[0, 0, 0].asscalar() == expected
+            if in_batch:
+                assert other == idx - 1
+
 if __name__ == '__main__':
     import nose
     nose.runmodule()
@@ -39,6 +39,90 @@ def test_bbox_flip():
         transforms.bbox.flip(bbox, size, True, True),
         np.array([[300, 500, 490, 980], [100, 700, 350, 800]]))
 
+def test_coef_flip():
+    np.random.seed(0)
+    # bases closed under horizontal flip, so the flip matrix is exact
+    half = np.random.randn(10, 64, 64)
+    bases = np.concatenate([half, half[:, :, ::-1]]).reshape(20, -1)
+    matrix = transforms.coef.flip_matrix(bases)
+    assert matrix.shape == (20, 20)
+    mean, std = np.random.randn(20), np.random.uniform(1, 2, 20)
+    coefs = np.random.randn(5, 20).astype(np.float32)
+    flipped = transforms.coef.flip(coefs, matrix, mean, std)
+    assert flipped.dtype == coefs.dtype
+    np.testing.assert_allclose(transforms.coef.flip(flipped, matrix, mean, std), coefs, atol=1e-4)
+    np.testing.assert_allclose(
+        transforms.coef.reconstruct(flipped, bases, mean, std),
+        transforms.coef.reconstruct(coefs, bases, mean, std)[:, :, ::-1])
+    np.testing.assert_allclose(transforms.coef.flip_iou(coefs, bases, matrix, mean, std), 1)
+
+def test_coef_rasterize_encode():
+    # a rectangle covering the right half of its box
+    bbox = np.array([[10, 20, 42, 84, 3]], dtype=np.float32)
+    segm = [[np.array([[26, 20], [42, 20], [42, 84], [26, 84]], dtype=np.float32)]]
+    masks = transforms.coef.rasterize(segm, bbox, size=8)
+    assert masks.shape == (1, 64)
+    expected = np.zeros((8, 8), dtype=np.uint8)
+    expected[:, 4:] = 255
+    np.testing.assert_array_equal(masks[0].reshape(8, 8), expected)
+    bases = np.eye(64)[:10]
+    coefs = transforms.coef.encode(segm, bbox, gcv.utils.sparse_coding.SparseCoder(bases), size=8)
+    np.testing.assert_allclose(coefs, masks[:, :10])
+
+def test_transforms_presets_yolo_usdseg_coco():
+    # bases pick 5 pixels at each end of the first mask row
+    bases = np.zeros((10, 64 * 64))
+    bases[np.arange(10), [0, 1, 2, 3, 4, 59, 60, 61, 62, 63]] = 1
+    expected = [0] * 5 + [255] * 5
+    img = mx.nd.zeros((60, 80, 3), dtype='uint8')
+    label = np.array([[10, 20, 42, 52, 3]], dtype=np.float32)
+    # right half of the box
+    segm = [[np.array([[26, 20], [42, 20], [42, 52], [26, 52]], dtype=np.float32)]]
+    norm = {'coef_mean': np.zeros(10), 'coef_std': np.ones(10), 'crop': False, 'flip': False}
+    _, bbox = yolo.YOLO3UsdSegCocoTrainTransform(96, 96, bases, **norm)(img, label, segm)
+    np.testing.assert_allclose(bbox[:, 4:14], [expected])
+    assert bbox[0, 14] == 3
+    net = gcv.model_zoo.get_model('yolo3_tiny_darknet_voc', pretrained_base=False, num_bases=10)
+    net.initialize()
+    targets = yolo.YOLO3UsdSegCocoTrainTransform(96, 96, bases, net, **norm)(img, label, segm)
+    objectness, coef_targets = targets[1].asnumpy(), targets[4].asnumpy()
+    positive = objectness[:, 0] > 0
+    assert positive.sum() == 1
+    np.testing.assert_allclose(coef_targets[positive], [expected])
+
+def _fill_reference(mask, bbox, size):
+    # pad, resize with mx.image.imresize and paste, one mask at a time
+    width, height = size
+    M = mask.shape[0]
+    padded = np.zeros((M + 2, M + 2))
+    padded[1:-1, 1:-1] = mask
+    x1, y1, x2, y2 = bbox
+    x, y, hw, hh = (x1 + x2) / 2, (y1 + y2) / 2, (x2 - x1) / 2, (y2 - y1) / 2
+    hw, hh = hw * (M + 2) / M, hh * (M + 2) / M
+    x1, y1, x2, y2 = map(int, (x - hw, y - hh, x + hw, y + hh))
+    resized = mx.image.imresize(mx.nd.array(padded).reshape((0, 0, 1)),
+                                w=x2 - x1 + 1, h=y2 - y1 + 1, interp=1)
+    resized = (resized.reshape((0, 0)).asnumpy() > 0.5).astype('uint8')
+    ret = np.zeros((height, width), dtype='uint8')
+    xx1, yy1 = max(0, x1), max(0, y1)
+    xx2, yy2 = min(width, x2 + 1), min(height, y2 + 1)
+    ret[yy1:yy2, xx1:xx2] = resized[yy1 - y1:yy2 - y1, xx1 - x1:xx2 - x1]
+    return ret
+
+def test_mask_fill_batch():
+    np.random.seed(233)
+    masks = np.random.uniform(size=(20, 14, 14)).astype('float32')
+    xy = np.random.uniform(-5, 180, size=(20, 2))
+    bboxes = np.hstack((xy, xy + np.random.uniform(1, 150, size=(20, 2))))
+    expected = np.stack([_fill_reference(m, b, (300, 200)) for m, b in zip(masks, bboxes)])
+    np.testing.assert_array_equal(transforms.mask.fill_batch(masks, bboxes, (300, 200)), expected)
+    np.testing.assert_array_equal(transforms.mask.fill(masks[0], bboxes[0], (300, 200)), expected[0])
+    # write into a Fortran order buffer for pycocotools
+    out = np.zeros((200, 300, 20), dtype='uint8', order='F').transpose(2, 0, 1)
+    transforms.mask.fill_batch(masks, bboxes, (300, 200), out=out)
+    np.testing.assert_array_equal(out, expected)
+    assert transforms.mask.fill_batch(masks[:0], bboxes[:0], (300, 200)).shape == (0, 200, 300)
+
 def test_bbox_resize():
     bbox = np.array([[10, 20, 200, 500], [150, 200, 400, 300]], dtype=np.float32)
     in_size = (600, 1000)
@@ -195,6 +195,19 @@ def test_yolo3_models():
     models = ['yolo3_darknet53_voc']
     _test_model_list(models, ctx, x)
 
+def test_yolo3_anchor_cache():
+    from gluoncv.model_zoo.yolo.yolo_target import YOLOV3AnchorCache
+    for model_name in ['yolo3_darknet53_voc', 'yolo3_tiny_darknet_voc']:
+        net = gcv.model_zoo.get_model(model_name, pretrained=False, pretrained_base=False)
+        net.initialize()
+        cache = YOLOV3AnchorCache.from_net(net)
+        for size in [(320, 320), (416, 608)]:
+            with mx.autograd.train_mode():
+                _, anchors, offsets, feat_maps, _, _, _, _, _ = net(mx.nd.zeros((1, 3) + size))
+            c_feat_maps, c_anchors, c_offsets = cache(*size)
+            for a, b in zip(anchors + offsets + feat_maps, c_anchors + c_offsets + c_feat_maps):
+                np.testing.assert_allclose(a.asnumpy(), b.asnumpy())
+
 @try_gpu(0)
 def test_two_stage_ctx_loading():
     model_name = 'yolo3_darknet53_coco'
@@ -234,6 +247,41 @@ def test_segmentation_models():
     _test_model_list(models, ctx, x, pretrained=False, pretrained_base=True)
 
 
+class _PointwiseSegModel(mx.gluon.HybridBlock):
+    base_size = 40
+    crop_size = 24
+
+    def __init__(self):
+        super(_PointwiseSegModel, self).__init__()
+        with self.name_scope():
+            self.conv = mx.gluon.nn.Conv2D(5, 1, in_channels=3)
+
+    def hybrid_forward(self, F, x):
+        return self.conv(x)
+
+    def evaluate(self, x):
+        return self.forward(x)
+
+def test_multi_eval_model():
+    from gluoncv.model_zoo.segbase import MultiEvalModel
+    model = _PointwiseSegModel()
+    model.initialize(mx.init.Uniform(0.1))
+    img = mx.nd.random.uniform(shape=(3, 30, 50))
+    scales = [0.5, 1.0, 1.75]
+    # a pointwise model gives the same value for a pixel in every crop and flip
+    expected = mx.nd.zeros((1, 5, 30, 50))
+    for scale in scales:
+        long_size = int(np.ceil(40 * scale))
+        height = int(30. * long_size / 50 + 0.5)
+        cur = mx.nd.contrib.BilinearResize2D(img.expand_dims(0), height=height, width=long_size)
+        out = (model(cur) * 2).exp()
+        expected += mx.nd.contrib.BilinearResize2D(out, height=30, width=50)
+    for batch_size in (1, 3, 16):
+        evaluator = MultiEvalModel(model, 5, [mx.cpu()], scales=scales, batch_size=batch_size)
+        np.testing.assert_allclose(evaluator(img).asnumpy(), expected.asnumpy(),
+                                   rtol=1e-4, atol=1e-5)
+
+
 def test_mobilenet_sync_bn():
     model_name = "mobilenet1.0"
     net = gcv.model_zoo.get_model(model_name, pretrained=True)
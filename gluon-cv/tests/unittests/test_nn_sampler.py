@@ -0,0 +1,76 @@
+from __future__ import print_function
+
+import numpy as np
+import mxnet as mx
+from gluoncv.nn.sampler import HybridQuotaSampler, OHEMSampler
+from gluoncv.model_zoo.rpn.rpn_target import RPNTargetSampler
+
+def _random_ious(shape, seed=233):
+    np.random.seed(seed)
+    return mx.nd.array(np.random.uniform(0, 1, size=shape) ** 4)
+
+def test_hybrid_quota_sampler():
+    ious = _random_ious((3, 500, 10))
+    matches = mx.nd.ones((3, 500)) * -1
+    ious_max = ious.max(axis=-1).asnumpy()
+    num_pos = (ious_max >= 0.5).sum(axis=1)
+    num_neg = (ious_max < 0.5).sum(axis=1)
+    for hybridize in (False, True):
+        sampler = HybridQuotaSampler(64, 0.5, 0.5, 0., pos_ratio=0.25)
+        if hybridize:
+            sampler.hybridize()
+        samples = sampler(matches, ious).asnumpy()
+        for i in range(3):
+            pos = samples[i] > 0
+            neg = samples[i] < 0
+            # subsampled from positive and negative candidates only
+            assert np.all(ious_max[i][pos] >= 0.5) and np.all(ious_max[i][neg] < 0.5)
+            assert pos.sum() == min(num_pos[i], 16)
+            assert neg.sum() == min(num_neg[i], 64 - pos.sum())
+    # without filling, negatives are limited by their own quota
+    sampler = HybridQuotaSampler(64, 0.9, 0.5, 0., pos_ratio=0.25, fill_negative=False)
+    samples = sampler(matches, ious).asnumpy()
+    assert np.all((samples < 0).sum(axis=1) == 48)
+
+def test_ohem_sampler():
+    ious = _random_ious((4, 300, 5))
+    x = mx.nd.where(ious.max(axis=-1) >= 0.5, ious.argmax(axis=-1), mx.nd.ones((4, 300)) * -1)
+    x[1] = -1  # no positive
+    logits = mx.nd.random.normal(shape=(4, 300, 6))
+    np_ious = ious.max(axis=-1).asnumpy()
+    np_x = x.asnumpy()
+    for hybridize in (False, True):
+        sampler = OHEMSampler(3, min_samples=10, thresh=0.5)
+        if hybridize:
+            sampler.hybridize()
+        samples = sampler(x, logits, ious).asnumpy()
+        np.testing.assert_array_equal(samples > 0, np_x >= 0)
+        for i in range(4):
+            num_pos = int((np_x[i] >= 0).sum())
+            neg = samples[i] < 0
+            assert neg.sum() == min(max(3 * num_pos, 10), 300 - num_pos)
+            assert np.all(np_ious[i][neg] < 0.5)
+        # 2D ious are accepted as well
+        np.testing.assert_array_equal(
+            sampler(x, logits, ious.max(axis=-1)).asnumpy(), samples)
+
+def test_rpn_target_sampler():
+    ious = _random_ious((1000, 5))
+    np_ious = ious.asnumpy()
+    ious_max = np_ious.max(axis=1)
+    candidates = (ious_max >= 0.7) | np.any(np_ious >= np_ious.max(axis=0), axis=1)
+    num_candidates = int((candidates & (ious_max >= 0.3)).sum())
+    for hybridize in (False, True):
+        sampler = RPNTargetSampler(256, 0.7, 0.3, 0.5)
+        if hybridize:
+            sampler.hybridize()
+        samples, matches = sampler(ious)
+        samples = samples.asnumpy()
+        num_pos = int((samples > 0).sum())
+        assert num_pos == min(num_candidates, 128)
+        assert int((samples < 0).sum()) == 256 - num_pos
+        np.testing.assert_array_equal(matches.asnumpy(), ious.argmax(axis=1).asnumpy())
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
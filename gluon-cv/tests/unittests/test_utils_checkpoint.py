@@ -0,0 +1,68 @@
+from __future__ import print_function
+
+import json
+import os
+import tempfile
+import mxnet as mx
+from mxnet import gluon, autograd
+from gluoncv.utils import CheckpointManager
+
+def _step(net, trainer):
+    with autograd.record():
+        loss = net(mx.nd.ones((2, 3))).sum()
+    loss.backward()
+    trainer.step(2)
+
+def test_checkpoint_manager():
+    prefix = os.path.join(tempfile.mkdtemp(), 'yolo3')
+    net = gluon.nn.Dense(2, in_units=3)
+    net.initialize()
+    trainer = gluon.Trainer(net.collect_params(), 'sgd', {'learning_rate': 0.1, 'momentum': 0.9})
+    manager = CheckpointManager(prefix, keep_last=2, keep_best=1)
+    for epoch, metric in enumerate([0.1, 0.5, 0.3, 0.2]):
+        _step(net, trainer)
+        assert manager.save(net, trainer, epoch, metric)
+    assert not manager.save(net, trainer, 4, 0.05, periodic=False)
+    manager.close()
+    with open(prefix + '_checkpoints.json') as f:
+        manifest = json.load(f)
+    assert [c['epoch'] for c in manifest['last']] == [2, 3]
+    assert [c['epoch'] for c in manifest['best']] == [1]
+    kept = sorted(f for f in os.listdir(os.path.dirname(prefix)) if f.endswith('.params'))
+    assert kept == ['yolo3_0001_0.5000.params', 'yolo3_0002_0.3000.params',
+                    'yolo3_0003_0.2000.params', 'yolo3_best.params']
+
+    # resume network and momentum
+    net2 = gluon.nn.Dense(2, in_units=3)
+    net2.initialize()
+    trainer2 = gluon.Trainer(net2.collect_params(), 'sgd', {'learning_rate': 0.1, 'momentum': 0.9})
+    assert CheckpointManager.load(net2, trainer2, manifest['last'][-1]['params'])
+    _step(net, trainer)
+    _step(net2, trainer2)
+    mx.test_utils.assert_almost_equal(net.weight.data().asnumpy(), net2.weight.data().asnumpy())
+    assert CheckpointManager(prefix, resume=True).best_metric == 0.5
+    # a new run with the same prefix starts from scratch
+    assert CheckpointManager(prefix).best_metric == 0
+
+def test_checkpoint_states_on_servers():
+    prefix = os.path.join(tempfile.mkdtemp(), 'yolo3')
+    net = gluon.nn.Dense(2, in_units=3)
+    net.initialize()
+    trainer = gluon.Trainer(net.collect_params(), 'sgd', {'learning_rate': 0.1})
+    _step(net, trainer)
+    # as workers of dist_sync updating on kvstore, optimizer states live on servers
+    trainer._update_on_kvstore = True
+    trainer._kvstore = mx.kv.create('local')
+    trainer._kvstore._updater = None
+    manager = CheckpointManager(prefix)
+    assert manager.save(net, trainer, 0, 0.1)
+    manager.close()
+    with open(prefix + '_checkpoints.json') as f:
+        manifest = json.load(f)
+    assert manifest['last'][0]['states'] is None
+    assert not [f for f in os.listdir(os.path.dirname(prefix)) if f.endswith('.states')]
+    assert not CheckpointManager.load(net, trainer, manifest['last'][0]['params'])
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
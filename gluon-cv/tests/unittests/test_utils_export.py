@@ -1,6 +1,10 @@
 from __future__ import print_function
 
+import os
+import json
+import tempfile
 import numpy as np
+import mxnet as mx
 import gluoncv as gcv
 from gluoncv.model_zoo.model_store import pretrained_model_list
 from common import try_gpu
@@ -19,6 +23,40 @@ def test_export_model_zoo():
             # deeplab model do not support it now, skip
             pass
 
+def test_export_coef_bases():
+    bases = np.random.uniform(size=(50, 4096))
+    path = os.path.join(tempfile.mkdtemp(), 'usdseg')
+    filename = gcv.utils.export_coef_bases(path, bases)
+    loaded = mx.nd.load(filename)
+    assert loaded['bases'].dtype == np.float32
+    np.testing.assert_allclose(loaded['bases'].asnumpy(), bases, rtol=1e-6)
+    np.testing.assert_allclose(loaded['coef_mean'].asnumpy(), gcv.utils.bbox.x_mean, rtol=1e-6)
+    np.testing.assert_allclose(loaded['coef_std'].asnumpy(), gcv.utils.bbox.sqrt_var, rtol=1e-6)
+    try:
+        gcv.utils.export_coef_bases(path, bases[:20])
+        assert False, "Mismatched bases should be rejected"
+    except ValueError:
+        pass
+
+def test_reduced_precision_checks():
+    from gluoncv.utils.quantization import head_conv_names, get_reduced_precision_model
+    data = mx.sym.var('data')
+    body = mx.sym.Convolution(data, num_filter=4, kernel=(1, 1), name='darknetv30_conv0')
+    head = mx.sym.Convolution(body, num_filter=4, kernel=(1, 1), name='yolooutputv40_conv0')
+    assert head_conv_names(head) == ['yolooutputv40_conv0']
+    # head convolutions inside a subgraph, as after fusion
+    fused, _ = mx.sym.contrib.foreach(
+        lambda d, s: (mx.sym.Convolution(d, num_filter=2, kernel=(1, 1),
+                                         name='yolooutputv40_conv1'), s),
+        data, [mx.sym.var('state')])
+    nodes = json.loads(fused.tojson())['nodes']
+    assert head_conv_names(fused) == [n['name'] for n in nodes if n['op'] == '_foreach']
+    try:
+        get_reduced_precision_model('yolo3_tiny_darknet_voc', dtype='float16', ctx=mx.cpu())
+        assert False, "float16 should be rejected on cpu"
+    except ValueError:
+        pass
+
 if __name__ == '__main__':
     import nose
     nose.runmodule()
@@ -0,0 +1,149 @@
+from __future__ import print_function
+from __future__ import division
+
+import os.path as osp
+import tempfile
+import numpy as np
+
+from gluoncv.utils.bbox import bbox_iou
+from gluoncv.utils.metrics import voc_polygon_detection as vpd
+
+
+def _polygon_box_iou(pred_coef_l, bases, pred_bbox_l, gt_points_xs_l, gt_points_ys_l):
+    # box iou against the bounding box of gt polygons, instead of decoding masks
+    gt_bbox_l = np.stack([gt_points_xs_l.min(axis=1), gt_points_ys_l.min(axis=1),
+                          gt_points_xs_l.max(axis=1), gt_points_ys_l.max(axis=1)], axis=1)
+    return bbox_iou(pred_bbox_l, gt_bbox_l)
+
+
+def _make_metric(metric_cls, *args, **kwargs):
+    # the bases are loaded from a hard-coded path and iou decodes masks with them
+    load = np.load
+    np.load = lambda *a, **k: np.zeros((50, 64 * 64))
+    try:
+        metric = metric_cls(*args, **kwargs)
+    finally:
+        np.load = load
+    return metric
+
+
+def _fake_batches(num_batches=3, batch_size=2, num_pred=8, num_gt=4, num_class=3, seed=0):
+    rng = np.random.RandomState(seed)
+    batches = []
+    for b in range(num_batches):
+        xy = rng.uniform(0, 200, size=(batch_size, num_gt, 2))
+        wh = rng.uniform(40, 100, size=(batch_size, num_gt, 2))
+        gt_bboxes = np.concatenate([xy, xy + wh], axis=-1)
+        gt_labels = rng.randint(0, num_class, size=(batch_size, num_gt)).astype(np.float32)
+        gt_labels[:, -1] = -1  # padding
+        # polygons with the gt boxes as bounding boxes
+        t = np.linspace(0, 2 * np.pi, 360, endpoint=False)
+        cx, cy = (gt_bboxes[..., 0] + gt_bboxes[..., 2]) / 2, (gt_bboxes[..., 1] + gt_bboxes[..., 3]) / 2
+        rx, ry = wh[..., 0] / 2, wh[..., 1] / 2
+        gt_xs = cx[..., None] + rx[..., None] * np.cos(t)
+        gt_ys = cy[..., None] + ry[..., None] * np.sin(t)
+        # predictions are jittered gt boxes, so ious spread around the thresholds
+        src = rng.randint(0, num_gt - 1, size=(batch_size, num_pred))
+        pred_bboxes = np.take_along_axis(gt_bboxes, src[..., None], axis=1)
+        pred_bboxes = pred_bboxes + rng.uniform(-20, 20, size=pred_bboxes.shape)
+        pred_labels = np.take_along_axis(gt_labels, src, axis=1)
+        pred_labels[:, ::3] = rng.randint(0, num_class, size=pred_labels[:, ::3].shape)
+        pred_labels[:, -1] = -1
+        pred_scores = rng.uniform(size=(batch_size, num_pred))
+        batches.append(dict(
+            pred_bboxes=pred_bboxes, pred_coefs=rng.randn(batch_size, num_pred, 50),
+            pred_labels=pred_labels, pred_scores=pred_scores, gt_bboxes=gt_bboxes,
+            gt_points_xs=gt_xs, gt_points_ys=gt_ys, gt_labels=gt_labels,
+            widths=np.full((batch_size, num_gt, 1), 300.), heights=np.full((batch_size, num_gt, 1), 300.),
+            gt_difficults=(rng.uniform(size=(batch_size, num_gt)) < 0.2).astype(np.float32),
+            gt_coefs=rng.randn(batch_size, num_gt, 50),
+            gt_imgids=np.tile((np.arange(batch_size) + b * batch_size)[:, None, None], (1, num_gt, 1))))
+    return batches
+
+
+def _evaluate(metric, batches):
+    iou = vpd.coef_polygon_iou
+    vpd.coef_polygon_iou = _polygon_box_iou
+    try:
+        for batch in batches:
+            metric.update(**batch)
+        return metric.get()
+    finally:
+        vpd.coef_polygon_iou = iou
+
+
+def test_polygon_map_multi_thresh():
+    batches = _fake_batches()
+    class_names = ('a', 'b', 'c')
+    for metric_cls in (vpd.VOCPolygonMApMetric, vpd.VOC07PolygonMApMetric):
+        multi = _make_metric(metric_cls, iou_thresh=[0.5, 0.7], class_names=class_names)
+        names, values = _evaluate(multi, batches)
+        multi_results = dict(zip(names, values))
+        maps = []
+        for thresh in (0.5, 0.7):
+            single = _make_metric(metric_cls, iou_thresh=thresh, class_names=class_names)
+            single_names, single_values = _evaluate(single, batches)
+            for name, value in zip(single_names, single_values):
+                np.testing.assert_allclose(multi_results['%s@%s' % (name, thresh)], value)
+            maps.append(single_values[-1])
+        assert maps[0] > maps[1] > 0
+        np.testing.assert_allclose(multi_results['mAP@[0.5:0.7]'], np.mean(maps))
+        # without class names
+        single = _make_metric(metric_cls, iou_thresh=0.7)
+        np.testing.assert_allclose(_evaluate(single, batches)[1], maps[1])
+
+
+def test_polygon_map_hand_computed():
+    # two gts, the third prediction duplicates the first one
+    ious = np.array([[0.8, 0.1], [0.1, 0.6], [0.75, 0.0]])
+    batch = dict(
+        pred_bboxes=np.zeros((1, 3, 4)), pred_coefs=np.zeros((1, 3, 50)),
+        pred_labels=np.zeros((1, 3)), pred_scores=np.array([[0.9, 0.8, 0.7]]),
+        gt_bboxes=np.zeros((1, 2, 4)), gt_points_xs=np.zeros((1, 2, 360)),
+        gt_points_ys=np.zeros((1, 2, 360)), gt_labels=np.zeros((1, 2)),
+        widths=np.ones((1, 2, 1)), heights=np.ones((1, 2, 1)))
+    iou = vpd.coef_polygon_iou
+    vpd.coef_polygon_iou = lambda *args: ious
+    try:
+        for metric_cls, expected in ((vpd.VOCPolygonMApMetric, [1.0, 0.5]),
+                                     (vpd.VOC07PolygonMApMetric, [1.0, 6. / 11])):
+            metric = _make_metric(metric_cls, iou_thresh=[0.5, 0.7])
+            metric.update(**batch)
+            names, values = metric.get()
+            assert names == ['VOCMeanAP@0.5', 'VOCMeanAP@0.7', 'VOCMeanAP@[0.5:0.7]']
+            np.testing.assert_allclose(values, expected + [np.mean(expected)])
+    finally:
+        vpd.coef_polygon_iou = iou
+
+
+def test_coef_analysis_recorder():
+    batches = _fake_batches()
+    filename = osp.join(tempfile.mkdtemp(), 'analysis', 'coefs.npz')
+    metric = _make_metric(vpd.VOC07PolygonMApMetric, iou_thresh=0.5, analysis_file=filename)
+    _evaluate(metric, batches)
+    assert osp.isfile(filename)
+    with np.load(filename) as f:
+        records = {name: f[name] for name in f.files}
+    num = len(records['labels'])
+    assert num > 0 and num == len(metric._recorder)
+    assert records['gt_coefs'].shape == (num, 50) and records['pred_coefs'].shape == (num, 50)
+    assert records['gt_bboxes'].shape == (num, 4) and records['pred_bboxes'].shape == (num, 4)
+    # every record pairs a prediction and a gt of the same image and class
+    for i in range(num):
+        imgid = records['imgids'][i]
+        batch = batches[imgid // 2]
+        k = imgid % 2
+        gt = np.where(np.all(np.isclose(batch['gt_coefs'][k], records['gt_coefs'][i], atol=1e-5), axis=1))[0]
+        pred = np.where(np.all(np.isclose(batch['pred_coefs'][k], records['pred_coefs'][i], atol=1e-5), axis=1))[0]
+        assert len(gt) == 1 and len(pred) == 1
+        assert batch['gt_labels'][k, gt[0]] == records['labels'][i]
+        assert batch['pred_labels'][k, pred[0]] == records['labels'][i]
+        np.testing.assert_allclose(records['gt_bboxes'][i], batch['gt_bboxes'][k, gt[0]], rtol=1e-5)
+    # reset drops the buffered records
+    metric.reset()
+    assert len(metric._recorder) == 0
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
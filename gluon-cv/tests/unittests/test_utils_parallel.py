@@ -45,6 +45,13 @@ def test_data_parallel():
     test_net_sync(net, criterion, False, 1)
     test_net_sync(net, criterion, False, 2)
 
+def test_exit_code():
+    from gluoncv.utils import exit_code
+    assert exit_code([0, 0]) == 0
+    assert exit_code([0, 1, 2]) == 1
+    # killed by SIGKILL while another worker succeeded
+    assert exit_code([0, -9]) == 137
+
 
 if __name__ == "__main__":
     import nose
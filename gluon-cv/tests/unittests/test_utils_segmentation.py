@@ -68,6 +68,35 @@ def test_segmentation_utils():
     np.testing.assert_allclose(total_correct, np_correct)
     np.testing.assert_allclose(total_label, np_label)
 
+def test_segmentation_metric():
+    np.random.seed(233)
+    nclass = 5
+    metric = SegmentationMetric(nclass)
+    np_matrix = np.zeros((nclass, nclass), dtype=np.int64)
+    for _ in range(3):
+        scores = np.random.uniform(size=(2, nclass, 8, 10))
+        labels = np.random.randint(-1, nclass + 1, size=(2, 8, 10))
+        preds = scores.argmax(axis=1)
+        for label, pred in zip(labels.ravel(), preds.ravel()):
+            if 0 <= label < nclass:
+                np_matrix[label, pred] += 1
+        metric.update([mx.nd.array(labels[:1]), mx.nd.array(labels[1:])],
+                      [mx.nd.array(scores[:1]), mx.nd.array(scores[1:])])
+    np.testing.assert_array_equal(metric.confusion_matrix, np_matrix)
+    inter = np.diag(np_matrix)
+    union = np_matrix.sum(axis=0) + np_matrix.sum(axis=1) - inter
+    iou = inter / (np.spacing(1) + union)
+    pixAcc, mIoU = metric.get()
+    np.testing.assert_allclose(pixAcc, inter.sum() / np_matrix.sum())
+    np.testing.assert_allclose(mIoU, iou.mean())
+    np.testing.assert_allclose(metric.get_fwiou(),
+                               (np_matrix.sum(axis=1) / np_matrix.sum() * iou).sum())
+    # ignore a valid label as well
+    metric = SegmentationMetric(nclass, ignore_label=0)
+    metric.update(mx.nd.array(labels), mx.nd.array(scores))
+    assert metric.confusion_matrix[0].sum() == 0
+    assert metric.total_label == ((labels > 0) & (labels < nclass)).sum()
+
 if __name__ == '__main__':
     import nose
     nose.runmodule()
@@ -0,0 +1,32 @@
+from __future__ import print_function
+
+import numpy as np
+from sklearn.decomposition import sparse_encode
+from gluoncv.utils.sparse_coding import SparseCoder
+
+def _regression_set():
+    np.random.seed(233)
+    bases = np.random.randn(20, 256)
+    bases /= np.linalg.norm(bases, axis=1, keepdims=True)
+    masks = (np.random.rand(50, 256) > 0.5) * 255.
+    return bases, masks
+
+def test_sparse_coder_least_squares():
+    bases, masks = _regression_set()
+    expected = sparse_encode(masks, bases, algorithm='omp', n_nonzero_coefs=20)
+    np.testing.assert_allclose(SparseCoder(bases).encode(masks), expected, rtol=1e-6, atol=1e-6)
+
+def test_sparse_coder_sklearn():
+    bases, masks = _regression_set()
+    cases = [('omp', dict(n_nonzero_coefs=5), dict(algorithm='omp', n_nonzero_coefs=5)),
+             ('lars', dict(n_nonzero_coefs=5), dict(algorithm='lars', n_nonzero_coefs=5)),
+             ('ista', dict(alpha=100., tol=1e-10), dict(algorithm='lasso_lars', alpha=100.)),
+             ('threshold', dict(alpha=100.), dict(algorithm='threshold', alpha=100.))]
+    for algorithm, kwargs, sk_kwargs in cases:
+        codes = SparseCoder(bases, algorithm, **kwargs).encode(masks)
+        expected = sparse_encode(masks, bases, **sk_kwargs)
+        np.testing.assert_allclose(codes, expected, rtol=1e-4, atol=1e-4 * np.abs(expected).max())
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
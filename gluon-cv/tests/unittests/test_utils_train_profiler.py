@@ -0,0 +1,45 @@
+from __future__ import print_function
+
+import json
+import os
+import tempfile
+import time
+import mxnet as mx
+from gluoncv.utils import TrainProfiler
+
+def test_train_profiler():
+    log_file = os.path.join(tempfile.mkdtemp(), 'profile.jsonl')
+    profiler = TrainProfiler(log_file=log_file)
+    batches = [(mx.nd.zeros((2, 3)),) for _ in range(4)]
+    for i, batch in enumerate(profiler.iterate(batches)):
+        time.sleep(0.01)
+        profiler.mark('forward')
+        profiler.mark('step')
+        if (i + 1) % 2 == 0:
+            record = profiler.log(0, i, lr=0.1)
+            assert list(record['stages'].keys()) == ['data', 'forward', 'step']
+            assert record['stages']['forward']['p50'] >= 10
+            assert record['iters'] == 2
+    assert profiler.global_iter == 4
+    with open(log_file) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 2
+    assert records[1]['lr'] == 0.1 and records[1]['global_iter'] == 3
+
+def test_train_profiler_disabled():
+    profiler = TrainProfiler(enabled=False)
+    batches = list(profiler.iterate(range(3)))
+    profiler.mark('forward')
+    assert batches == [0, 1, 2]
+    assert profiler.log(0, 0) is None
+    # the trace window runs without measuring stages
+    trace_file = os.path.join(tempfile.mkdtemp(), 'trace.json')
+    profiler = TrainProfiler(enabled=False, trace_iters=(1, 2), trace_file=trace_file)
+    for batch in profiler.iterate([mx.nd.ones((2, 3)) for _ in range(3)]):
+        (batch * 2).wait_to_read()
+    assert profiler.global_iter == 3
+    assert os.path.isfile(trace_file)
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,62 @@
+"""Cost of encoding COCO polygons to coefficients on the fly, per image."""
+import argparse
+import time
+import pickle
+import numpy as np
+from gluoncv.data import COCOInstance
+from gluoncv.data.transforms import coef as tcoef
+from gluoncv.utils.sparse_coding import SparseCoder
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark on the fly coefficient encoding.')
+    parser.add_argument('--root', type=str, default='~/.mxnet/datasets/coco',
+                        help='COCO root directory.')
+    parser.add_argument('--split', type=str, default='instances_val2017',
+                        help='Annotation split.')
+    parser.add_argument('--bases', type=str, default='/home/tutian/dataset/coco_to_voc/coco_all_50_1.npy',
+                        help='Basis matrix with shape (num_bases, 4096).')
+    parser.add_argument('--sklearn-model', type=str, default='',
+                        help='Optionally compare with the pickled sklearn dictionary, e.g. all_50_1.sklearnmodel')
+    parser.add_argument('--n-nonzero-coefs', type=int, default=0,
+                        help='Number of non-zero coefficients, 0 keeps all atoms.')
+    parser.add_argument('--num-images', type=int, default=500,
+                        help='Number of images to encode.')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    dataset = COCOInstance(args.root, splits=args.split)
+    bases = np.load(args.bases)
+    coder = SparseCoder(bases, n_nonzero_coefs=args.n_nonzero_coefs or None)
+    dico = None
+    if args.sklearn_model:
+        with open(args.sklearn_model, 'rb') as f:
+            dico = pickle.load(f)
+
+    num_images = min(args.num_images, len(dataset))
+    raster_time, encode_time, sklearn_time, num_instances = 0., 0., 0., 0
+    errors = []
+    for idx in range(num_images):
+        label, segm = dataset._labels[idx], dataset._segms[idx]
+        tic = time.time()
+        masks = tcoef.rasterize(segm, label)
+        raster_time += time.time() - tic
+        tic = time.time()
+        coefs = coder.encode(masks)
+        encode_time += time.time() - tic
+        num_instances += len(masks)
+        if dico is not None:
+            tic = time.time()
+            ref = np.concatenate([dico.transform(m[np.newaxis].astype(np.float64)) for m in masks])
+            sklearn_time += time.time() - tic
+            errors.append(np.abs(coefs - ref).max(axis=1) / np.abs(ref).max(axis=1))
+
+    print('{} images, {} instances'.format(num_images, num_instances))
+    print('rasterize: {:.3f} ms/image'.format(raster_time / num_images * 1000))
+    print('encode:    {:.3f} ms/image'.format(encode_time / num_images * 1000))
+    if dico is not None:
+        print('sklearn transform per instance: {:.3f} ms/image, {:.1f}x slower'.format(
+            sklearn_time / num_images * 1000, sklearn_time / max(encode_time, 1e-9)))
+        print('max relative code difference: {:.2e}'.format(np.concatenate(errors).max()))
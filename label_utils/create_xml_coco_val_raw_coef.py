@@ -2,7 +2,7 @@ import cv2 as cv
 import numpy as np
 from PIL import Image
 import os
-import pickle
+from gluoncv.utils.sparse_coding import load_sparse_coder
 from tqdm import tqdm
 from lxml.etree import Element, SubElement, tostring
 from xml.dom.minidom import parseString
@@ -143,18 +143,21 @@ def runOneImage(img_path):
         instance_mask_ = instance[x:x + w, y:y + h].astype(np.bool) * 255
         instance_mask_ = Image.fromarray(instance_mask_.astype(np.uint8)).resize((64, 64), Image.NEAREST)
         instance_mask_ = np.reshape(instance_mask_, (-1, 64 * 64))
-        coeffs = dico.transform(instance_mask_).astype('float64')  # Just put the raw coef into XML
-
         # Here x, y is the center
         x += w/2
         y += h/2
         objects_info['label'] = COCO_LABEL_MAP[cat_id]  # Convert from 1-90 to 1-80
         objects_info['bbox'] = (y, x, h, w)  # TO BE CAREFUL
         objects_info['img_wh'] = (img_width, img_height)
-        objects_info['coeffs'] = coeffs
+        objects_info['mask'] = instance_mask_
         objects_info['inst_id'] = instance_id
         img_info_dict.append(objects_info)
 
+    # encode all instances of the image in one call
+    masks = [objects_info.pop('mask') for objects_info in img_info_dict]
+    coeffs = dico.encode(np.reshape(masks, (-1, 64 * 64))).astype('float64')  # Just put the raw coef into XML
+    for i, objects_info in enumerate(img_info_dict):
+        objects_info['coeffs'] = coeffs[i:i + 1]
     info_txt = np.zeros((len(img_info_dict), 9 + n_components))
     for i in range(len(img_info_dict)):
         info_txt[i][0] = img_info_dict[i]['label']
@@ -187,7 +190,7 @@ if __name__ == "__main__":
 
     model_path = '/home/tutian/dataset/coco_to_voc/coco_all_50_1.sklearnmodel'
     n_components = 50
-    dico = pickle.load(open(f'{model_path}', 'rb'))
+    dico = load_sparse_coder(f'{model_path}')
     # dico is treated as the global variable
 
     for i in tqdm(range(len(inst_list))):
@@ -2,7 +2,7 @@ import cv2 as cv
 import numpy as np
 from PIL import Image
 import os
-import pickle
+from gluoncv.utils.sparse_coding import load_sparse_coder
 from tqdm import tqdm
 from lxml.etree import Element, SubElement, tostring
 from xml.dom.minidom import parseString
@@ -127,21 +127,6 @@ def runOneImage(img_path):
         instance_mask_ = instance[x:x + w, y:y + h].astype(np.bool) * 255
         instance_mask_ = Image.fromarray(instance_mask_.astype(np.uint8)).resize((64, 64), Image.NEAREST)
         instance_mask_ = np.reshape(instance_mask_, (-1, 64 * 64))
-        coeffs = dico.transform(instance_mask_).astype('float64')
-        # np.clip(coeffs, -2500, 2500, coeffs)
-        # coeffs = coeffs / 5000  # clip to -0.5 to 0.5
-        # print(f'{coeffs.shape}, {coeffs[0]}')
-        # assert (np.max(coeffs) <= 2500 and np.min(coeffs) >= -2500)
-        # if coeffs.max() == coeffs.min():
-        #     print(f'coeffs.max == min occurred on img {img_path} instance id {instance_id}')
-        #     continue
-        # print(coeffs.shape)
-        assert coeffs.shape == (1, 50)
-        # coeffs = 2 * (coeffs - coeffs.min()) / (coeffs.max() - coeffs.min()) - 1
-        coeffs = (coeffs - x_mean) / sqrt_var
-        # print(np.unique(coeffs))
-        # assert (np.max(coeffs) == 1 and np.min(coeffs) == -1)
-
         # Here x, y is the center
         x += w/2
         y += h/2
@@ -150,8 +135,15 @@ def runOneImage(img_path):
         objects_info['img_wh'] = (img_width, img_height)
         # objects_info['center'] = (center_x,center_y)
         # No need for center at all
-        objects_info['coeffs'] = coeffs
+        objects_info['mask'] = instance_mask_
         img_info_dict.append(objects_info)
+    # encode all instances of the image in one call
+    masks = [objects_info.pop('mask') for objects_info in img_info_dict]
+    coeffs = dico.encode(np.reshape(masks, (-1, 64 * 64))).astype('float64')
+    assert coeffs.shape[1:] == (50,)
+    coeffs = (coeffs - x_mean) / sqrt_var
+    for i, objects_info in enumerate(img_info_dict):
+        objects_info['coeffs'] = coeffs[i:i + 1]
     # with open(os.path.join(label_dir_pkl, img_name[:-4] + '.pkl'), 'wb') as fpkl:
     #     pickle.dump(img_info_dict, fpkl)
     info_txt = np.zeros((len(img_info_dict), 9 + n_components))
@@ -187,7 +179,7 @@ if __name__ == "__main__":
     path = '/disk1/home/tutian/ese_seg/label_utils'
     n_components = 50
     n_iter = 1
-    dico = pickle.load(open(f'{path}/all_{n_components}_{n_iter}.sklearnmodel', 'rb'))
+    dico = load_sparse_coder(f'{path}/all_{n_components}_{n_iter}.sklearnmodel')
     # dico is treated as the global variable
 
     for i in tqdm(range(len(inst_list))):
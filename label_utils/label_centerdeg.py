@@ -6,6 +6,7 @@ import os
 from utils import *
 import json
 import pickle
+from gluoncv.utils.sparse_coding import load_sparse_coder
 from center import *
 from tqdm import tqdm
 import math
@@ -357,18 +358,19 @@ def runOneImage(img_path):
         instance_mask_ = instance[x:x + w, y:y + h].astype(np.bool) * 255
         instance_mask_ = Image.fromarray(instance_mask_.astype(np.uint8)).resize((64, 64), Image.NEAREST)
         instance_mask_ = np.reshape(instance_mask_, (-1, 64*64))     
-        coeffs = dico.transform(instance_mask_)
-        np.clip(coeffs, -2500, 2500, coeffs)
-        # print(f'{coeffs.shape}, {coeffs[0]}')
-        assert(np.max(coeffs) <= 2500 and np.min(coeffs) >= -2500)
-
         objects_info['label'] = cat_id
         objects_info['bbox'] = (x,y,w,h)
         objects_info['img_wh'] = (img_width,img_height)
         # objects_info['center'] = (center_x,center_y)
         # No need for center at all
-        objects_info['coeffs'] = coeffs
+        objects_info['mask'] = instance_mask_
         img_info_dict.append(objects_info)
+    # encode all instances of the image in one call
+    masks = [objects_info.pop('mask') for objects_info in img_info_dict]
+    coeffs = dico.encode(np.reshape(masks, (-1, 64 * 64)))
+    np.clip(coeffs, -2500, 2500, coeffs)
+    for i, objects_info in enumerate(img_info_dict):
+        objects_info['coeffs'] = coeffs[i:i + 1]
     with open(os.path.join(label_dir_pkl,img_name[:-4]+'.pkl'),'wb') as fpkl:
         pickle.dump(img_info_dict,fpkl)
     info_txt = np.zeros((len(img_info_dict),9 + n_components))
@@ -386,7 +388,7 @@ if __name__ == "__main__":
     path = '/disk1/home/tutian/ese_seg/label_utils'
     n_components = 50
     n_iter = 1
-    dico = pickle.load(open(f'{path}/all_{n_components}_{n_iter}.sklearnmodel', 'rb'))
+    dico = load_sparse_coder(f'{path}/all_{n_components}_{n_iter}.sklearnmodel')
     # dico is treated as the global variable
 
     for i in tqdm(range(len(inst_list))):
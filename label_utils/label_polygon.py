@@ -6,6 +6,7 @@ import os
 from utils import *
 import json
 import pickle
+from gluoncv.utils.sparse_coding import load_sparse_coder
 from center import *
 from tqdm import tqdm
 import math
@@ -399,17 +400,18 @@ def runOneImage(img_path,save_dir,polygon_num):
         instance_mask_ = instance[x:x + w, y:y + h].astype(np.bool) * 255
         instance_mask_ = Image.fromarray(instance_mask_.astype(np.uint8)).resize((64, 64), Image.NEAREST)
         instance_mask_ = np.reshape(instance_mask_, (-1, 64*64))     
-        coeffs = dico.transform(instance_mask_)
-        np.clip(coeffs, -2500, 2500, coeffs)
-        # print(f'{coeffs.shape}, {coeffs[0]}')
-        # assert(np.max(coeffs) <= 2500 and np.min(coeffs) >= -2500)
-
         has_object = True
         objects_info['label'] = cat_id
         objects_info['imgwh'] = (imw,imh)
         objects_info['bbox'] = (x,y,w,h)
-        objects_info['polygon_info'] = coeffs
+        objects_info['mask'] = instance_mask_
         img_info_dict.append(objects_info)
+    # encode all instances of the image in one call
+    masks = [objects_info.pop('mask') for objects_info in img_info_dict]
+    coeffs = dico.encode(np.reshape(masks, (-1, 64 * 64)))
+    np.clip(coeffs, -2500, 2500, coeffs)
+    for i, objects_info in enumerate(img_info_dict):
+        objects_info['polygon_info'] = coeffs[i:i + 1]
     if has_object == True:
         with open(os.path.join(label_dir_pkl,img_name[:-4]+'.pkl'),'wb') as fpkl:
             pickle.dump(img_info_dict,fpkl)
@@ -439,7 +441,7 @@ if __name__ == "__main__":
     path = '/disk1/home/tutian/ese_seg/label_utils'
     n_components = 50
     n_iter = 1
-    dico = pickle.load(open(f'{path}/all_{n_components}_{n_iter}.sklearnmodel', 'rb'))
+    dico = load_sparse_coder(f'{path}/all_{n_components}_{n_iter}.sklearnmodel')
     # dico is treated as the global variable
 
 
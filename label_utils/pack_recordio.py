@@ -0,0 +1,41 @@
+"""Pack SBD train/val splits with coefficient labels into sharded RecordIO files."""
+import argparse
+import os
+import time
+from gluoncv import data as gdata
+from gluoncv.data.recordio.coef_detection import pack_coef_records
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Pack images and coefficient labels into RecordIO.')
+    parser.add_argument('--root', type=str, default='/home/tutian/dataset',
+                        help='Dataset root directory.')
+    parser.add_argument('--train-split', type=str, default='train_8_bboxwh',
+                        help='Training split of sbdche, empty to skip.')
+    parser.add_argument('--val-splits', type=str, default='val_8_bboxwh,val_2012_bboxwh',
+                        help='Comma separated validation splits of sbdche, empty to skip. '
+                        'val_2012_bboxwh is read by sbd_train_che_8.py with --val_2012.')
+    parser.add_argument('--output', type=str, default='/home/tutian/dataset/rec',
+                        help='Output directory.')
+    parser.add_argument('--num-shards', type=int, default=4,
+                        help='Number of shards of each split.')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    jobs = []
+    if args.train_split:
+        jobs.append((gdata.VOCDetection, args.train_split))
+    for split in args.val_splits.split(','):
+        if split.strip():
+            jobs.append((gdata.VOC_Val_Detection, split.strip()))
+    for dataset_cls, split in jobs:
+        dataset = dataset_cls(root=args.root, splits=[('sbdche', split)])
+        prefix = os.path.join(args.output, 'sbdche_' + split)
+        tic = time.time()
+        num = pack_coef_records(dataset, prefix, args.num_shards)
+        print('{}: packed {} images into {} shards in {:.1f}s'.format(
+            prefix, num, args.num_shards, time.time() - tic))
@@ -0,0 +1,32 @@
+"""Launch data parallel training in several local CPU processes.
+
+Example:
+    python launch_cpu.py -n 4 python train_tinyyolo.py --gpus '' --kvstore dist_sync ...
+"""
+import argparse
+import sys
+from gluoncv.utils import launch_local, exit_code
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run a training command in several local processes.')
+    parser.add_argument('-n', '--num-workers', type=int, default=2,
+                        help='Number of training processes.')
+    parser.add_argument('-s', '--num-servers', type=int, default=1,
+                        help='Number of parameter server processes.')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='CPU threads of each process, 0 divides all cores among processes.')
+    parser.add_argument('--port', type=int, default=9091,
+                        help='Port of the kvstore scheduler.')
+    parser.add_argument('command', nargs=argparse.REMAINDER,
+                        help='Training command, which should use --kvstore dist_sync.')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if not args.command:
+        raise ValueError('No training command given.')
+    codes = launch_local(args.command, args.num_workers, args.num_servers,
+                         threads_per_worker=args.threads or None, port=args.port)
+    sys.exit(exit_code(codes))
@@ -0,0 +1,115 @@
+"""Accuracy vs latency of USD-Seg networks in reduced precision on cpu."""
+import argparse
+import logging
+import time
+import mxnet as mx
+from gluoncv import data as gdata
+from gluoncv import utils as gutils
+from gluoncv.utils.quantization import get_reduced_precision_model
+from sbd_eval_che_8 import get_dataset, get_dataloader, validate
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare float32 and int8 USD-Seg inference on cpu.')
+    parser.add_argument('--network', type=str, default='tiny_darknet',
+                        help="Base network name, e.g. tiny_darknet or darknet53.")
+    parser.add_argument('--dataset', type=str, default='voc',
+                        help='Evaluation dataset, voc(SBD val) or coco.')
+    parser.add_argument('--resume', type=str, default='',
+                        help='Parameters to evaluate, e.g. ./yolo3_xxx_0123.params')
+    parser.add_argument('--dtypes', type=str, default='float32,int8',
+                        help='Comma separated precisions among float32, int8 and uint8. '
+                        'int8 and uint8 require MXNet built with MKLDNN.')
+    parser.add_argument('--calib-mode', type=str, default='naive',
+                        help='Calibration mode of int8: none, naive or entropy.')
+    parser.add_argument('--num-calib-batches', type=int, default=10,
+                        help='Number of batches of the training split used for calibration, '
+                        'SBD train for voc and COCO train for coco, so no evaluated image is '
+                        'seen by the calibration.')
+    parser.add_argument('--data-shape', type=int, default=416,
+                        help="Input data shape.")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Evaluation mini-batch size.')
+    parser.add_argument('--num-workers', '-j', dest='num_workers', type=int,
+                        default=4, help='Number of data workers.')
+    parser.add_argument('--num_bases', type=int, default=50, help='the number of bases')
+    parser.add_argument('--latency-iters', type=int, default=100,
+                        help='Number of forward passes to measure latency.')
+    parser.add_argument('--no-eval', action='store_true',
+                        help='Only measure latency.')
+    parser.add_argument('--report', type=str, default='precision_report.md',
+                        help='Markdown report file.')
+    parser.add_argument('--val_voc2012', type=bool, default=False, help='val in pascal voc 2012')
+    parser.add_argument('--mask-iou-thresh', type=str, default='', help='Mask mAP iou thresholds.')
+    args = parser.parse_args()
+    return args
+
+
+def get_calib_dataset(dataset):
+    """Training split of the dataset, which is disjoint from the evaluated images."""
+    if dataset.lower() == 'voc':
+        return gdata.VOCDetection(splits=[('sbdche', 'train_8_bboxwh')])
+    if dataset.lower() == 'coco':
+        return gdata.cocoDetection(root='/home/tutian/dataset/coco_to_voc/train',
+                                   subfolder='./bases_50_xml_each_var')
+    raise NotImplementedError('Dataset: {} not implemented.'.format(dataset))
+
+
+def get_calib_data(calib_loader, num_batches):
+    """Stack the first `num_batches` batches of the calibration loader."""
+    data = []
+    for i, batch in enumerate(calib_loader):
+        if i >= num_batches:
+            break
+        data.append(batch[0])
+    return mx.nd.concat(*data, dim=0)
+
+
+def measure_latency(net, data_shape, batch_size, num_iters, ctx):
+    """Average forward latency in ms with fixed input shape."""
+    x = mx.nd.random.uniform(-2, 2, shape=(batch_size, 3, data_shape, data_shape), ctx=ctx)
+    for y in net(x):
+        y.wait_to_read()
+    tic = time.time()
+    for _ in range(num_iters):
+        outs = net(x)
+    mx.nd.waitall()
+    return (time.time() - tic) / num_iters * 1000
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    gutils.random.seed(233)
+    ctx = mx.cpu()
+    net_name = '_'.join(('yolo3', args.network, args.dataset))
+    val_dataset, eval_metric, polygon_metric = get_dataset(args.dataset, args)
+    val_data = get_dataloader(None, val_dataset, args.data_shape, args.batch_size, args.num_workers, args)
+    calib_loader = get_dataloader(None, get_calib_dataset(args.dataset), args.data_shape,
+                                  args.batch_size, args.num_workers, args)
+    calib_data = get_calib_data(calib_loader, args.num_calib_batches)
+
+    rows = []
+    for dtype in [d.strip() for d in args.dtypes.split(',') if d.strip()]:
+        net, info = get_reduced_precision_model(
+            net_name, args.resume.strip() or None, dtype, args.data_shape, args.num_bases, ctx=ctx,
+            calib_data=calib_data, calib_mode=args.calib_mode, batch_size=args.batch_size)
+        latency = measure_latency(net, args.data_shape, args.batch_size, args.latency_iters, ctx)
+        box_map, mask_map = float('nan'), float('nan')
+        if not args.no_eval:
+            polygon_metric.reset()
+            (_, box_aps), (_, mask_aps) = validate(net, val_data, [ctx], eval_metric, polygon_metric, args)
+            box_map, mask_map = box_aps[-1], mask_aps[-1]
+        rows.append((dtype, latency, box_map, mask_map))
+        logging.info('%s: %.2f ms/batch, box mAP %.4f, mask mAP %.4f', dtype, latency, box_map, mask_map)
+
+    lines = ['| {} bs={} {}x{} | latency (ms) | speedup | box mAP | mask mAP |'.format(
+        net_name, args.batch_size, args.data_shape, args.data_shape),
+             '| :-: | :-: | :-: | :-: | :-: |']
+    base_latency = rows[0][1]
+    for dtype, latency, box_map, mask_map in rows:
+        lines.append('| {} | {:.2f} | {:.2f}x | {:.4f} | {:.4f} |'.format(
+            dtype, latency, base_latency / latency, box_map, mask_map))
+    with open(args.report, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    print('\n'.join(lines))
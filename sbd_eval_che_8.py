@@ -93,9 +93,35 @@ def parse_args():
     parser.add_argument('--label-smooth', action='store_true', help='Use label smoothing.')
     parser.add_argument('--num_bases', type=int, default=50, help='the number of bases')
     parser.add_argument('--val_voc2012', type=bool, default=False, help='val in pascal voc 2012')
+    parser.add_argument('--mask-iou-thresh', type=str, default='',
+                        help='Comma separated iou thresholds of mask mAP, e.g. 0.5,0.75. '
+                        'All thresholds share one pass of mask iou computation. '
+                        'Use "coco" for 0.5:0.95. Default is 0.5 for voc and 0.75 for coco.')
+    parser.add_argument('--cached-model', action='store_true',
+                        help='Export the network with fixed data shape once and reload the cached '
+                        'symbol and params with static memory allocation, which skips network '
+                        'construction and graph building on later runs.')
+    parser.add_argument('--val-cache', type=str, default='',
+                        help='Directory of the resized validation image cache, which is built on the '
+                        'first run. Empty disables the cache.')
+    parser.add_argument('--analysis-file', type=str, default='',
+                        help='Write gt/pred coefficient pairs of matched predictions into this .npz '
+                        'file for coefficient analysis, voc only. Empty disables the recorder.')
+    parser.add_argument('--val-cache-memory', action='store_true',
+                        help='Keep the resized validation images in memory instead of memory-mapping '
+                        'the cache file, suitable for SBD sized splits.')
     args = parser.parse_args()
     return args
 
+def get_mask_iou_thresh(args, default):
+    """Parse mask iou thresholds from args."""
+    if not args.mask_iou_thresh.strip():
+        return default
+    if args.mask_iou_thresh.strip().lower() == 'coco':
+        return [round(t, 2) for t in np.arange(0.5, 0.96, 0.05)]
+    threshs = [float(t) for t in args.mask_iou_thresh.split(',') if t.strip()]
+    return threshs if len(threshs) > 1 else threshs[0]
+
 def get_dataset(dataset, args):
     if dataset.lower() == 'voc':
         if args.val_voc2012:
@@ -105,11 +131,14 @@ def get_dataset(dataset, args):
             val_dataset = gdata.VOC_Val_Detection(
                 splits=[('sbdche', 'val'+'_'+'8'+'_bboxwh')])
         val_metric = VOC07MApMetric(iou_thresh=0.5, class_names=val_dataset.classes)
-        val_polygon_metric = VOC07PolygonMApMetric(iou_thresh=0.5, class_names=val_dataset.classes)
+        val_polygon_metric = VOC07PolygonMApMetric(iou_thresh=get_mask_iou_thresh(args, 0.5),
+                                                   class_names=val_dataset.classes,
+                                                   analysis_file=getattr(args, 'analysis_file', '') or None)
     elif dataset.lower() == 'coco':
         val_dataset = gdata.cocoDetection(root='/home/tutian/dataset/coco_to_voc/val', subfolder='./bases_50_xml_'+'raw_coef')
         val_metric = VOC07MApMetric(iou_thresh=0.75, class_names=val_dataset.classes)
-        val_polygon_metric = New07PolygonMApMetric(iou_thresh=0.75, class_names=val_dataset.classes, root='/home/tutian/dataset/coco_to_voc/val/')
+        val_polygon_metric = New07PolygonMApMetric(iou_thresh=get_mask_iou_thresh(args, 0.75), class_names=val_dataset.classes,
+                                                   root='/home/tutian/dataset/coco_to_voc/val/')
     else:
         raise NotImplementedError('Dataset: {} not implemented.'.format(dataset))
     return val_dataset, val_metric, val_polygon_metric
@@ -117,6 +146,11 @@ def get_dataset(dataset, args):
 def get_dataloader(net, val_dataset, data_shape, batch_size, num_workers, args):
     """Get dataloader."""
     width, height = data_shape, data_shape
+    # scripts importing this function may not have the cache options
+    val_cache = getattr(args, 'val_cache', '')
+    if val_cache:
+        val_dataset = gdata.ResizedImageCache(val_dataset, width, height, root=val_cache,
+                                              in_memory=getattr(args, 'val_cache_memory', False))
     val_batchify_fn = Tuple(Stack(), Pad(pad_val=-1))
     val_loader = gluon.data.DataLoader(
         val_dataset.transform(YOLO3DefaultValTransform(width, height, 50, 'coco')),
@@ -127,9 +161,11 @@ def validate(net, val_data, ctx, eval_metric, polygon_metric, args):
     """Test on validation dataset."""
     eval_metric.reset()
     # set nms threshold and topk constraint
-    net.set_nms(nms_thresh=0.45, nms_topk=400)
-    mx.nd.waitall()
-    net.hybridize()
+    if hasattr(net, 'set_nms'):
+        # exported networks have nms and hybridization frozen
+        net.set_nms(nms_thresh=0.45, nms_topk=400)
+        mx.nd.waitall()
+        net.hybridize()
     for batch_num, batch in enumerate(tqdm(val_data)):
         data = gluon.utils.split_and_load(batch[0], ctx_list=ctx, batch_axis=0, even_split=False)
         label = gluon.utils.split_and_load(batch[1], ctx_list=ctx, batch_axis=0, even_split=False)
@@ -177,7 +213,8 @@ def validate(net, val_data, ctx, eval_metric, polygon_metric, args):
 
 def demo_val(net, val_data, eval_metric, polygon_metric, ctx, args):
     """Eval pipeline"""
-    net.collect_params().reset_ctx(ctx)
+    if hasattr(net, 'set_nms'):
+        net.collect_params().reset_ctx(ctx)
     if args.no_wd:
         for k, v in net.collect_params('.*beta|.*gamma|.*bias').items():
             v.wd_mult = 0.0
@@ -198,7 +235,8 @@ def demo_val(net, val_data, eval_metric, polygon_metric, ctx, args):
     tic = time.time()
     btic = time.time()
     mx.nd.waitall()
-    net.hybridize()
+    if hasattr(net, 'set_nms'):
+        net.hybridize()
 
     map_bbox, map_polygon = validate(net, val_data, ctx, eval_metric, polygon_metric,args)
     map_name, mean_ap = map_bbox
@@ -221,14 +259,25 @@ if __name__ == '__main__':
     net_name = '_'.join(('yolo3', args.network, args.dataset))
     args.save_prefix += net_name
     # use sync bn if specified
-    if args.syncbn and len(ctx) > 1:
+    if args.cached_model:
+        net, load_info = gutils.get_cached_model(
+            net_name, args.resume.strip() or None, args.data_shape, args.num_bases, ctx=ctx[0],
+            nms_thresh=0.45, nms_topk=400, batch_size=args.batch_size)
+        async_net = net
+        print('Model {} loaded, {} start: export {:.3f}s, load {:.3f}s, warmup {:.3f}s, total {:.3f}s'.format(
+            load_info['key'], 'cold' if load_info['cold'] else 'warm', load_info['export_time'],
+            load_info['load_time'], load_info['warmup_time'], load_info['total_time']))
+    elif args.syncbn and len(ctx) > 1:
         net = get_model(net_name, pretrained_base=True, norm_layer=gluon.contrib.nn.SyncBatchNorm,
                         norm_kwargs={'num_devices': len(ctx)})
         async_net = get_model(net_name, pretrained_base=False)  # used by cpu worker
     else:
         net = get_model(net_name, pretrained_base=True)
         async_net = net
-    if args.resume.strip():
+    if args.cached_model:
+        # exported networks live on the first context only
+        ctx = ctx[:1]
+    elif args.resume.strip():
         net.load_parameters(args.resume.strip())
         async_net.load_parameters(args.resume.strip())
     else:
@@ -18,6 +18,7 @@ from gluoncv.data.transforms.presets.yolo import YOLO3UsdSegCocoValTransform
 from gluoncv.data.mscoco.instance import COCOInstance
 from gluoncv.data import batchify
 from gluoncv.data.batchify import Tuple, Stack, Pad
+from gluoncv.utils.bbox import x_mean, sqrt_var
 from mxnet import gluon
 from PIL import Image
 
@@ -36,6 +37,9 @@ def parse_args():
                         help='Load weights from previously saved parameters.')
     parser.add_argument('--thresh', type=float, default=0.45,
                         help='Threshold of object score when visualize the bboxes.')
+    parser.add_argument('--cached-model', action='store_true',
+                        help='Export the network once and reload the cached symbol with static memory '
+                        'allocation for later runs.')
     args = parser.parse_args()
     return args
 
@@ -59,11 +63,9 @@ def split_and_load(batch, ctx_list):
 # For coco
 x_min = np.array([-15408.068104448881, -6893.558054798728, -7003.406866817996, -7173.151488944284, -8880.702237736832, -5105.870172246976, -5765.5587195891485, -5024.227379613461, -5711.952435731431, -5495.081529198267, -5833.850420273756, -4434.37549020221, -5849.216285241527, -4148.2654407091895, -3569.2531463158916, -4339.357174902734, -3655.7764618342203, -3823.3819004419747, -3141.4357750292143, -4225.954414632274, -4508.907524652018, -2985.9986722598996, -3351.4766979792385, -3542.6383142662216, -3208.1730852282417, -3276.2051016720184, -2778.240479008936, -2687.1807642675817, -2864.3521512732636, -2667.346488961604, -2679.78247499033, -2778.1530493300193, -2615.297232543604, -2887.83922977382, -2814.11271273744, -2665.593586967864, -2244.208215546852, -2604.715325774133, -2555.901894909533, -3023.0542016462905, -3120.604337844805, -2276.2895359281847, -2105.2348396526972, -2107.14859953116, -4062.8254106434965, -2053.622120297776, -2197.4795855647635, -2042.3037948693445, -2467.5308906646937, -2245.5552141163903])
 x_max = np.array([0.0, 6832.446298223013, 7426.165815379417, 6974.701596658017, 4716.901065835743, 8131.608870119551, 5740.872699165772, 4581.338796015798, 5217.3107185273375, 5434.597380283167, 5576.999587107373, 4287.165831371201, 4963.129599067099, 4621.02114880624, 3682.6609034386593, 4353.761120273803, 4174.824769494295, 3994.883741475415, 3283.721646183678, 3798.4092325829133, 4347.6387582645475, 3372.640698902529, 3295.0094768303293, 2926.3658864426816, 3499.712903749524, 3039.4470982219764, 2473.9809720368858, 2405.556357232199, 3184.463910105855, 2784.1799697475394, 2284.209254236527, 2625.629675147772, 2336.795159840813, 2528.887489215271, 2782.44841959135, 2342.962374129638, 2477.479578295029, 2332.187232909927, 2459.4770586568147, 2794.3178970248023, 2505.2624769384856, 2767.461569799445, 1918.2837463541125, 2050.6555855719203, 2690.2851498377295, 2887.8565628719634, 2263.3678542969415, 1798.6753995660308, 2160.58798020158, 2092.1122966365115])
-x_mean = np.array([-9806.334230601844, -0.1265930578759492, -44.70213815499062, 4.1016068564528485, 34.85025642973737, -3.515908079075314, 33.660171096323424, 130.83580930988637, 0.21492417056751245, 2.8112355899964174, 18.833675030236837, 0.626437650033731, -3.2008816942056932, 0.016458105852027838, 8.394310893579835, -5.059975166016848, 0.3082644590455881, 1.5217574906226543, -0.018611740148539873, 0.7879045499805826, -0.24098315206080123, -0.8808304685364998, -0.7913288600067822, -3.8891420056181145, 6.353012221300202, -0.4225753767008447, 0.27977828714261016, 0.08870383388150666, -5.0118744432067786, 0.48268046843874046, -18.893481918065138, 0.7532384238847303, -5.311672820484189, -6.17895441522754, -0.356883920263817, -0.38091052476647386, 0.08936253734500309, 1.2569901866919777, 1.4373361126170598, -3.279811354042419, -2.068920651918281, 0.060461234684045725, 0.6868672104607721, 0.03698304732462165, -2.532655293110934, -0.1347230399250139, 1.5058533210691571, 0.09911752586840517, -0.012458458813556523, 2.3168010192166624])
-sqrt_var = np.array([3178.8067937849487, 2108.5508769810863, 1994.220493314925, 1938.7995338537069, 1639.3960276470855, 1432.760749474181, 1288.8778997753777, 1173.580613711433, 1122.0012218569218, 928.4866017001266, 921.4166617204439, 856.0066864535319, 827.1107657788409, 801.1389228102764, 747.0316068891458, 738.6573541712918, 713.7510960451755, 656.5846272310993, 644.8258954808872, 606.805027464974, 596.0518795953916, 588.3050234920775, 586.3892172394093, 554.8030689406621, 543.5063777522089, 503.09736918051834, 496.38691611492146, 488.43183601616107, 487.21877068107796, 476.8424720930743, 459.66215884985763, 442.3700766285788, 435.6704169622154, 429.36612409375545, 410.33755900022, 408.4439272034049, 404.64446380132824, 394.1204334571845, 393.73104227507173, 389.3877034575619, 381.867970587664, 372.6268526542834, 358.85596109586754, 357.9271102515216, 352.67275163779277, 348.4594642007308, 344.12421096240666, 343.61001513303694, 331.4995424542531, 326.8226821028282])
 
 # The bases - as global variables to save time
-bases = np.load('/home/tutian/dataset/coco_to_voc/coco_all_50_1.npy')
+bases = np.load('/home/tutian/dataset/coco_to_voc/coco_all_50_1.npy').astype(np.float32)
 
 CLASSES = ('person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus',
             'train', 'truck', 'boat', 'traffic light', 'fire hydrant',
@@ -121,10 +123,20 @@ def speed_test():
     ctx = [mx.cpu()] if not ctx else ctx
 
     # Get net
-    net = gcv.model_zoo.get_model(args.network, pretrained=False, pretrained_base=False)
-    net.load_parameters(args.pretrained)
-    net.set_nms(0.45, 200)
-    net.collect_params().reset_ctx(ctx = ctx)
+    if args.cached_model:
+        net, load_info = gcv.utils.get_cached_model(args.network, args.pretrained, 416, 50, ctx=ctx[0],
+                                                    nms_thresh=0.45, nms_topk=200)
+        print('{} start, model ready in {:.3f}s (export {:.3f}s, load {:.3f}s, warmup {:.3f}s)'.format(
+            'cold' if load_info['cold'] else 'warm', load_info['total_time'], load_info['export_time'],
+            load_info['load_time'], load_info['warmup_time']))
+    else:
+        tic = time.time()
+        net = gcv.model_zoo.get_model(args.network, pretrained=False, pretrained_base=False)
+        net.load_parameters(args.pretrained)
+        net.set_nms(0.45, 200)
+        net.collect_params().reset_ctx(ctx = ctx)
+        net.hybridize()
+        print('model ready in {:.3f}s'.format(time.time() - tic))
 
     if not os.path.exists(args.save_dir):
         os.mkdir(args.save_dir)
@@ -149,7 +161,6 @@ def speed_test():
     img_ids = sorted(val_dataset.coco.getImgIds())
 
     mx.nd.waitall()
-    net.hybridize()
     save_images = False
 
     # print(image_list_batch)
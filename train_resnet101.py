@@ -45,7 +45,8 @@ def parse_args():
                         help='Training epochs.')
     parser.add_argument('--resume', type=str, default='',
                         help='Resume from previously saved parameters if not None. '
-                        'For example, you can resume from ./yolo3_xxx_0123.params')
+                        'For example, you can resume from ./yolo3_xxx_0123.params. '
+                        'Trainer states saved next to it, e.g. ./yolo3_xxx_0123.states, are restored too.')
     parser.add_argument('--start-epoch', type=int, default=0,
                         help='Starting epoch for resuming, default is 0 for new training.'
                         'You can specify it to 100 for example to start from 100 epoch.')
@@ -73,6 +74,10 @@ def parse_args():
                         help='Saving parameter prefix')
     parser.add_argument('--save-interval', type=int, default=10,
                         help='Saving parameters epoch interval, best model will always be saved.')
+    parser.add_argument('--keep-last', type=int, default=0,
+                        help='Number of periodic checkpoints to keep, 0 keeps all.')
+    parser.add_argument('--keep-best', type=int, default=1,
+                        help='Number of best checkpoints to keep.')
     parser.add_argument('--val-interval', type=int, default=10,
                         help='Epoch interval for validation, increase the number will reduce the '
                              'training time if validation is slow.')
@@ -97,6 +102,13 @@ def parse_args():
                         help="Only train boox")
     parser.add_argument('--val_2012', type=bool, default=False,
                         help="val in pascal voc 2012, or will val in sbd")
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure data loading, split, forward, backward, optimizer step and metric '
+                        'update of each iteration, logged every log interval and saved to '
+                        '<save-prefix>_profile.jsonl.')
+    parser.add_argument('--profile-trace', type=str, default='',
+                        help='Run mx.profiler between two comma separated global iterations, e.g. 100,110, '
+                        'and save a chrome trace to <save-prefix>_profile_trace.json.')
     args = parser.parse_args()
     return args
 
@@ -160,16 +172,6 @@ def get_dataloader(net, train_dataset, val_dataset, data_shape, batch_size, num_
         batch_size, False, batchify_fn=val_batchify_fn, last_batch='keep', num_workers=num_workers)
     return train_loader, val_loader
 
-def save_params(net, best_map, current_map, epoch, save_interval, prefix):
-    current_map = float(current_map)
-    if current_map > best_map[0]:
-        best_map[0] = current_map
-        net.save_parameters('{:s}_best.params'.format(prefix, epoch, current_map))
-        with open(prefix+'_best_map.log', 'a') as f:
-            f.write('{:04d}:\t{:.4f}\n'.format(epoch, current_map))
-    if save_interval and epoch % save_interval == 0:
-        net.save_parameters('{:s}_{:04d}_{:.4f}.params'.format(prefix, epoch, current_map))
-
 
 def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
     """Training pipeline"""
@@ -216,7 +218,15 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
     logger.addHandler(fh)
     logger.info(args)
     logger.info('Start training from [Epoch {}]'.format(args.start_epoch))
-    best_map = [0]
+    checkpoints = gutils.CheckpointManager(
+        args.save_prefix, keep_last=args.keep_last, keep_best=args.keep_best,
+        resume=bool(args.resume.strip()))
+    if args.resume.strip() and checkpoints.load(None, trainer, args.resume.strip()):
+        logger.info('Resumed trainer states of {}'.format(args.resume.strip()))
+    profiler = gutils.TrainProfiler(
+        enabled=args.profile, log_file=args.save_prefix + '_profile.jsonl', logger=logger,
+        trace_iters=[int(x) for x in args.profile_trace.split(',')] if args.profile_trace else None,
+        trace_file=args.save_prefix + '_profile_trace.json')
     for epoch in range(args.start_epoch, args.epochs):
         if args.mixup:
             # TODO(threshold): more elegant way to control mixup during runtime
@@ -233,11 +243,12 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
         btic = time.time()
         mx.nd.waitall()
         # net.hybridize()
-        for i, batch in enumerate(train_data):
+        for i, batch in enumerate(profiler.iterate(train_data)):
             batch_size = batch[0].shape[0]
             data = gluon.utils.split_and_load(batch[0], ctx_list=ctx, batch_axis=0)
             fixed_targets = [gluon.utils.split_and_load(batch[it], ctx_list=ctx, batch_axis=0) for it in range(1, 7)]
             gt_boxes = gluon.utils.split_and_load(batch[7], ctx_list=ctx, batch_axis=0)
+            profiler.mark('split')
             sum_losses = []
             obj_losses = []
             center_losses = []
@@ -258,9 +269,12 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
                     center_losses.append(center_loss)
                     scale_losses.append(scale_loss)
                     cls_losses.append(cls_loss)
+                profiler.mark('forward')
                 autograd.backward(sum_losses)
+            profiler.mark('backward')
             lr_scheduler.update(i, epoch)
             trainer.step(batch_size)
+            profiler.mark('step')
             if(args.only_bbox == False):
                 # coef_center_metrics.update(0, coef_center_losses)
                 coef_metrics.update(0,coef_losses)
@@ -268,6 +282,7 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
             center_metrics.update(0, center_losses)
             scale_metrics.update(0, scale_losses)
             cls_metrics.update(0, cls_losses)
+            profiler.mark('metric')
             if args.log_interval and not (i + 1) % args.log_interval:
                 name1, loss1 = obj_metrics.get()
                 name2, loss2 = center_metrics.get()
@@ -282,6 +297,7 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
                 else:
                     logger.info('[Epoch {}][Batch {}], LR: {:.2E}, Speed: {:.3f} samples/sec, {}={:.3f}, {}={:.3f}, {}={:.3f}, {}={:.3f}, {}={:.3f}'.format(
                     epoch, i, trainer.learning_rate, batch_size/(time.time()-btic), name1, loss1, name2, loss2, name3, loss3, name5, loss5, name6, loss6))
+                profiler.log(epoch, i, lr=trainer.learning_rate)
             btic = time.time()
             break  # Save the model for speedtest
 
@@ -310,7 +326,9 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
             current_map = float(polygonmean_ap[-1])
         else:
             current_map = 0.
-        save_params(net, best_map, current_map, epoch, args.save_interval, args.save_prefix)
+        checkpoints.save(net, trainer, epoch, current_map,
+                         periodic=bool(args.save_interval) and epoch % args.save_interval == 0)
+    checkpoints.close()
 
 if __name__ == '__main__':
     args = parse_args()
@@ -45,7 +45,8 @@ def parse_args():
                         help='Training epochs.')
     parser.add_argument('--resume', type=str, default='',
                         help='Resume from previously saved parameters if not None. '
-                        'For example, you can resume from ./yolo3_xxx_0123.params')
+                        'For example, you can resume from ./yolo3_xxx_0123.params. '
+                        'Trainer states saved next to it, e.g. ./yolo3_xxx_0123.states, are restored too.')
     parser.add_argument('--start-epoch', type=int, default=0,
                         help='Starting epoch for resuming, default is 0 for new training.'
                         'You can specify it to 100 for example to start from 100 epoch.')
@@ -73,6 +74,10 @@ def parse_args():
                         help='Saving parameter prefix')
     parser.add_argument('--save-interval', type=int, default=10,
                         help='Saving parameters epoch interval, best model will always be saved.')
+    parser.add_argument('--keep-last', type=int, default=0,
+                        help='Number of periodic checkpoints to keep, 0 keeps all.')
+    parser.add_argument('--keep-best', type=int, default=1,
+                        help='Number of best checkpoints to keep.')
     parser.add_argument('--val-interval', type=int, default=10,
                         help='Epoch interval for validation, increase the number will reduce the '
                              'training time if validation is slow.')
@@ -97,6 +102,17 @@ def parse_args():
                         help="Only train boox")
     parser.add_argument('--val_2012', type=bool, default=False,
                         help="val in pascal voc 2012, or will val in sbd")
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure data loading, split, forward, backward, optimizer step and metric '
+                        'update of each iteration, logged every log interval and saved to '
+                        '<save-prefix>_profile.jsonl.')
+    parser.add_argument('--profile-trace', type=str, default='',
+                        help='Run mx.profiler between two comma separated global iterations, e.g. 100,110, '
+                        'and save a chrome trace to <save-prefix>_profile_trace.json.')
+    parser.add_argument('--kvstore', type=str, default='local',
+                        help='KVStore type. Use dist_sync with launch_cpu.py to train in several '
+                        'local processes, each loading its own shard of the data and '
+                        'batch-size / num-processes samples per iteration.')
     args = parser.parse_args()
     return args
 
@@ -140,38 +156,34 @@ def get_dataset(dataset, args):
         train_dataset = MixupDetection(train_dataset)
     return train_dataset, val_dataset, val_metric, val_polygon_metric
 
-def get_dataloader(net, train_dataset, val_dataset, data_shape, batch_size, num_workers, args):
+def get_dataloader(net, train_dataset, val_dataset, data_shape, batch_size, num_workers, args, kv=None):
     """Get dataloader."""
     width, height = data_shape, data_shape
     batchify_fn = Tuple(*([Stack() for _ in range(7)] + [Pad(axis=0, pad_val=-1) for _ in range(1)]))  # stack image, all targets generated
+    sampler = None
+    if kv is not None:
+        # each process loads its own shard and its part of the batch
+        batch_size //= kv.num_workers
+        sampler = gdata.SplitSampler(len(train_dataset), kv.num_workers, kv.rank, seed=args.seed)
     if args.no_random_shape:
         # True
         train_loader = gluon.data.DataLoader(
             train_dataset.transform(YOLO3DefaultTrainTransform(width, height, net, mixup=args.mixup, num_bases=args.num_bases)),
-            batch_size, True, batchify_fn=batchify_fn, last_batch='rollover', num_workers=num_workers)
+            batch_size, sampler is None, sampler=sampler, batchify_fn=batchify_fn, last_batch='rollover',
+            num_workers=num_workers)
     else:
         transform_fns = [YOLO3DefaultTrainTransform(x * 32, x * 32, net, mixup=args.mixup, num_bases = args.num_bases) for x in range(10, 20)]
         train_loader = RandomTransformDataLoader(
             transform_fns, train_dataset, batch_size=batch_size, interval=10, last_batch='rollover',
-            shuffle=True, batchify_fn=batchify_fn, num_workers=num_workers)
+            shuffle=sampler is None, sampler=sampler, batchify_fn=batchify_fn, num_workers=num_workers)
     val_batchify_fn = Tuple(Stack(), Pad(pad_val=-1))
     val_loader = gluon.data.DataLoader(
         val_dataset.transform(YOLO3DefaultValTransform(width, height, args.num_bases, dataset='coco')),
         batch_size, False, batchify_fn=val_batchify_fn, last_batch='keep', num_workers=num_workers)
     return train_loader, val_loader
 
-def save_params(net, best_map, current_map, epoch, save_interval, prefix):
-    current_map = float(current_map)
-    if current_map > best_map[0]:
-        best_map[0] = current_map
-        net.save_parameters('{:s}_best.params'.format(prefix, epoch, current_map))
-        with open(prefix+'_best_map.log', 'a') as f:
-            f.write('{:04d}:\t{:.4f}\n'.format(epoch, current_map))
-    if save_interval and epoch % save_interval == 0:
-        net.save_parameters('{:s}_{:04d}_{:.4f}.params'.format(prefix, epoch, current_map))
 
-
-def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
+def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args, kv=None):
     """Training pipeline"""
     net.collect_params().reset_ctx(ctx)
     if args.no_wd:
@@ -196,7 +208,12 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
     trainer = gluon.Trainer(
         net.collect_params(), 'sgd',
         {'wd': args.wd, 'momentum': args.momentum, 'lr_scheduler': lr_scheduler},
-        kvstore='local')
+        kvstore=kv if kv is not None else 'local',
+        # update on workers, so optimizer states can be checkpointed and the learning rate
+        # scheduler updated by this loop drives the optimizer
+        update_on_kvstore=False if kv is not None and 'async' not in kv.type else None)
+    # gradients are summed over processes, normalize by the global batch size
+    num_procs = kv.num_workers if kv is not None else 1
     # targets
     sigmoid_ce = gluon.loss.SigmoidBinaryCrossEntropyLoss(from_sigmoid=False)
     l1_loss = gluon.loss.L1Loss()
@@ -221,7 +238,15 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
     logger.addHandler(fh)
     logger.info(args)
     logger.info('Start training from [Epoch {}]'.format(args.start_epoch))
-    best_map = [0]
+    checkpoints = gutils.CheckpointManager(
+        args.save_prefix, keep_last=args.keep_last, keep_best=args.keep_best,
+        resume=bool(args.resume.strip()))
+    if args.resume.strip() and checkpoints.load(None, trainer, args.resume.strip()):
+        logger.info('Resumed trainer states of {}'.format(args.resume.strip()))
+    profiler = gutils.TrainProfiler(
+        enabled=args.profile, log_file=args.save_prefix + '_profile.jsonl', logger=logger,
+        trace_iters=[int(x) for x in args.profile_trace.split(',')] if args.profile_trace else None,
+        trace_file=args.save_prefix + '_profile_trace.json')
     for epoch in range(args.start_epoch, args.epochs):
         if args.mixup:
             # TODO(threshold): more elegant way to control mixup during runtime
@@ -238,11 +263,12 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
         btic = time.time()
         mx.nd.waitall()
         # net.hybridize()
-        for i, batch in enumerate(train_data):
+        for i, batch in enumerate(profiler.iterate(train_data)):
             batch_size = batch[0].shape[0]
             data = gluon.utils.split_and_load(batch[0], ctx_list=ctx, batch_axis=0)
             fixed_targets = [gluon.utils.split_and_load(batch[it], ctx_list=ctx, batch_axis=0) for it in range(1, 7)]
             gt_boxes = gluon.utils.split_and_load(batch[7], ctx_list=ctx, batch_axis=0)
+            profiler.mark('split')
             sum_losses = []
             obj_losses = []
             center_losses = []
@@ -263,9 +289,12 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
                     center_losses.append(center_loss)
                     scale_losses.append(scale_loss)
                     cls_losses.append(cls_loss)
+                profiler.mark('forward')
                 autograd.backward(sum_losses)
+            profiler.mark('backward')
             lr_scheduler.update(i, epoch)
-            trainer.step(batch_size)
+            trainer.step(batch_size * num_procs)
+            profiler.mark('step')
             if(args.only_bbox == False):
                 # coef_center_metrics.update(0, coef_center_losses)
                 coef_metrics.update(0,coef_losses)
@@ -273,6 +302,7 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
             center_metrics.update(0, center_losses)
             scale_metrics.update(0, scale_losses)
             cls_metrics.update(0, cls_losses)
+            profiler.mark('metric')
             if args.log_interval and not (i + 1) % args.log_interval:
                 name1, loss1 = obj_metrics.get()
                 name2, loss2 = center_metrics.get()
@@ -287,6 +317,7 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
                 else:
                     logger.info('[Epoch {}][Batch {}], LR: {:.2E}, Speed: {:.3f} samples/sec, {}={:.3f}, {}={:.3f}, {}={:.3f}, {}={:.3f}, {}={:.3f}'.format(
                     epoch, i, trainer.learning_rate, batch_size/(time.time()-btic), name1, loss1, name2, loss2, name3, loss3, name5, loss5, name6, loss6))
+                profiler.log(epoch, i, lr=trainer.learning_rate)
             btic = time.time()
             break  # Save the model for speedtest
 
@@ -315,7 +346,10 @@ def train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args):
             current_map = float(polygonmean_ap[-1])
         else:
             current_map = 0.
-        save_params(net, best_map, current_map, epoch, args.save_interval, args.save_prefix)
+        if kv is None or kv.rank == 0:
+            checkpoints.save(net, trainer, epoch, current_map,
+                             periodic=bool(args.save_interval) and epoch % args.save_interval == 0)
+    checkpoints.close()
 
 if __name__ == '__main__':
     args = parse_args()
@@ -325,10 +359,15 @@ if __name__ == '__main__':
     # training contexts
     ctx = [mx.gpu(int(i)) for i in args.gpus.split(',') if i.strip()]
     ctx = ctx if ctx else [mx.cpu()]
+    # several local processes started by launch_cpu.py
+    kv = mx.kv.create(args.kvstore) if args.kvstore.startswith('dist') else None
 
     # network
     net_name = '_'.join(('yolo3', args.network, args.dataset))
     args.save_prefix += net_name
+    if kv is not None and kv.rank > 0:
+        # only the first process saves checkpoints, the others log to their own files
+        args.save_prefix += '_rank{}'.format(kv.rank)
     print(f"net_name = {net_name}")
     # use sync bn if specified
     if args.syncbn and len(ctx) > 1:
@@ -353,7 +392,7 @@ if __name__ == '__main__':
     train_dataset, val_dataset, eval_metric, polygon_metric = get_dataset(args.dataset, args)
     print("dataset done")
     train_data, val_data = get_dataloader(
-        async_net, train_dataset, val_dataset, args.data_shape, args.batch_size, args.num_workers, args)
+        async_net, train_dataset, val_dataset, args.data_shape, args.batch_size, args.num_workers, args, kv)
     print("dataloader done")
     # training
-    train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args)
+    train(net, train_data, val_data, eval_metric, polygon_metric, ctx, args, kv)
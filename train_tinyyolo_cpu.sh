@@ -0,0 +1,10 @@
+python launch_cpu.py -n 4 \
+python train_tinyyolo.py --network tiny_darknet --dataset voc --val_2012 True \
+--kvstore dist_sync --gpus '' \
+--batch-size 8 --num-workers 2 \
+--warmup-epochs 1 \
+--lr 0.0005 --epochs 201 --lr-decay 0.1  --lr-decay-epoch 160,180 \
+--save-prefix ./tinyyolo/tiny_yolo_cpu_ \
+--label-smooth \
+--save-interval 1 \
+--log-interval 1
@@ -0,0 +1,103 @@
+"""Compare end-to-end CPU latency of the python and C++ USD-Seg inference."""
+import os
+import re
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+import cv2 as cv
+import mxnet as mx
+import gluoncv as gcv
+from gluoncv.data.mscoco.utils import try_import_pycocotools
+from video_stream import make_preprocess, make_forward, make_postprocess
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare python and C++ USD-Seg latency on CPU.')
+    parser.add_argument('--network', type=str, default='yolo3_darknet53_coco',
+                        help="Network name yolo3_darknet53_coco\\yolo3_tiny_darknet_voc")
+    parser.add_argument('--pretrained', type=str, required=True,
+                        help='Load weights from previously saved parameters.')
+    parser.add_argument('--bases', type=str, default='/home/tutian/dataset/coco_to_voc/coco_all_50_1.npy',
+                        help='Basis matrix with shape (num_bases, 4096).')
+    parser.add_argument('--image', type=str, required=True, help='Test image.')
+    parser.add_argument('--binary', type=str,
+                        default='gluon-cv/scripts/deployment/cpp-inference/build/gluoncv-usdseg',
+                        help='The gluoncv-usdseg executable.')
+    parser.add_argument('--export-prefix', type=str, default='usdseg_export',
+                        help='Prefix of the exported symbol, parameters and bases.')
+    parser.add_argument('--data-shape', type=int, default=416, help='Network input shape.')
+    parser.add_argument('--thresh', type=float, default=0.45, help='Threshold of object score.')
+    parser.add_argument('--repeat', type=int, default=20, help='Number of timed runs.')
+    args = parser.parse_args()
+    return args
+
+
+def python_latency(args):
+    """Average latency of the python path, same post-process as demo_yolo.py."""
+    net = gcv.model_zoo.get_model(args.network, pretrained=False, pretrained_base=False)
+    net.load_parameters(args.pretrained)
+    net.set_nms(0.45, 200)
+    net.hybridize()
+    stages = [make_preprocess(args.data_shape), make_forward(net, mx.cpu()),
+              make_postprocess(np.load(args.bases), args.data_shape, args.thresh)]
+    frame = cv.imread(args.image)
+    times = np.zeros((len(stages),))
+    for run in range(args.repeat + 1):  # the first run is a warm up
+        items = [{'frame': frame.copy()}]
+        for i, stage in enumerate(stages):
+            tic = time.time()
+            items = stage(items)
+            if run > 0:
+                times[i] += time.time() - tic
+    times = times * 1000. / args.repeat
+    return net, list(times) + [times.sum()], items[0]
+
+
+def cpp_latency(args):
+    """Average latency of gluoncv-usdseg, parsed from its output."""
+    json_file = args.export_prefix + '_instances.json'
+    output = subprocess.check_output(
+        [args.binary, args.export_prefix, args.image, '-s', str(args.data_shape),
+         '-t', str(args.thresh), '-r', str(args.repeat), '--json', json_file,
+         '-q', '--no-disp'], stderr=subprocess.STDOUT).decode()
+    match = re.search(r'\{Preprocess, Forward, Postprocess, Total\}: ([\d.]+), ([\d.]+), '
+                      r'([\d.]+), ([\d.]+) ms', output)
+    if match is None:
+        raise RuntimeError('Cannot parse latency from output:\n' + output)
+    with open(json_file) as f:
+        return [float(v) for v in match.groups()], json.load(f)
+
+
+def main():
+    args = parse_args()
+    net, py_times, py_result = python_latency(args)
+    if not os.path.isfile(args.export_prefix + '-symbol.json'):
+        gcv.utils.export_block(args.export_prefix, net,
+                               data_shape=(args.data_shape, args.data_shape, 3),
+                               preprocess=True, layout='HWC')
+        gcv.utils.export_coef_bases(args.export_prefix, args.bases)
+    cpp_times, cpp_result = cpp_latency(args)
+
+    print('{:<8s} {:>12s} {:>12s} {:>12s} {:>12s}'.format(
+        '', 'preprocess', 'forward', 'postprocess', 'total'))
+    for name, times in (('python', py_times), ('c++', cpp_times)):
+        print('{:<8s} {:>10.3f}ms {:>10.3f}ms {:>10.3f}ms {:>10.3f}ms'.format(name, *times))
+    print('speedup  {:>11.2f}x {:>11.2f}x {:>11.2f}x {:>11.2f}x'.format(
+        *[p / max(c, 1e-9) for p, c in zip(py_times, cpp_times)]))
+
+    # masks should agree, up to the difference of normalization in and out of the graph
+    try_import_pycocotools()
+    import pycocotools.mask as cocomask
+    py_masks = py_result['masks']
+    cpp_masks = [inst['segmentation'] for inst in cpp_result['instances']]
+    print('instances: python {}, c++ {}'.format(len(py_masks), len(cpp_masks)))
+    num = min(len(py_masks), len(cpp_masks))
+    if num:
+        ious = cocomask.iou(cpp_masks[:num], py_masks[:num], [0] * num)
+        print('mean mask IoU of instances in order: {:.4f}'.format(np.diag(ious).mean()))
+
+
+if __name__ == '__main__':
+    main()
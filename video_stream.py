@@ -0,0 +1,279 @@
+"""Streaming USD-Seg instance segmentation on video files."""
+import os
+import json
+import time
+import argparse
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+import numpy as np
+import cv2 as cv
+import mxnet as mx
+import gluoncv as gcv
+from gluoncv.utils.bbox import x_mean, sqrt_var
+from gluoncv.data.mscoco.utils import try_import_pycocotools
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Streaming instance segmentation on a video file.')
+    parser.add_argument('--video', type=str, required=True,
+                        help='Local video file decoded by OpenCV.')
+    parser.add_argument('--network', type=str, default='yolo3_tiny_darknet_voc',
+                        help="Network name yolo3_darknet53_coco\\yolo3_tiny_darknet_voc")
+    parser.add_argument('--pretrained', type=str, required=True,
+                        help='Load weights from previously saved parameters.')
+    parser.add_argument('--bases', type=str, default='/home/tutian/dataset/coco_to_voc/coco_all_50_1.npy',
+                        help='Basis matrix with shape (num_bases, 4096).')
+    parser.add_argument('--data-shape', type=int, default=416,
+                        help='Network input shape.')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Maximum number of frames forwarded together.')
+    parser.add_argument('--thresh', type=float, default=0.45,
+                        help='Threshold of object score.')
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='Capacity of the queue between two stages.')
+    parser.add_argument('--drop', action='store_true',
+                        help='Drop frames when the next stage is full instead of waiting.')
+    parser.add_argument('--num-frames', type=int, default=-1,
+                        help='Number of frames to process, -1 means the whole video.')
+    parser.add_argument('--output', type=str, default='',
+                        help='Write per frame detections and RLE masks to this json lines file.')
+    parser.add_argument('--cached-model', action='store_true',
+                        help='Use the exported network with static memory allocation.')
+    parser.add_argument('--log-interval', type=float, default=5.,
+                        help='Seconds between fps reports.')
+    args = parser.parse_args()
+    return args
+
+
+class StageMeter(object):
+    """Frame counter and busy time of one stage."""
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.dropped = 0
+        self.busy = 0.
+        self.start = time.time()
+
+    def fps(self):
+        """Throughput over the wall time."""
+        return self.count / max(time.time() - self.start, 1e-6)
+
+    def busy_fps(self):
+        """Throughput if the stage never waited for its neighbours."""
+        return self.count / max(self.busy, 1e-6)
+
+    def __str__(self):
+        return '{}: {:.1f} fps ({:.1f} busy fps, {} frames, {} dropped)'.format(
+            self.name, self.fps(), self.busy_fps(), self.count, self.dropped)
+
+
+class Stage(threading.Thread):
+    """A pipeline stage reading from `in_queue` and writing to `out_queue`.
+
+    `fn` maps a list of items to a list of results. At most `batch_size` items
+    already waiting in `in_queue` are gathered into one call. `None` is the end
+    of stream marker and is forwarded to the next stage.
+    """
+    def __init__(self, name, fn, in_queue, out_queue, batch_size=1, drop=False):
+        super(Stage, self).__init__(name=name)
+        self.daemon = True
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.batch_size = batch_size
+        self.drop = drop
+        self.meter = StageMeter(name)
+
+    def put(self, item):
+        """Put one result into the next stage, drop it if full and dropping is enabled."""
+        if self.out_queue is None:
+            return
+        if self.drop and item is not None:
+            try:
+                self.out_queue.put_nowait(item)
+            except queue.Full:
+                self.meter.dropped += 1
+        else:
+            self.out_queue.put(item)
+
+    def run(self):
+        done = False
+        while not done:
+            items = [self.in_queue.get()]
+            while len(items) < self.batch_size and items[-1] is not None:
+                try:
+                    items.append(self.in_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if items[-1] is None:
+                items.pop()
+                done = True
+            if items:
+                tic = time.time()
+                results = self.fn(items)
+                self.meter.busy += time.time() - tic
+                self.meter.count += len(items)
+                for result in results:
+                    self.put(result)
+        self.put(None)
+
+
+class Decoder(threading.Thread):
+    """Decode frames of a video file into a queue."""
+    def __init__(self, filename, out_queue, num_frames=-1, drop=False):
+        super(Decoder, self).__init__(name='decode')
+        self.daemon = True
+        self.filename = filename
+        self.out_queue = out_queue
+        self.num_frames = num_frames
+        self.drop = drop
+        self.meter = StageMeter('decode')
+
+    def run(self):
+        cap = cv.VideoCapture(self.filename)
+        idx = 0
+        while self.num_frames < 0 or idx < self.num_frames:
+            tic = time.time()
+            ret, frame = cap.read()
+            self.meter.busy += time.time() - tic
+            if not ret:
+                break
+            self.meter.count += 1
+            item = {'index': idx, 'frame': frame}
+            idx += 1
+            if self.drop:
+                try:
+                    self.out_queue.put_nowait(item)
+                except queue.Full:
+                    self.meter.dropped += 1
+            else:
+                self.out_queue.put(item)
+        cap.release()
+        self.out_queue.put(None)
+
+
+def make_preprocess(data_shape, mean=(0.485, 0.456, 0.406), std=(0.229, 0.224, 0.225)):
+    """Resize to the network input, convert to RGB and normalize."""
+    mean = np.array(mean, dtype=np.float32) * 255
+    std = np.array(std, dtype=np.float32) * 255
+
+    def preprocess(items):
+        for item in items:
+            img = cv.resize(item['frame'], (data_shape, data_shape), interpolation=cv.INTER_CUBIC)
+            img = cv.cvtColor(img, cv.COLOR_BGR2RGB).astype(np.float32)
+            item['data'] = ((img - mean) / std).transpose((2, 0, 1))
+        return items
+    return preprocess
+
+
+def make_forward(net, ctx):
+    """Forward a batch of frames and copy the outputs to host."""
+    def forward(items):
+        x = mx.nd.array(np.stack([item.pop('data') for item in items]), ctx=ctx)
+        ids, scores, bboxes, coefs = [y.asnumpy() for y in net(x)]
+        for i, item in enumerate(items):
+            item['ids'], item['scores'] = ids[i, :, 0], scores[i, :, 0]
+            item['bboxes'], item['coefs'] = bboxes[i], coefs[i]
+        return items
+    return forward
+
+
+def make_postprocess(bases, data_shape, thresh, encode=True):
+    """Reconstruct masks from coefficients and paste them into the frame."""
+    bases = bases.astype(np.float32)
+    coef_mean, coef_std = x_mean, sqrt_var
+    if encode:
+        try_import_pycocotools()
+        import pycocotools.mask as cocomask
+
+    def postprocess(items):
+        for item in items:
+            height, width = item.pop('frame').shape[:2]
+            valid = np.where((item['ids'] >= 0) & (item['scores'] >= thresh))[0]
+            bboxes = item['bboxes'][valid] * np.array(
+                [width, height, width, height], dtype=np.float32) / data_shape
+            coefs = item.pop('coefs')[valid] * coef_std + coef_mean
+            # one matmul for all instances of the frame
+            masks_64 = np.dot(coefs, bases).reshape(-1, 64, 64)
+            rles = []
+            for bbox, mask_64 in zip(bboxes.astype(np.int32), masks_64):
+                xmin, ymin = max(bbox[0], 0), max(bbox[1], 0)
+                xmax, ymax = min(bbox[2], width), min(bbox[3], height)
+                mask = np.zeros((height, width), dtype=np.uint8, order='F')
+                if xmax > xmin and ymax > ymin and bbox[2] > bbox[0] and bbox[3] > bbox[1]:
+                    theta = (mask_64.max() + mask_64.min()) / 2
+                    resized = cv.resize(mask_64, (bbox[2] - bbox[0], bbox[3] - bbox[1])) > theta
+                    mask[ymin:ymax, xmin:xmax] = resized[ymin - bbox[1]:ymax - bbox[1],
+                                                         xmin - bbox[0]:xmax - bbox[0]]
+                if encode:
+                    rle = cocomask.encode(mask)
+                    rle['counts'] = rle['counts'].decode('ascii')
+                    rles.append(rle)
+            item['ids'], item['scores'] = item['ids'][valid], item['scores'][valid]
+            item['bboxes'], item['masks'] = bboxes, rles
+        return items
+    return postprocess
+
+
+def make_writer(filename):
+    """Write results as json lines, or discard them if `filename` is empty."""
+    f = open(filename, 'w') if filename else None
+
+    def write(items):
+        if f is None:
+            return items
+        for item in items:
+            f.write(json.dumps({'frame': item['index'],
+                                'ids': item['ids'].astype(int).tolist(),
+                                'scores': item['scores'].tolist(),
+                                'bboxes': item['bboxes'].tolist(),
+                                'masks': item['masks']}) + '\n')
+        f.flush()
+        return items
+    return write
+
+
+def main():
+    args = parse_args()
+    ctx = mx.cpu()
+    if args.cached_model:
+        net, _ = gcv.utils.get_cached_model(args.network, args.pretrained, args.data_shape, ctx=ctx,
+                                            nms_thresh=0.45, nms_topk=200, batch_size=args.batch_size)
+    else:
+        net = gcv.model_zoo.get_model(args.network, pretrained=False, pretrained_base=False)
+        net.load_parameters(args.pretrained)
+        net.set_nms(0.45, 200)
+        net.collect_params().reset_ctx(ctx)
+        net.hybridize()
+    bases = np.load(args.bases)
+
+    queues = [queue.Queue(maxsize=args.queue_size) for _ in range(4)]
+    decoder = Decoder(args.video, queues[0], args.num_frames, args.drop)
+    stages = [
+        Stage('preprocess', make_preprocess(args.data_shape), queues[0], queues[1], drop=args.drop),
+        Stage('forward', make_forward(net, ctx), queues[1], queues[2],
+              batch_size=args.batch_size, drop=args.drop),
+        Stage('postprocess', make_postprocess(bases, args.data_shape, args.thresh, bool(args.output)),
+              queues[2], queues[3]),
+        Stage('write', make_writer(args.output), queues[3], None),
+    ]
+    tic = time.time()
+    decoder.start()
+    for stage in stages:
+        stage.start()
+    meters = [decoder.meter] + [stage.meter for stage in stages]
+    while stages[-1].is_alive():
+        stages[-1].join(args.log_interval)
+        print(' | '.join(str(m) for m in meters))
+    print('Processed {} of {} frames in {:.2f}s, end-to-end {:.1f} fps'.format(
+        stages[-1].meter.count, decoder.meter.count, time.time() - tic,
+        stages[-1].meter.count / (time.time() - tic)))
+    for m in meters:
+        print(m)
+
+
+if __name__ == '__main__':
+    main()